@@ -1,10 +1,161 @@
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, Response, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from detoxify import Detoxify
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from contextlib import asynccontextmanager
 import uvicorn
+import asyncio
 import json
+import logging
+import os
+import tempfile
+import threading
+import time
 
-app = FastAPI(title="Task_1 API")
+from backends import BACKEND, load_backend
+from batching import MicroBatcher, PaddingStats
+from chunking import AGGREGATION, WINDOW_TOKENS, aggregate, plan_windows
+from inference_pool import InferencePool, InferenceQueueFull
+from jobs import JobStore, JobWorkers
+from live_moderation import WS_MAX_TEXT_CHARS, LiveSession, debounced
+from metrics import SIZE_BUCKETS, Callback, Counter, Histogram, MetricsMiddleware, render as render_metrics
+from model_registry import ModelRegistry
+from moderation_cache import ModerationCache, cache_key
+from rate_limit import LOGIN_USERNAME_LIMIT, RATE_LIMITED, RateLimitMiddleware, SlidingWindowLimiter, parse_limit
+from schemas import (
+    JOB_ERRORS, LOGIN_ERRORS, MODERATE_ERRORS, JobRequest, JobStatus, JobSubmitted, LoginRequest, LoginResponse,
+    LogoutResponse, ModerateRequest, ModerateResponse, ProtectedResponse, error_responses, parse_body, request_body,
+)
+from singleflight import SingleFlight
+from timing import TimingMiddleware, phase, timed_endpoint
+from tokens import InvalidToken, TokenService
+from user_store import LOGIN_QUEUE_SIZE, LOGIN_WORKERS, UserStore
+
+logger = logging.getLogger("api")
+
+# MODEL LIFECYCLE
+# Detoxify (and torch) are imported and loaded in the background, so importing
+# this module, /api/login and /api/protected never wait on model weights.
+# MODERATION_BACKEND picks eager torch, int8-quantized torch or ONNX Runtime.
+# MODERATION_MODEL is loaded at startup; other models in the registry load on
+# first use and are evicted LRU under MODEL_MEMORY_BUDGET_MB.
+MODEL_NAME = os.environ.get("MODERATION_MODEL", "original")
+MODEL_RETRY_AFTER = 5
+WARMUP_TEXTS = ["warming up the moderation model", "hello"]
+
+model_error = None
+model_ready = threading.Event()
+_model_settled = threading.Event()  # the current load attempt finished, loaded or failed
+_model_lock = threading.Lock()
+_loader_thread = None
+_model_failed_at = None  # time.monotonic() of the last failed load
+
+
+def load_and_warm(name):
+    loaded = load_backend(name, BACKEND)
+    loaded.predict(WARMUP_TEXTS)  # first pass allocates buffers; keep it off a real request
+    logger.info("Model %r loaded and warmed (%s backend)", name, BACKEND)
+    return loaded
+
+
+registry = ModelRegistry(load_and_warm)
+
+
+def get_model(name=MODEL_NAME):
+    """Returns a loaded model; safe to call from any thread or worker process."""
+    loaded = registry.get(name)
+    if name == MODEL_NAME:
+        model_ready.set()
+        _model_settled.set()
+    return loaded
+
+
+def _load_in_background():
+    global model_error, _model_failed_at
+    try:
+        get_model()
+    except Exception as e:
+        model_error = str(e)
+        _model_failed_at = time.monotonic()
+        logger.exception("Model %r failed to load", MODEL_NAME)
+    finally:
+        _model_settled.set()
+
+
+def ensure_model_loading():
+    """Starts a background load unless one is running or the model is ready.
+
+    After a failed load the next attempt waits MODEL_RETRY_AFTER seconds, so a
+    persistent failure is not retried on every request.
+    """
+    global _loader_thread, model_error
+    with _model_lock:
+        if model_ready.is_set() or (_loader_thread is not None and _loader_thread.is_alive()):
+            return
+        if _model_failed_at is not None and time.monotonic() - _model_failed_at < MODEL_RETRY_AFTER:
+            return
+        model_error = None
+        _model_settled.clear()
+        _loader_thread = threading.Thread(target=_load_in_background, name="model-loader", daemon=True)
+        _loader_thread.start()
+
+
+def wait_until_ready(timeout=None):
+    """Starts loading if needed and blocks until the model is ready (used by in-process tests).
+
+    Returns False on timeout; raises RuntimeError as soon as the load fails.
+    """
+    ensure_model_loading()
+    _model_settled.wait(timeout)
+    if model_ready.is_set():
+        return True
+    if model_error:
+        raise RuntimeError(f"Model {MODEL_NAME!r} failed to load: {model_error}")
+    return False
+
+
+def require_model():
+    if not model_ready.is_set():
+        ensure_model_loading()
+        raise HTTPException(
+            status_code=503,
+            detail="Moderation model is loading, retry later",
+            headers={"Retry-After": str(MODEL_RETRY_AFTER)},
+        )
+
+
+def requested_model(name):
+    """Validates the optional `model` field; returns the registry name to use."""
+    if name is None:
+        return MODEL_NAME
+    if not isinstance(name, str) or name not in registry.available:
+        raise HTTPException(status_code=400, detail=f"Unknown model '{name}'")
+    return name
+
+
+async def ensure_loaded(name):
+    # First use of a secondary model loads it on a plain thread, not an inference slot
+    if not registry.is_loaded(name):
+        with phase("load"):
+            await asyncio.to_thread(registry.get, name)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    ensure_model_loading()
+    await asyncio.to_thread(tokens.start_sync)  # with AUTH_REVOCATION_DB: every revocation known before serving
+    job_workers.start()
+    yield
+    await job_workers.stop()
+    await asyncio.to_thread(cache.flush, 5)
+    inference_pool.shutdown()
+    login_pool.shutdown()
+
+
+app = FastAPI(title="Task_1 API", lifespan=lifespan)
+
+# Per-IP sliding-window limits (RATE_LIMITS) answer 429 before the body is read.
+# Added first so it runs inside CORS: browsers can read the 429 and Retry-After.
+app.add_middleware(RateLimitMiddleware)
 
 # Allow all origins for Postman/UI tests
 app.add_middleware(
@@ -13,88 +164,563 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
+)
+
+# Per-route request counts, latency and error statuses for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Server-Timing header per response (read, parse, validate, plan, cache, batch,
+# queue, inference/hash, tokenize, forward, serialize, total); tokenize and
+# forward are the parts of inference. TIMING_ACCESS_LOG adds a JSON access log.
+app.add_middleware(TimingMiddleware)
+
+# Every scoring path (single, bulk, long-text windows) ends here, so texts are
+# bucketed by token length before the forward pass instead of all being padded
+# to the longest one. With INFERENCE_EXECUTOR=process each worker keeps its own
+# padding counters, so /api/moderate/stats only reflects thread workers.
+padding = PaddingStats()
+
+
+def predict_batch(texts, model_name=MODEL_NAME):
+    """Scores a list of texts in length-bucketed passes; results keep the input order."""
+    return get_model(model_name).score_batch(texts, padding=padding)
+
+
+# Inference runs on a bounded worker pool so the event loop keeps serving login/protected
+inference_pool = InferencePool(predict_batch)
+
+INFERENCE_SECONDS = Histogram("inference_duration_seconds", "Model time per batch, excluding HTTP and queueing")
+INFERENCE_QUEUE_SECONDS = Histogram("inference_queue_wait_seconds", "Time a batch waited for a pool worker")
+INFERENCE_BATCH_SIZE = Histogram("inference_batch_size", "Texts per model batch", buckets=SIZE_BUCKETS)
+
+
+def record_batch(size, queued, elapsed, args):
+    model_name = args[0] if args else MODEL_NAME
+    INFERENCE_SECONDS.observe(elapsed, model=model_name)
+    INFERENCE_QUEUE_SECONDS.observe(queued, model=model_name)
+    INFERENCE_BATCH_SIZE.observe(size, model=model_name)
+
+
+inference_pool.on_batch = record_batch
+Callback("inference_queue_depth", "Batches running or waiting on the inference pool", lambda: inference_pool.depth)
+Callback("inference_queue_capacity", "Maximum batches admitted to the inference pool", lambda: inference_pool.capacity)
+Callback("inference_rejected_total", "Batches rejected because the queue was full", lambda: inference_pool.rejected, type="counter")
+Callback("inference_real_tokens_total", "Non-padding tokens fed to the model", lambda: padding.real_tokens, type="counter")
+Callback("inference_padded_tokens_total", "Tokens fed to the model including padding", lambda: padding.padded_tokens, type="counter")
+Callback("inference_padding_efficiency", "Real / padded tokens across all forward passes", lambda: padding.efficiency)
+
+# Concurrent /api/moderate calls share forward passes
+batcher = MicroBatcher(inference_pool.predict)
+
+# Repeated texts (canned replies, spam waves, UI retries) skip the model entirely.
+# With MODERATION_CACHE_DB the sqlite tier is read on a thread and written by a
+# background batch writer, so a miss never blocks the event loop on disk I/O.
+cache = ModerationCache()
+Callback("moderation_cache_hits_total", "Moderation cache hits", lambda: cache.hits, type="counter")
+Callback("moderation_cache_misses_total", "Moderation cache misses", lambda: cache.misses, type="counter")
+Callback("moderation_cache_evictions_total", "Moderation cache LRU evictions", lambda: cache.evictions, type="counter")
+Callback("models_loaded", "Models resident in the registry", lambda: len(registry.stats()["loaded"]))
+
+# Concurrent /api/moderate requests for the same (text, model) run once
+inflight = SingleFlight()
+Callback("moderation_singleflight_leaders_total", "Moderations computed by a first caller", lambda: inflight.leaders, type="counter")
+Callback("moderation_singleflight_shared_total", "Moderations that joined an identical in-flight call", lambda: inflight.shared, type="counter")
+Callback("moderation_singleflight_in_flight", "Distinct moderations in flight", lambda: len(inflight))
+
+
+async def score_text(text, model_name=MODEL_NAME):
+    with phase("cache"):
+        [scores] = await cache.get_many([text], model_name)
+    if scores is None:
+        scores = await batcher.submit(text, model_name)
+        with phase("cache"):
+            cache.put(text, model_name, scores)
+    return scores
+
+
+async def score_texts(texts, model_name=MODEL_NAME, wait=False, background=False):
+    """Scores a list of texts, sending only distinct cache misses to the pool."""
+    with phase("cache"):
+        results = await cache.get_many(texts, model_name)
+    misses = list(dict.fromkeys(text for text, scores in zip(texts, results) if scores is None))
+    if misses:
+        fresh = dict(zip(misses, await inference_pool.predict(misses, model_name, wait=wait, background=background)))
+        with phase("cache"):
+            for text, scores in fresh.items():
+                cache.put(text, model_name, scores)
+        results = [scores if scores is not None else fresh[text] for text, scores in zip(texts, results)]
+    return results
+
+
+# Long texts are scored as overlapping token windows instead of being truncated
+def plan_all(texts, model_name=MODEL_NAME):
+    tokenizer = get_model(model_name).tokenizer
+
+    def count_tokens(text):
+        return len(tokenizer.tokenize(text))
+
+    return [plan_windows(text, count_tokens) for text in texts]
+
+
+def window_texts(text, windows):
+    return [text[start:end] for start, end in windows] if windows else [text]
+
+
+async def score_documents(texts, model_name=MODEL_NAME, wait=False, background=False):
+    """Scores whole documents, windowing long ones; returns one moderation result per text."""
+    await ensure_loaded(model_name)
+    plans = await asyncio.to_thread(plan_all, texts, model_name)
+    pieces = [piece for text, windows in zip(texts, plans) for piece in window_texts(text, windows)]
+    flat = await score_texts(pieces, model_name, wait=wait, background=background)
+
+    results, offset = [], 0
+    for text, windows in zip(texts, plans):
+        count = len(windows) or 1
+        part, offset = flat[offset:offset + count], offset + count
+        results.append(long_text_result(text, windows, part) if windows else moderation_result(text, part[0]))
+    return results
+
+
+async def score_sentences(texts, model_name=MODEL_NAME):
+    """Per-text scores taken the /api/moderate way: cache, then micro-batcher; long texts as windows."""
+    with phase("plan"):
+        plans = await asyncio.to_thread(plan_all, texts, model_name)
+
+    async def score(text, windows):
+        if windows:
+            return long_text_result(text, windows, await score_texts(window_texts(text, windows), model_name))[
+                "toxicity_scores"
+            ]
+        return await score_text(text, model_name)
+
+    # Concurrent submits let the batcher coalesce them with each other and with other requests
+    return await asyncio.gather(*(score(text, windows) for text, windows in zip(texts, plans)))
+
+# Users live in sqlite (USER_DB) with scrypt hashes; hashing runs on its own
+# bounded pool so a burst of logins neither blocks the loop nor queues forever
+users = UserStore()
+login_pool = InferencePool(
+    users.authenticate, kind="thread", workers=LOGIN_WORKERS, queue_size=LOGIN_QUEUE_SIZE, phase="hash"
 )
+LOGIN_SECONDS = Histogram("login_verify_duration_seconds", "Password hash verification time")
+LOGIN_QUEUE_SECONDS = Histogram("login_queue_wait_seconds", "Time a login waited for a hashing worker")
+
+
+def record_login(size, queued, elapsed, args):
+    LOGIN_QUEUE_SECONDS.observe(queued)
+    LOGIN_SECONDS.observe(elapsed)
 
-# Load Detoxify model at startup
-model = Detoxify("original")
 
-# Dummy users
-USERS = {"admin": "password123"}
+login_pool.on_batch = record_login
+
+# Failed logins per username, checked before any hashing work (LOGIN_USERNAME_LIMIT)
+login_failures = SlidingWindowLimiter(*parse_limit(LOGIN_USERNAME_LIMIT))
+Callback("login_queue_depth", "Logins hashing or waiting for a hashing worker", lambda: login_pool.depth)
+
+# Signed, expiring bearer tokens (AUTH_SECRET / AUTH_TOKEN_TTL)
+tokens = TokenService()
+Callback("auth_tokens_issued_total", "Bearer tokens issued by /api/login", lambda: tokens.issued, type="counter")
+Callback("auth_tokens_rejected_total", "Bearer tokens that failed verification", lambda: tokens.rejected, type="counter")
+Callback("auth_tokens_revoked", "Revoked tokens that have not expired yet", lambda: tokens.stats()["revoked"])
+
+
+def bearer_token(request):
+    auth_header = request.headers.get("Authorization")
+    if not auth_header:
+        raise HTTPException(status_code=401, detail="Authorization header missing")
+    scheme, _, token = auth_header.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    return token.strip()
 
 # LOGIN
-@app.post("/api/login")
+@app.post(
+    "/api/login",
+    response_model=LoginResponse,
+    responses=error_responses(400, 401, 415, 429, 503),
+    openapi_extra=request_body(LoginRequest),
+)
+@timed_endpoint
 async def login(request: Request):
-    try:
-        if request.headers.get("content-type") != "application/json":
-            raise HTTPException(status_code=415, detail="Unsupported Media Type: JSON required")
-        data = await request.json()
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=400, detail="Invalid JSON")
-    
-    username = data.get("username", "")
-    password = data.get("password", "")
-
-    if not username:
-        raise HTTPException(status_code=400, detail="Username required")
-    if not password:
-        raise HTTPException(status_code=400, detail="Password required")
+    credentials = await parse_body(request, LoginRequest, LOGIN_ERRORS, require_json=True)
+    username, password = credentials.username, credentials.password
 
-    if username not in USERS:
-        raise HTTPException(status_code=401, detail="Invalid credentials")
+    retry_after = login_failures.check(username)
+    if retry_after:
+        RATE_LIMITED.inc(limiter="username", path="/api/login")
+        raise HTTPException(
+            status_code=429, detail="Too many failed logins", headers={"Retry-After": str(retry_after)}
+        )
 
-    if USERS[username] == password:
-        return {"status": "success", "token": "fake-jwt-token"}
-    else:
+    try:
+        valid = await login_pool.predict(username, password)
+    except InferenceQueueFull as e:
+        raise HTTPException(
+            status_code=503, detail="Login busy, retry shortly", headers={"Retry-After": str(e.retry_after)}
+        )
+    if not valid:
+        login_failures.add(username)
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    return LoginResponse(token=tokens.issue(username), expires_in=tokens.ttl)
 
 # PROTECTED
-@app.get("/api/protected")
+@app.get("/api/protected", response_model=ProtectedResponse, responses=error_responses(401))
+@timed_endpoint
 async def protected(request: Request):
-    auth_header = request.headers.get("Authorization")
+    try:
+        tokens.verify(bearer_token(request))
+    except InvalidToken as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    return ProtectedResponse(message="You have access to protected data")
 
-    if not auth_header:
-        raise HTTPException(status_code=401, detail="Authorization header missing")
+# LOGOUT
+@app.post("/api/logout", response_model=LogoutResponse, responses=error_responses(401))
+async def logout(request: Request):
+    try:
+        # With AUTH_REVOCATION_DB the revocation is also written to sqlite for the other workers
+        await asyncio.to_thread(tokens.revoke, bearer_token(request))
+    except InvalidToken as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    return LogoutResponse()
 
-    if auth_header == "Bearer fake-jwt-token":
-        return {"message": "You have access to protected data"}
+# MODERATION
+def text_error(text):
+    """Returns the 400 detail for an invalid moderation text, or None if it is valid."""
+    if text is None:
+        return "Missing 'text' field"
+    if not isinstance(text, str):
+        return "Text must be a string"
+    if not text.strip():
+        return "Text required"
+    return None
 
-    # simulate expired/invalid token handling
-    if "expired" in auth_header.lower():
-        raise HTTPException(status_code=401, detail="Token expired")
 
-    raise HTTPException(status_code=401, detail="Invalid or expired token")
+def moderation_result(text, scores):
+    toxicity_label = "toxic" if scores["toxicity"] > 0.5 else "non-toxic"
+    return {
+        "text": text,
+        "toxicity": toxicity_label,
+        "toxicity_scores": scores
+    }
 
-# MODERATION
-@app.post("/api/moderate")
+
+def long_text_result(text, windows, window_scores):
+    scores, driver = aggregate(window_scores)
+    start, end = windows[driver]
+    result = moderation_result(text, scores)
+    result["long_text"] = {
+        "windows": len(windows),
+        "window_tokens": WINDOW_TOKENS,
+        "aggregation": AGGREGATION,
+        "driving_span": {"start": start, "end": end, "toxicity": window_scores[driver]["toxicity"]},
+    }
+    return result
+
+
+async def moderate_text(text, model_name):
+    await ensure_loaded(model_name)
+    # Tokenizing a long document is CPU work too, so plan windows off the loop
+    with phase("plan"):
+        windows = (await asyncio.to_thread(plan_all, [text], model_name))[0]
+    if windows:
+        window_scores = await score_texts(window_texts(text, windows), model_name)
+        return long_text_result(text, windows, window_scores)
+
+    clean_results = await score_text(text, model_name)
+    return moderation_result(text, clean_results)
+
+
+@app.post(
+    "/api/moderate",
+    response_model=ModerateResponse,
+    response_model_exclude_none=True,
+    responses=error_responses(400, 429, 500, 503),
+    openapi_extra=request_body(ModerateRequest),
+)
+@timed_endpoint
 async def moderate(request: Request):
+    body = await parse_body(request, ModerateRequest, MODERATE_ERRORS)
+    text = body.text
+    with phase("validate"):
+        model_name = requested_model(body.model)
+        require_model()
+
     try:
-        body = await request.json()
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=400, detail="Invalid JSON")
+        # Identical texts in flight at once (spam bursts, retries) share one computation
+        return await inflight.do(cache_key(text, model_name), moderate_text, text, model_name)
+    except InferenceQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Moderation queue full, retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Moderation failed: {str(e)}")
+
+# BULK MODERATION
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl", "application/ndjson")
+SPOOL_MAX_MEMORY = 4 * 1024 * 1024
+
+
+def parse_ndjson_line(line):
+    try:
+        item = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None, "Invalid JSON"
+    if not isinstance(item, dict):
+        return None, "Invalid payload"
+    return item.get("text"), None
+
+
+async def spool_body(request):
+    """Copies the upload into a spooled temp file so large NDJSON bodies never sit in memory.
+
+    The body has to be drained before streaming starts: StreamingResponse listens
+    on the same receive channel for client disconnects.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    async for chunk in request.stream():
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+
+async def iter_ndjson_lines(spool):
+    """Yields (text, error) per NDJSON line."""
+    try:
+        for line in spool:
+            if line.strip():
+                yield parse_ndjson_line(line)
+    finally:
+        spool.close()
+
+
+async def iter_json_texts(texts):
+    for text in texts:
+        yield text, None
 
-    if not isinstance(body, dict):
-        raise HTTPException(status_code=400, detail="Invalid payload")
 
-    text = body.get("text")
+async def score_chunk(chunk, model_name):
+    """Scores one chunk of (index, text, error) items and returns their NDJSON lines."""
+    valid = [(index, text) for index, text, error in chunk if not error and not text_error(text)]
+    results, failure = {}, None
+    if valid:
+        try:
+            # Bulk work waits for a free slot instead of bouncing off the backlog limit
+            scored = await score_documents([text for _, text in valid], model_name, wait=True)
+            results = {index: result for (index, _), result in zip(valid, scored)}
+        except Exception as e:
+            failure = f"Moderation failed: {str(e)}"
+
+    lines = []
+    for index, text, error in chunk:
+        error = error or text_error(text)
+        if error:
+            line = {"index": index, "status": 400, "error": error}
+        elif failure:
+            line = {"index": index, "status": 500, "error": failure}
+        else:
+            line = {"index": index, "status": 200, **results[index]}
+        lines.append(json.dumps(line) + "\n")
+    return lines
+
+
+async def stream_moderation(items, model_name):
+    chunk, index = [], 0
+    async for text, error in items:
+        chunk.append((index, text, error))
+        index += 1
+        if len(chunk) >= batcher.max_batch_size:
+            for line in await score_chunk(chunk, model_name):
+                yield line
+            chunk = []
+    if chunk:
+        for line in await score_chunk(chunk, model_name):
+            yield line
+
+
+@app.post("/api/moderate/batch")
+async def moderate_batch(request: Request):
+    """Bulk moderation. The model comes from the JSON `model` field or, for NDJSON, `?model=`."""
+    require_model()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+
+    if content_type in NDJSON_TYPES:
+        model_name = requested_model(request.query_params.get("model"))
+        items = iter_ndjson_lines(await spool_body(request))
+    elif content_type == "application/json":
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid JSON")
+        if not isinstance(body, dict):
+            raise HTTPException(status_code=400, detail="Invalid payload")
+        texts = body.get("texts")
+        if texts is None:
+            raise HTTPException(status_code=400, detail="Missing 'texts' field")
+        if not isinstance(texts, list):
+            raise HTTPException(status_code=400, detail="Texts must be a list")
+        model_name = requested_model(body.get("model"))
+        items = iter_json_texts(texts)
+    else:
+        raise HTTPException(status_code=415, detail="Unsupported Media Type: JSON or NDJSON required")
+
+    return StreamingResponse(stream_moderation(items, model_name), media_type="application/x-ndjson")
+
+# LIVE MODERATION
+# Clients send {"text": ..., "model"?: ..., "seq"?: ...} after every edit; once
+# typing pauses the server re-scores only the sentences that changed and pushes
+# the verdict back with the client's `seq`, so stale replies can be dropped.
+# Sentences are scored like /api/moderate: through the moderation cache and
+# micro-batcher, with sentences past the window size split into overlapping
+# token windows.
+LIVE_SENTENCES = Counter("live_sentences_total", "Sentences handled by /ws/moderate, by whether they were scored")
+live_connections = 0
+Callback("live_connections", "Open /ws/moderate connections", lambda: live_connections)
+
+
+async def live_update(session, raw):
+    try:
+        message = json.loads(raw)
+    except json.JSONDecodeError:
+        return {"error": "Invalid JSON"}
+    if not isinstance(message, dict):
+        return {"error": "Invalid payload"}
+
+    reply = {"seq": message["seq"]} if "seq" in message else {}
+    text = message.get("text")
     if text is None:
-        raise HTTPException(status_code=400, detail="Missing 'text' field")
+        return {**reply, "error": "Missing 'text' field"}
     if not isinstance(text, str):
-        raise HTTPException(status_code=400, detail="Text must be a string")
-    if not text.strip():
-        raise HTTPException(status_code=400, detail="Text required")
+        return {**reply, "error": "Text must be a string"}
+    if len(text) > WS_MAX_TEXT_CHARS:
+        return {**reply, "error": f"Text longer than {WS_MAX_TEXT_CHARS} characters"}
 
     try:
-        results = model.predict(text)
-        clean_results = {k: float(v) for k, v in results.items()}
-        toxicity_label = "toxic" if clean_results["toxicity"] > 0.5 else "non-toxic"
-
-        return {
-            "text": text,
-            "toxicity": toxicity_label,
-            "toxicity_scores": clean_results
-        }
+        model_name = requested_model(message.get("model"))
+        require_model()
+        await ensure_loaded(model_name)
+        result = await session.update(text, model_name)
+    except HTTPException as e:
+        retry_after = (e.headers or {}).get("Retry-After")
+        return {**reply, "error": e.detail, **({"retry_after": int(retry_after)} if retry_after else {})}
+    except InferenceQueueFull as e:
+        return {**reply, "error": "Moderation queue full, retry later", "retry_after": e.retry_after}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Moderation failed: {str(e)}")
+        return {**reply, "error": f"Moderation failed: {str(e)}"}
+
+    LIVE_SENTENCES.inc(result["rescored"], result="scored")
+    LIVE_SENTENCES.inc(result["reused"], result="reused")
+    return {**reply, **result}
+
+
+@app.websocket("/ws/moderate")
+async def moderate_live(websocket: WebSocket):
+    global live_connections
+    await websocket.accept()
+    live_connections += 1
+    session = LiveSession(score_sentences)
+    updates = debounced(websocket.receive_text)
+    try:
+        async for raw in updates:
+            await websocket.send_json(await live_update(session, raw))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_connections -= 1
+        await updates.aclose()
+
+# MODERATION JOBS
+# Large documents are submitted as jobs (JOBS_DB, a sqlite queue that survives
+# restarts) and polled, so no connection stays open for the whole run. Jobs are
+# scored chunk by chunk as background work: a chunk only reaches the inference
+# pool while INFERENCE_RESERVED_WORKERS workers are idle, so interactive
+# /api/moderate requests never queue behind a job.
+job_store = JobStore()
+
+
+async def run_job(job_id, model_name, texts, report):
+    results = []
+    for offset in range(0, len(texts), batcher.max_batch_size):
+        chunk = texts[offset:offset + batcher.max_batch_size]
+        results.extend(await score_documents(chunk, model_name, background=True))
+        await report(offset + len(chunk))
+    return results
+
+
+async def model_loaded():
+    while not model_ready.is_set():
+        ensure_model_loading()
+        await asyncio.sleep(MODEL_RETRY_AFTER)
+
+
+job_workers = JobWorkers(job_store, run_job, ready=model_loaded)
+Callback("moderation_jobs_completed_total", "Moderation jobs finished by this process", lambda: job_workers.completed, type="counter")
+Callback("moderation_jobs_failed_total", "Moderation jobs that failed in this process", lambda: job_workers.failed, type="counter")
+
+
+@app.post(
+    "/api/moderate/jobs",
+    status_code=202,
+    response_model=JobSubmitted,
+    responses=error_responses(400),
+    openapi_extra=request_body(JobRequest),
+)
+async def submit_job(request: Request, response: Response):
+    body = await parse_body(request, JobRequest, JOB_ERRORS)
+    model_name = requested_model(body.model)
+    texts = [body.text] if body.text is not None else body.texts
+    job_id = await asyncio.to_thread(job_store.submit, texts, model_name, body.priority, body.text is not None)
+    job_workers.notify()
+    response.headers["Location"] = f"/api/moderate/jobs/{job_id}"
+    return JobSubmitted(id=job_id)
+
+
+@app.get(
+    "/api/moderate/jobs/{job_id}",
+    response_model=JobStatus,
+    response_model_exclude_none=True,
+    responses=error_responses(404),
+)
+async def get_job(job_id: str):
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# HEALTH
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    if model_ready.is_set():
+        return {"status": "ready", "model": MODEL_NAME, "backend": BACKEND}
+    body = {"status": "failed" if model_error else "loading", "model": MODEL_NAME}
+    if model_error:
+        body["error"] = model_error
+    return JSONResponse(status_code=503, content=body, headers={"Retry-After": str(MODEL_RETRY_AFTER)})
+
+# METRICS
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+# STATS
+@app.get("/api/moderate/stats")
+async def moderate_stats():
+    return {
+        "queue": inference_pool.stats(),
+        "cache": cache.stats(),
+        "models": registry.stats(),
+        "padding": padding.stats(),
+        "singleflight": inflight.stats(),
+        "jobs": job_store.counts(),
+    }
 
+# Development server; for production run `python serve.py --workers N` instead
 if __name__ == "__main__":
     uvicorn.run("api:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
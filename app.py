@@ -1,10 +1,49 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import requests
 import pandas as pd
+import html
 import os
-from pathlib import Path
+
+from timing import parse_server_timing
 
 BACKEND_URL = "http://127.0.0.1:8000"
+PAGE_SIZES = [25, 50, 100, 200]  # Test Insights rows per page
+
+LIVE_MODERATION_HTML = """
+<textarea id="live" rows="6" style="width:100%;font-size:15px" placeholder="Start typing..."></textarea>
+<p id="verdict" style="font-family:sans-serif;font-weight:bold">Connecting...</p>
+<div id="sentences" style="font-family:sans-serif;line-height:1.6"></div>
+<script>
+const box = document.getElementById("live"), verdict = document.getElementById("verdict"),
+      list = document.getElementById("sentences");
+let seq = 0, sent = "", ws;
+function connect() {
+  ws = new WebSocket("WS_URL");
+  ws.onopen = () => { verdict.textContent = "Connected"; if (box.value) send(); };
+  ws.onclose = () => { verdict.textContent = "Disconnected, retrying..."; setTimeout(connect, 2000); };
+  ws.onmessage = (event) => {
+    const reply = JSON.parse(event.data);
+    if (reply.seq !== seq) return;  // an older edit; a newer verdict is on its way
+    if (reply.error) { verdict.textContent = "Error: " + reply.error; return; }
+    verdict.textContent = reply.toxicity === "toxic" ? "🚨 Toxic" : "✅ Safe";
+    verdict.title = `${reply.rescored} sentence(s) scored, ${reply.reused} reused`;
+    list.replaceChildren(...reply.sentences.map((s) => {
+      const span = document.createElement("span");
+      span.textContent = sent.slice(s.start, s.end) + " ";
+      span.title = "toxicity " + s.score.toFixed(3);
+      if (s.toxicity === "toxic") span.style.background = "#ffd6d6";
+      return span;
+    }));
+  };
+}
+function send() {
+  if (ws.readyState === 1) { sent = box.value; ws.send(JSON.stringify({seq: ++seq, text: sent})); }
+}
+box.addEventListener("input", send);
+connect();
+</script>
+"""
 
 st.set_page_config(page_title="Login Demo", layout="centered")
 
@@ -96,6 +135,15 @@ elif page == "Dashboard":
 elif page == "Content Moderation":
     st.title("🛡️ Content Moderation with Detoxify")
 
+    # Live mode talks to /ws/moderate straight from the browser: edits are
+    # debounced server-side and only changed sentences are re-scored
+    if st.toggle("Live mode (moderate as you type)"):
+        components.html(
+            LIVE_MODERATION_HTML.replace("WS_URL", BACKEND_URL.replace("http", "ws", 1) + "/ws/moderate"),
+            height=320,
+        )
+        st.stop()
+
     user_input = st.text_area("Enter text to check for toxicity:")
     if st.button("Moderate Text"):
         if user_input.strip():
@@ -108,6 +156,17 @@ elif page == "Content Moderation":
                     else:
                         st.success("✅ This text is **Safe**.")
                     st.json(result)
+
+                    # Per-phase server latency from the Server-Timing header
+                    timings = parse_server_timing(response.headers.get("Server-Timing", ""))
+                    if timings:
+                        total = timings.pop("total", None)
+                        with st.expander(f"⏱️ Server latency: {total:.1f} ms" if total else "⏱️ Server latency"):
+                            st.bar_chart(pd.Series(timings, name="ms"))
+                            st.dataframe(
+                                pd.DataFrame({"Phase": list(timings), "Duration (ms)": list(timings.values())}),
+                                hide_index=True,
+                            )
                 else:
                     st.error(f"Server error: {response.status_code}")
             except Exception as e:
@@ -117,129 +176,43 @@ elif page == "Content Moderation":
 
 # TEST INSIGHTS PAGE
 elif page == "Test Insights":
-    import re
-    import pandas as pd
-    from fuzzywuzzy import fuzz, process
-    import os
-    from pathlib import Path
-    import streamlit as st
+    from discovery import discover
+    from insights import (
+        build_insights,
+        facets,
+        filter_tests,
+        get_test_description,
+        page_of,
+        tools_of,
+        write_csv_if_changed,
+    )
+    from results_store import ResultsStore
 
     st.title("🧩 Unified Test Insights Dashboard")
     st.caption("Automatically generated by analyzing test source files across all tools.")
 
-    # Correct mapping: tool_label -> file_path
-    BASE_DIR = Path(__file__).resolve().parent
-
-    TEST_PATHS = {
-        "Pytest (Login)": BASE_DIR / "tests/api/test_login.py",
-        "Pytest (Moderation)": BASE_DIR / "tests/api/test_moderate.py",
-        "Postman": BASE_DIR / "tests/postman/collection.json",
-        "Playwright Login": BASE_DIR / "tests/ui/test_ui_login.py",
-        "Groq": BASE_DIR / "tests/generated/openapi_stubs_groq.py",
-        "Ollama": BASE_DIR / "tests/generated/openapi_stubs_ollama.py",
-        "Playwright Streamlit": BASE_DIR / "tests/ui/test_streamlit_ui.py"
-    }
-
-    # Extract test names from each file
-    def extract_test_names(file_path):
-        tests = []
-        try:
-            if file_path.endswith(".json"):
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read().lower()
-                matches = re.findall(r'"name":\s*"([^"]+)"', content)
-                for m in matches:
-                    if any(k in m for k in ["login", "moderate", "protected"]):
-                        tests.append(m.strip())
-            else:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                matches = re.findall(r"def\s+(test_[a-zA-Z0-9_]+)", content)
-                tests.extend(matches)
-        except Exception as e:
-            st.warning(f"Could not parse {file_path}: {e}")
-        return tests
-
-    # Read tests from all files
-    all_tests = []
-    for label, path in TEST_PATHS.items():
-        if not path.exists():
-            st.warning(f"⚠️ Missing file: {path}")
-            continue
-        for t in extract_test_names(str(path)):
-            all_tests.append({"Test": t, "Tool": label})
-
-    if not all_tests:
-        st.error("No test files found or parsed.")
-        st.stop()
-
-    df = pd.DataFrame(all_tests)
-
-    # Normalize test names
-    def normalize_name(name):
-        name = name.replace("test_", "").replace("_", " ").strip().title()
-        name = name.replace("Valid", "Success").replace("Wrong", "Failure (Wrong Credentials)")
-        name = name.replace("Fields", "Invalid Input / Fields")
-        # Fix duplicate pattern like "Failure (Failure (Wrong Credentials) Credentials)"
-        name = re.sub(r"Failure\s*\(Failure\s*\(Wrong Credentials\)\s*Credentials\)", "Failure (Wrong Credentials)", name)
-        name = name.replace("Ollama", "").replace("Groq", "").strip()
-        return name
-
-    df["Readable"] = df["Test"].apply(normalize_name)
-
-    # Fuzzy-merge similar tests (threshold 80 instead of 85)
-    unique_names, canonical_map = [], {}
-    for name in df["Readable"]:
-        match = process.extractOne(name, unique_names, scorer=fuzz.token_sort_ratio)
-        if match and match[1] > 80:
-            canonical_map[name] = match[0]
-        else:
-            unique_names.append(name)
-            canonical_map[name] = name
-    df["Canonical"] = df["Readable"].map(canonical_map)
-
-    # Merge tools for same test
-    merged = (
-        df.groupby("Canonical")
-        .agg({"Tool": lambda x: ", ".join(sorted(set(x)))})
-        .reset_index()
-    )
-
-    # Determine correct area/layer
-    def get_area(name: str):
-        n = name.lower()
-
-        # Backend APIs always take priority
-        if any(k in n for k in ["login", "protected", "moderate"]):
-            return "Backend (Auth/API)" if "moderate" not in n else "Backend (Toxicity / Model)"
-
-        # AI analysis or failure diagnostics
-        if any(k in n for k in ["ai failure", "analyzer", "groq", "ollama"]) and not any(
-            k in n for k in ["login", "protected", "moderate"]
-        ):
-            return "Cloud AI (Groq)" if "groq" in n else "Local AI (Ollama)"
-
-        # Frontend UI tests
-        if any(k in n for k in ["ui", "page", "logout", "navigation"]):
-            return "Frontend (UI)"
+    @st.cache_resource
+    def get_results_store():
+        return ResultsStore()
 
-        # Default catch-all
-        return "Misc"
+    # Merging only reruns when the discovered tests or the report artifacts change;
+    # widget interactions on this page reuse the cached table
+    @st.cache_data(show_spinner=False, max_entries=32)
+    def load_insights(found, results_version):
+        merged, problems = build_insights(found, get_results_store().latest())
+        return merged, None if merged is None else facets(merged), problems
 
-    merged["Layer / Area"] = merged["Canonical"].apply(get_area)
-    merged["Status"] = "✅ Passed"
-    merged["Tools That Ran This Test"] = merged["Tool"].apply(
-        lambda t: "  ".join([f"✅ {x}" for x in t.split(", ")])
-    )
-    merged = merged.drop(columns=["Tool"])
+    results_store = get_results_store()
+    merged, filter_options, problems = load_insights(discover(), results_store.ingest())
+    for problem in problems + results_store.errors():
+        st.warning(problem)
 
-    # Final formatting
-    merged.insert(0, "Index", range(1, len(merged) + 1))
-    merged = merged[["Index", "Canonical", "Layer / Area", "Tools That Ran This Test", "Status"]]
-    merged.columns = ["Index", "Test Name", "Layer / Area", "Tools That Ran This Test", "Status"]
+    if merged is None:
+        st.error("No test files found or parsed.")
+        st.stop()
 
-    # Save CSV for record
-    merged.to_csv("final_unified_tests.csv", index=False)
+    # Save CSV for record (skipped when the content is unchanged)
+    write_csv_if_changed(merged)
 
     # Display metrics at the top
     total_tests = len(merged)
@@ -259,14 +232,6 @@ elif page == "Test Insights":
     # 🔹 Display main test table without horizontal scrolling
     st.subheader("📋 Consolidated Test Overview")
 
-    # Convert DataFrame to clean HTML table
-    html_table = merged.to_html(
-        index=False,
-        classes="styled-table",
-        border=0,
-        escape=False
-    )
-
     # Custom CSS for auto-fit, wrapping, and vertical scroll only
     st.markdown("""
     <style>
@@ -299,60 +264,54 @@ elif page == "Test Insights":
     </style>
     """, unsafe_allow_html=True)
 
+    # Search, filters and paging run here; only the visible page is sent to the browser
+    layer_options, tool_options, status_options = filter_options
+    search = st.text_input("🔍 Search test names", key="insights_search")
+    with st.expander("Filters"):
+        layers = st.pills("Layer / Area", layer_options, selection_mode="multi", key="insights_layers")
+        statuses = st.pills("Status", status_options, selection_mode="multi", key="insights_statuses")
+        tools = st.pills("Tool", tool_options, selection_mode="multi", key="insights_tools")
+    matching = filter_tests(merged, layers, tools, statuses, search)
+
+    col_size, col_page, col_info = st.columns([2, 1, 2])
+    with col_size:
+        page_size = st.radio("Rows per page", PAGE_SIZES, index=1, horizontal=True, key="insights_page_size")
+    pages = max(1, -(-len(matching) // page_size))
+    if st.session_state.get("insights_page", 1) > pages:
+        st.session_state["insights_page"] = pages  # filters shrank the result
+    with col_page:
+        page_number = st.number_input("Page", min_value=1, max_value=pages, step=1, key="insights_page")
+    rows, page_number, pages = page_of(matching, page_number, page_size)
+    with col_info:
+        first = (page_number - 1) * page_size
+        st.caption(f"Showing {first + 1 if len(rows) else 0}–{first + len(rows)} of {len(matching)} "
+                   f"matching tests · page {page_number} of {pages}")
+
+    html_table = rows.to_html(
+        index=False,
+        classes="styled-table",
+        border=0,
+        escape=True  # test names and tools come from the database, not from us
+    )
     st.markdown(f"<div class='report-container'>{html_table}</div>", unsafe_allow_html=True)
 
 # 🔍 Detailed Test Insight Section
     st.divider()
     st.subheader("🔎 View Detailed Test Insight")
 
-    # Dropdown to select test
+    if rows.empty:
+        st.info("No tests match the current search and filters.")
+        st.stop()
+
+    # Dropdown to select test (from the visible page)
     selected_test = st.selectbox(
         "Select a test case to view details:",
-        merged["Test Name"].tolist(),
+        rows["Test Name"].tolist(),
         index=0
     )
 
     # Fetch selected row
-    test_row = merged[merged["Test Name"] == selected_test].iloc[0]
-
-    # Dynamic explanation logic
-    def get_test_description(name, layer):
-        n = name.lower()
-        if "login" in n:
-            if "failure" in n:
-                return "This test validates the system’s response to failed login attempts — ensuring authentication rejects incorrect or missing credentials safely."
-            elif "success" in n:
-                return "This test verifies successful login flow using valid credentials and ensures user session is correctly established."
-            elif "blank" in n or "missing" in n:
-                return "Checks for proper error handling when username or password fields are missing or empty."
-            elif "sql" in n:
-                return "Ensures backend resilience against SQL injection attempts in login inputs."
-            else:
-                return "General login-related validation test ensuring authentication reliability."
-        elif "moderate" in n:
-            if "toxic" in n:
-                return "Tests whether the content moderation engine correctly identifies toxic language."
-            elif "clean" in n:
-                return "Ensures safe or non-toxic text is accepted as clean."
-            elif "empty" in n:
-                return "Checks system behavior for empty or missing moderation text fields."
-            else:
-                return "General moderation API validation, ensuring accurate text toxicity detection."
-        elif "protected" in n:
-            if "expired" in n:
-                return "Verifies that expired tokens are correctly rejected by secure endpoints."
-            elif "invalid" in n:
-                return "Ensures proper 401 Unauthorized responses for invalid tokens."
-            elif "missing" in n:
-                return "Checks that missing authorization headers are correctly handled."
-            else:
-                return "Tests general authorization validation logic for protected endpoints."
-        elif "logout" in n:
-            return "Validates logout process, ensuring user sessions are terminated properly and access tokens are invalidated."
-        elif "ui" in n or "page" in n:
-            return "Tests frontend UI behavior — verifying visibility, navigation, and interaction consistency."
-        else:
-            return "General functional or integration test ensuring system reliability."
+    test_row = rows[rows["Test Name"] == selected_test].iloc[0]
 
     # Display information
     st.markdown(f"### 🧾 {test_row['Test Name']}")
@@ -361,9 +320,8 @@ elif page == "Test Insights":
 
     # Tools formatting with badges
     tools_html = "".join(
-        f"<span style='background-color:#e6f7ff; color:#007acc; padding:3px 8px; border-radius:8px; margin-right:5px;'>✅ {t.strip()}</span>"
-        for t in test_row["Tools That Ran This Test"].split("✅ ")
-        if t.strip()
+        f"<span style='background-color:#e6f7ff; color:#007acc; padding:3px 8px; border-radius:8px; margin-right:5px;'>✅ {html.escape(t)}</span>"
+        for t in tools_of(test_row["Tools That Ran This Test"])
     )
     st.markdown(f"**Tools That Ran This Test:**<br>{tools_html}", unsafe_allow_html=True)
 
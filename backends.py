@@ -0,0 +1,275 @@
+# Inference backends for the Detoxify moderation model
+#
+#   torch      eager PyTorch, identical to Detoxify.predict (reference)
+#   quantized  dynamic int8 quantization of every nn.Linear (CPU only)
+#   onnx       exported graph run by ONNX Runtime (needs onnx + onnxruntime)
+#
+# Every backend exposes the Detoxify surface the API relies on: `predict`,
+# `tokenizer` and `class_names`, plus `score_batch`, which the API uses to run
+# length-bucketed forward passes. Run `python backends.py --backend onnx` to
+# compare a backend against eager PyTorch for accuracy, latency and memory.
+import argparse
+import os
+import statistics
+import time
+from pathlib import Path
+
+from batching import LENGTH_BUCKETS, MAX_BATCH_SIZE, bucket_by_length
+from timing import phase
+
+BACKENDS = ("torch", "quantized", "onnx")
+BACKEND = os.environ.get("MODERATION_BACKEND", "torch")
+ONNX_DIR = Path(os.environ.get("MODERATION_ONNX_DIR", ".cache/onnx"))
+PARITY_TOLERANCE = float(os.environ.get("MODERATION_PARITY_TOLERANCE", "0.02"))
+
+PARITY_TEXTS = [
+    "Hello friend, how are you?",
+    "You are stupid and ugly",
+    "@#$%^&*()!!!",
+    "123456",
+    "<script>alert('xss')</script>",
+    "I will find you and hurt you",
+    "Thanks for the quick reply, that fixed it.",
+    "good " * 200,
+]
+
+
+class TorchBackend:
+    """Eager PyTorch inference with the exact pre/post-processing of Detoxify.predict."""
+
+    name = "torch"
+
+    def __init__(self, detox):
+        self.model = detox.model.eval()
+        self.tokenizer = detox.tokenizer
+        self.class_names = detox.class_names
+        self.device = detox.device
+
+    def encode(self, texts):
+        return self.tokenizer(texts, return_tensors="pt", truncation=True, padding=True).to(self.device)
+
+    def pad(self, features):
+        return self.tokenizer.pad(features, return_tensors="pt").to(self.device)
+
+    def forward(self, inputs):
+        """Returns sigmoid scores as a (batch, labels) numpy array."""
+        import torch
+
+        with torch.no_grad():
+            out = self.model(**inputs)[0]
+        return torch.sigmoid(out).cpu().numpy()
+
+    def size_mb(self):
+        """Approximate resident size of the weights (used by the model registry budget)."""
+        return sum(_tensor_bytes(value) for value in self.model.state_dict().values()) / 2**20
+
+    def predict(self, text):
+        texts = [text] if isinstance(text, str) else list(text)
+        scores = self.forward(self.encode(texts))
+        if isinstance(text, str):
+            return {label: float(scores[0][i]) for i, label in enumerate(self.class_names)}
+        return {label: [float(row[i]) for row in scores] for i, label in enumerate(self.class_names)}
+
+    def score_batch(self, texts, boundaries=LENGTH_BUCKETS, max_rows=MAX_BATCH_SIZE, padding=None):
+        """Scores texts in length buckets; returns one score dict per text, in input order.
+
+        Texts are tokenized once without padding, grouped by token length and
+        each group is padded only to its own longest member. `padding`, if
+        given, is a batching.PaddingStats that records every forward pass.
+        """
+        with phase("tokenize"):
+            encoded = self.tokenizer(list(texts), truncation=True)
+        lengths = [len(ids) for ids in encoded["input_ids"]]
+        results = [None] * len(lengths)
+        for bound, indexes in bucket_by_length(lengths, boundaries, max_rows):
+            with phase("tokenize"):
+                features = self.pad({key: [encoded[key][i] for i in indexes] for key in encoded.keys()})
+            with phase("forward"):
+                scores = self.forward(features)
+            if padding is not None:
+                padding.record(bound, [lengths[i] for i in indexes])
+            for i, row in zip(indexes, scores):
+                results[i] = {label: float(row[j]) for j, label in enumerate(self.class_names)}
+        return results
+
+
+class QuantizedBackend(TorchBackend):
+    """Dynamic int8 quantization: Linear weights stored as int8, activations quantized per batch."""
+
+    name = "quantized"
+
+    def __init__(self, detox):
+        import torch
+
+        super().__init__(detox)
+        if self.device != "cpu":
+            raise ValueError("The quantized backend only runs on CPU")
+        self.model = torch.quantization.quantize_dynamic(
+            self.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+
+class OnnxBackend(TorchBackend):
+    """Runs an ONNX export of the classifier through ONNX Runtime.
+
+    The graph is exported once per model name into MODERATION_ONNX_DIR and
+    reused by later processes.
+    """
+
+    name = "onnx"
+
+    def __init__(self, detox, model_name):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise RuntimeError("MODERATION_BACKEND=onnx requires `pip install onnx onnxruntime`") from e
+
+        super().__init__(detox)
+        self.input_names = list(self.tokenizer(["export"], return_tensors="np").keys())
+        path = self.path = ONNX_DIR / f"{model_name}.onnx"
+        if not path.exists():
+            export_onnx(detox, self.input_names, path)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            str(path), options, providers=["CPUExecutionProvider"]
+        )
+        self.model = None  # the torch weights are not needed once the session exists
+
+    def encode(self, texts):
+        return self.tokenizer(texts, return_tensors="np", truncation=True, padding=True)
+
+    def pad(self, features):
+        return self.tokenizer.pad(features, return_tensors="np")
+
+    def forward(self, inputs):
+        import numpy as np
+
+        feed = {name: inputs[name].astype(np.int64) for name in self.input_names}
+        logits = self.session.run(["logits"], feed)[0]
+        return 1 / (1 + np.exp(-logits))
+
+    def size_mb(self):
+        return self.path.stat().st_size / 2**20
+
+
+def _tensor_bytes(value):
+    # Dynamic-quantized Linear layers store (weight, bias) tuples in their state dict
+    if isinstance(value, (tuple, list)):
+        return sum(_tensor_bytes(v) for v in value)
+    if hasattr(value, "element_size"):
+        return value.numel() * value.element_size()
+    return 0
+
+
+def export_onnx(detox, input_names, path):
+    import torch
+
+    class LogitsOnly(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *tensors):
+            return self.model(**dict(zip(input_names, tensors)))[0]
+
+    dummy = detox.tokenizer(["export this text", "and this one"], return_tensors="pt", padding=True)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+    torch.onnx.export(
+        LogitsOnly(detox.model.eval().cpu()),
+        tuple(dummy[name] for name in input_names),
+        str(path),
+        input_names=input_names,
+        output_names=["logits"],
+        dynamic_axes=dynamic_axes,
+        opset_version=14,
+    )
+
+
+def load_backend(model_name, backend=BACKEND):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+
+    from detoxify import Detoxify
+
+    detox = Detoxify(model_name, device="cpu")
+    if backend == "quantized":
+        return QuantizedBackend(detox)
+    if backend == "onnx":
+        return OnnxBackend(detox, model_name)
+    return TorchBackend(detox)
+
+
+def check_parity(candidate, reference, texts=PARITY_TEXTS, tolerance=PARITY_TOLERANCE):
+    """Compares candidate scores with the reference backend on the same texts."""
+    got = candidate.predict(texts)
+    expected = reference.predict(texts)
+    max_diff = {
+        label: max(abs(a - b) for a, b in zip(got[label], expected[label]))
+        for label in expected
+    }
+    agreement = sum(
+        (a > 0.5) == (b > 0.5) for a, b in zip(got["toxicity"], expected["toxicity"])
+    ) / len(texts)
+    return {
+        "max_abs_diff": max_diff,
+        "label_agreement": agreement,
+        "ok": max(max_diff.values()) <= tolerance and agreement == 1.0,
+    }
+
+
+def measure_latency(backend, texts, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        backend.predict(texts)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float("nan")
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a moderation backend against eager PyTorch")
+    parser.add_argument("--model", default=os.environ.get("MODERATION_MODEL", "original"))
+    parser.add_argument("--backend", choices=BACKENDS, default="onnx")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=8)
+    args = parser.parse_args()
+
+    texts = (PARITY_TEXTS * args.batch)[:args.batch]
+
+    # Measure the candidate first so its RSS is not inflated by the reference model
+    before = rss_mb()
+    candidate = load_backend(args.model, args.backend)
+    candidate_rss = rss_mb() - before
+    candidate.predict(texts)
+    candidate_p50 = measure_latency(candidate, texts, args.runs)
+
+    reference = load_backend(args.model, "torch")
+    reference.predict(texts)
+    reference_p50 = measure_latency(reference, texts, args.runs)
+
+    parity = check_parity(candidate, reference)
+    print(f"backend={args.backend} model={args.model} batch={args.batch}")
+    print(f"p50 latency: {candidate_p50:.1f} ms (torch {reference_p50:.1f} ms, {reference_p50 / candidate_p50:.2f}x)")
+    print(f"RSS added by backend: {candidate_rss:.0f} MB")
+    for label, diff in parity["max_abs_diff"].items():
+        print(f"  {label:<18} max |diff| = {diff:.4f}")
+    print(f"label agreement: {parity['label_agreement']:.0%}")
+    print("PARITY OK" if parity["ok"] else f"PARITY FAILED (tolerance {PARITY_TOLERANCE})")
+    raise SystemExit(0 if parity["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# Micro-batching for moderation inference
+import asyncio
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+
+import timing
+
+# Tunables (env overrides so load tests can sweep them without code changes)
+MAX_BATCH_SIZE = int(os.environ.get("MODERATION_MAX_BATCH_SIZE", "32"))
+MAX_WAIT_MS = float(os.environ.get("MODERATION_MAX_WAIT_MS", "5"))
+# Upper token-length bound of each padding bucket; longer inputs share the last bucket
+LENGTH_BUCKETS = tuple(
+    int(bound) for bound in os.environ.get("MODERATION_LENGTH_BUCKETS", "16,32,64,128,256,512").split(",")
+    if bound.strip()
+)
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-text requests into one list batch.
+
+    Callers `await submit(text)` and get back their own slice of the batch
+    result. A batch is flushed when it reaches `max_batch_size` or when the
+    first queued text has waited `max_wait_ms`, whichever comes first.
+    `predict_batch` may be a plain function or a coroutine function.
+
+    Each caller's request is charged the time its text sat in the batch
+    ("batch" phase) plus every phase the shared predict_batch call recorded.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self._loop = None
+        self._pending = {}  # extra args (e.g. model name) -> [(text, future, caller phases, queued at)]
+        self._timers = {}
+        self._tasks = set()  # the loop only keeps weak references to running batches
+
+    async def submit(self, text, *args):
+        """Queues `text`; extra args are passed to predict_batch and only equal args share a batch."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # TestClient may drive each request on a fresh loop; futures must not cross loops
+            self._loop, self._pending, self._timers = loop, {}, {}
+
+        future = loop.create_future()
+        pending = self._pending.setdefault(args, [])
+        pending.append((text, future, timing.current(), time.perf_counter()))
+        if len(pending) >= self.max_batch_size:
+            self._flush(args)
+        elif args not in self._timers:
+            self._timers[args] = loop.call_later(self.max_wait, self._flush, args)
+        return await future
+
+    def _flush(self, args):
+        timer = self._timers.pop(args, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(args, [])
+        if batch:
+            task = self._loop.create_task(self._run(batch, args))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch, args):
+        texts = [text for text, *_ in batch]
+        flushed, error = time.perf_counter(), None
+        # This task serves many requests, so collect the shared phases and charge them to each caller
+        with timing.collect() as phases:
+            try:
+                results = self.predict_batch(texts, *args)
+                if inspect.isawaitable(results):
+                    results = await results
+            except Exception as e:
+                error = e
+
+        for _, _, caller, queued in batch:
+            if caller is not None:
+                timing.record("batch", flushed - queued, caller)
+                timing.merge(phases, caller)
+        if error is not None:
+            for _, future, *_ in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        for (_, future, *_), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+def bucket_by_length(lengths, boundaries=LENGTH_BUCKETS, max_rows=MAX_BATCH_SIZE):
+    """Groups indexes into forward passes of similar token length.
+
+    Each index goes to the first bucket whose bound is >= its length; within a
+    bucket indexes are sorted by length and split into passes of at most
+    `max_rows`, so one long text never pads a pass full of short ones.
+    Returns (bound, [indexes]) pairs; callers scatter results back by index.
+    """
+    boundaries = sorted(boundaries)
+    buckets = {}
+    for index, length in enumerate(lengths):
+        slot = min(bisect_left(boundaries, length), len(boundaries) - 1) if boundaries else 0
+        buckets.setdefault(slot, []).append(index)
+
+    groups = []
+    max_rows = max(1, int(max_rows))
+    for slot in sorted(buckets):
+        indexes = sorted(buckets[slot], key=lengths.__getitem__)
+        bound = boundaries[slot] if boundaries else None
+        groups.extend((bound, indexes[i:i + max_rows]) for i in range(0, len(indexes), max_rows))
+    return groups
+
+
+class PaddingStats:
+    """Real vs padded tokens fed to the model, to tune LENGTH_BUCKETS.
+
+    Efficiency is real / padded tokens: 1.0 means no padding at all. `rows`
+    counts texts per bucket bound so skewed buckets are easy to spot.
+    """
+
+    def __init__(self):
+        self.real_tokens = 0
+        self.padded_tokens = 0
+        self.passes = 0
+        self.rows = {}
+        self._lock = threading.Lock()
+
+    def record(self, bound, lengths):
+        with self._lock:
+            self.real_tokens += sum(lengths)
+            self.padded_tokens += max(lengths) * len(lengths)
+            self.passes += 1
+            self.rows[bound] = self.rows.get(bound, 0) + len(lengths)
+
+    @property
+    def efficiency(self):
+        return self.real_tokens / self.padded_tokens if self.padded_tokens else 1.0
+
+    def stats(self):
+        return {
+            "boundaries": list(LENGTH_BUCKETS),
+            "real_tokens": self.real_tokens,
+            "padded_tokens": self.padded_tokens,
+            "efficiency": round(self.efficiency, 4),
+            "passes": self.passes,
+            "rows_per_bucket": {str(bound): rows for bound, rows in sorted(self.rows.items())},
+        }
@@ -0,0 +1,90 @@
+# Test name canonicalization: bulk scorer vs the original fuzzywuzzy loop
+#
+#   python benchmarks/bench_canonicalize.py --sizes 10000 100000 --reference-max 10000
+#
+# Synthetic suites mimic what the Test Insights page merges: the same tests
+# seen by several tools, with reordered words, tool suffixes, casing and
+# typos. The fuzzywuzzy loop (one extractOne per name) only runs up to
+# --reference-max names because it is quadratic; where it runs, the groups
+# must be identical.
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from canonicalize import MERGE_THRESHOLD, canonical_map  # noqa: E402
+
+AREAS = ["login", "logout", "moderate", "protected", "token", "session", "profile", "upload", "search", "report"]
+CASES = ["success", "failure", "expired", "missing", "invalid", "empty", "toxic", "clean", "blank", "sql injection",
+         "unicode", "long text", "rate limited", "timeout", "retry", "page", "ui", "api", "batch", "cache"]
+SUFFIXES = ["", "", "", " ui", " api", " (wrong credentials)", " groq", " ollama", " v2"]
+
+
+def synthetic_names(count, seed=0):
+    rng = random.Random(seed)
+    tests = max(count // 20, 10)  # each base test shows up ~20 times across tools and variants
+    bases = [
+        f"{rng.choice(AREAS)} {' '.join(rng.sample(CASES, rng.randint(1, 3)))} {n}"
+        for n in range(tests)
+    ]
+    names = []
+    for _ in range(count):
+        words = rng.choice(bases).split()
+        if rng.random() < 0.3:
+            rng.shuffle(words)
+        name = " ".join(words).title() + rng.choice(SUFFIXES)
+        if rng.random() < 0.1:
+            cut = rng.randrange(len(name))
+            name = name[:cut] + name[cut + 1:]
+        names.append(name)
+    return names
+
+
+def reference_map(names, threshold=MERGE_THRESHOLD):
+    from fuzzywuzzy import fuzz, process
+
+    # Without python-Levenshtein fuzzywuzzy falls back to difflib, which rounds differently
+    if fuzz.SequenceMatcher.__module__ != "fuzzywuzzy.StringMatcher":
+        sys.exit("the fuzzywuzzy reference needs python-Levenshtein: pip install fuzzywuzzy[speedup]")
+
+    unique_names, result = [], {}
+    for name in names:
+        match = process.extractOne(name, unique_names, scorer=fuzz.token_sort_ratio)
+        if match and match[1] > threshold:
+            result[name] = match[0]
+        else:
+            unique_names.append(name)
+            result[name] = name
+    return result
+
+
+def timed(fn, names):
+    start = time.perf_counter()
+    result = fn(names)
+    return result, time.perf_counter() - start
+
+
+def main(sizes, reference_max):
+    for size in sizes:
+        names = synthetic_names(size)
+        fast, fast_s = timed(canonical_map, names)
+        groups = len(set(fast.values()))
+        line = f"  {size:7d} names  {groups:6d} groups  bulk {fast_s:8.2f} s"
+        if size <= reference_max:
+            slow, slow_s = timed(reference_map, names)
+            assert slow == fast, "bulk canonicalization diverged from the fuzzywuzzy loop"
+            line += f"  fuzzywuzzy loop {slow_s:8.2f} s  ({slow_s / fast_s:5.1f}x, identical groups)"
+        else:
+            line += "  fuzzywuzzy loop skipped (--reference-max)"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark fuzzy canonicalization of test names")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--reference-max", type=int, default=10000)
+    args = parser.parse_args()
+    main(args.sizes, args.reference_max)
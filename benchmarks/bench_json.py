@@ -0,0 +1,115 @@
+# Request parsing / response serialization throughput
+#
+#   python benchmarks/bench_json.py --requests 3000 --concurrency 16
+#
+# Part 1 drives /api/login, /api/protected and /api/moderate in-process through
+# httpx's ASGI transport, with rate limits off and a cheap scrypt cost so the
+# numbers reflect the HTTP/JSON path. /api/moderate is primed once, so the
+# timed requests are cache hits and never reach the model. Run it on the
+# commit before the typed models for the "before" numbers.
+#
+# Part 2 isolates the JSON work per request: stdlib json + hand validation
+# versus Pydantic's model_validate_json / dump_json.
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("RATE_LIMITS", "")
+os.environ.setdefault("PASSWORD_SCRYPT_N", "16")
+
+LOGIN = {"username": "admin", "password": "password123"}
+TEXT = {"text": "Thanks for the quick reply, that fixed it."}
+
+
+async def drive(client, method, url, total, concurrency, **kwargs):
+    latencies = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return total / elapsed, statistics.median(latencies) * 1000
+
+
+async def bench_routes(total, concurrency):
+    import httpx
+
+    import api
+
+    api.wait_until_ready(timeout=600)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://bench") as client:
+        token = (await client.post("/api/login", json=LOGIN)).json()["token"]
+        await client.post("/api/moderate", json=TEXT)
+        routes = [
+            ("POST /api/login", "POST", "/api/login", {"json": LOGIN}),
+            ("GET /api/protected", "GET", "/api/protected", {"headers": {"Authorization": f"Bearer {token}"}}),
+            ("POST /api/moderate", "POST", "/api/moderate", {"json": TEXT}),
+        ]
+        for label, method, url, kwargs in routes:
+            rps, p50 = await drive(client, method, url, total, concurrency, **kwargs)
+            print(f"  {label:<20} {rps:8.0f} req/s  p50 {p50:6.2f} ms")
+
+
+def bench_codec(number):
+    try:
+        from schemas import LoginRequest, ModerateResponse
+    except ImportError:
+        print("  schemas.py not present on this commit; skipping")
+        return
+
+    body = json.dumps(LOGIN).encode()
+    result = {
+        "text": TEXT["text"],
+        "toxicity": "non-toxic",
+        "toxicity_scores": {label: 0.0012345 for label in (
+            "toxicity", "severe_toxicity", "obscene", "threat", "insult", "identity_attack"
+        )},
+    }
+
+    def stdlib_parse():
+        data = json.loads(body)
+        username, password = data.get("username", ""), data.get("password", "")
+        if not username or not password:
+            raise ValueError
+
+    adapter = ModerateResponse.__pydantic_serializer__
+    cases = [
+        ("parse login  json.loads + checks", stdlib_parse),
+        ("parse login  model_validate_json", lambda: LoginRequest.model_validate_json(body)),
+        ("encode result json.dumps", lambda: json.dumps(result).encode()),
+        ("encode result validate + dump_json", lambda: adapter.to_json(ModerateResponse.model_validate(result))),
+    ]
+    for label, fn in cases:
+        seconds = min(timeit.repeat(fn, number=number, repeat=5)) / number
+        print(f"  {label:<38} {seconds * 1e6:6.2f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the JSON request/response path")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--codec-iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"routes (in-process, {args.requests} requests, concurrency {args.concurrency}):")
+    asyncio.run(bench_routes(args.requests, args.concurrency))
+    print("per-request JSON work:")
+    bench_codec(args.codec_iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# Login throughput and latency at different scrypt costs
+#
+#   python benchmarks/bench_login.py --costs 12,14,15 --concurrency 32 --requests 400
+#
+# Drives POST /api/login through the ASGI app in-process (no network) for each
+# PASSWORD_SCRYPT_N = 2**cost. A ticker task measures how late the event loop
+# wakes up while logins are hashing: with hashing on the login pool this lag
+# stays near zero; run with --inline to see it when hashing blocks the loop.
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def measure_loop_lag(stop, interval=0.005):
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run(concurrency, total, inline):
+    import httpx
+
+    import api
+
+    if inline:
+        # Baseline: verify on the event loop, as a plain `def` check would
+        async def on_loop(username, password, wait=False):
+            return api.users.authenticate(username, password)
+
+        api.login_pool.predict = on_loop
+
+    api.users.authenticate("admin", "warm-up")  # opens the store and builds the dummy hash
+    transport = httpx.ASGITransport(app=api.app)
+    payload = {"username": "admin", "password": "password123"}
+    latencies = []
+    statuses = {}
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.post("/api/login", json=payload)
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        stop = asyncio.Event()
+        lag = asyncio.create_task(measure_loop_lag(stop))
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        worst_lag = await lag
+
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "loop_lag_ms": worst_lag * 1000,
+        "statuses": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /api/login at several scrypt costs")
+    parser.add_argument("--costs", default="12,14,15", help="comma-separated log2(N) values")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--inline", action="store_true", help="hash on the event loop (baseline)")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        # Cost settings are read at import time, so each cost runs in a fresh interpreter
+        result = asyncio.run(run(args.concurrency, args.requests, args.inline))
+        print(
+            f"N=2**{args.child:<3} {result['rps']:8.1f} logins/s  p50 {result['p50_ms']:7.1f} ms  "
+            f"p99 {result['p99_ms']:7.1f} ms  max loop lag {result['loop_lag_ms']:7.1f} ms  {result['statuses']}"
+        )
+        return
+
+    print(f"concurrency={args.concurrency} requests={args.requests} "
+          f"workers={os.environ.get('LOGIN_WORKERS', 'default')} inline={args.inline}")
+    for cost in (int(c) for c in args.costs.split(",")):
+        env = dict(os.environ, PASSWORD_SCRYPT_N=str(2**cost), USER_DB=":memory:")
+        command = [sys.executable, __file__, "--child", str(cost),
+                   "--concurrency", str(args.concurrency), "--requests", str(args.requests)]
+        if args.inline:
+            command.append("--inline")
+        subprocess.run(command, env=env, check=True)
+
+
+if __name__ == "__main__":
+    main()
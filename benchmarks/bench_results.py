@@ -0,0 +1,86 @@
+# Report ingestion cost as artifacts grow: first ingest, peak memory, unchanged re-ingest
+#
+#   python benchmarks/bench_results.py --tests 1000 10000 50000
+#
+# Writes a synthetic newman JSON export and pytest-html report with `tests`
+# results each (response bodies and logs included, so they reach tens of MB),
+# ingests them into a fresh store, then ingests again without changes.
+import argparse
+import html
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from results_store import ResultsStore  # noqa: E402
+
+LOG = "INFO     root:test.py:10 request sent\n" * 20
+
+
+def write_artifacts(directory, tests):
+    executions = [
+        {
+            "item": {"name": f"Request {n}"},
+            "response": {"stream": {"type": "Buffer", "data": list(range(200))}},
+            "assertions": [{"assertion": "Status code is 200", "skipped": False}]
+            + ([{"assertion": "body", "error": {"message": "mismatch"}}] if n % 10 == 0 else []),
+        }
+        for n in range(tests)
+    ]
+    newman = {"run": {"timings": {"completed": 1760000000000}, "executions": executions}}
+    (directory / "newman-report.json").write_text(json.dumps(newman))
+
+    runs = {
+        f"tests/api/test_bulk.py::test_case[{n}]": [
+            {"extras": [], "result": "Failed" if n % 10 == 0 else "Passed", "testId": str(n), "duration": "9 ms",
+             "log": LOG}
+        ]
+        for n in range(tests)
+    }
+    blob = html.escape(json.dumps({"environment": {}, "tests": runs}))
+    (directory / "report.html").write_text(
+        f"<p>Report generated on 09-Oct-2025 at 10:00:00 by pytest-html</p>"
+        f'<div id="data-container" data-jsonblob="{blob}"></div>'
+    )
+    return sum(path.stat().st_size for path in directory.iterdir()) / 1e6
+
+
+def main(sizes):
+    for tests in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            artifacts = Path(tmp) / "artifacts"
+            artifacts.mkdir()
+            megabytes = write_artifacts(artifacts, tests)
+            store = ResultsStore(str(Path(tmp) / "results.db"))
+            start = time.perf_counter()
+            store.ingest(str(artifacts))
+            first = time.perf_counter() - start
+
+            # Memory is measured on a second store: tracing slows the parsers down several times
+            traced = ResultsStore(str(Path(tmp) / "traced.db"))
+            tracemalloc.start()
+            traced.ingest(str(artifacts))
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+            traced.close()
+
+            start = time.perf_counter()
+            store.ingest(str(artifacts))
+            again = time.perf_counter() - start
+            results = len(store.latest())
+            store.close()
+            print(
+                f"  {tests:6d} tests/report  {megabytes:7.1f} MB  {results:6d} results  "
+                f"first ingest {first:6.2f} s  peak {peak:6.1f} MB  unchanged re-ingest {again * 1000:6.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ingestion of report artifacts")
+    parser.add_argument("--tests", type=int, nargs="+", default=[1000, 10000, 50000])
+    args = parser.parse_args()
+    main(args.tests)
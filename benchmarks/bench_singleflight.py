@@ -0,0 +1,76 @@
+# Model work under bursts of identical /api/moderate requests, with and without single-flight
+#
+#   python benchmarks/bench_singleflight.py --bursts 20 --copies 50
+#
+# Each burst sends `copies` concurrent requests with the same fresh text
+# (a spam wave), in-process through httpx's ASGI transport. The texts sent
+# to the model are counted from the pool's batch callback. A unique-text
+# run checks that single-flight adds no latency when nothing repeats.
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("RATE_LIMITS", "")
+
+
+async def run(client, bursts, copies, unique):
+    latencies = []
+
+    async def post(text):
+        start = time.perf_counter()
+        response = await client.post("/api/moderate", json={"text": text})
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+
+    for _ in range(bursts):
+        texts = [f"unique text {uuid.uuid4().hex}" for _ in range(copies)] if unique else [
+            f"Buy followers now {uuid.uuid4().hex}"
+        ] * copies
+        await asyncio.gather(*(post(text) for text in texts))
+    return statistics.median(latencies) * 1000
+
+
+async def main(bursts, copies):
+    import httpx
+
+    import api
+
+    api.wait_until_ready(timeout=600)
+    scored = []
+    record_batch = api.inference_pool.on_batch
+
+    def count(size, queued, elapsed, args):
+        scored.append(size)
+        record_batch(size, queued, elapsed, args)
+
+    api.inference_pool.on_batch = count
+    shared_do = api.inflight.do
+
+    async def direct(key, fn, *args):
+        return await fn(*args)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://bench") as client:
+        for label, do in (("off", direct), ("on", shared_do)):
+            api.inflight.do = do
+            for unique in (False, True):
+                scored.clear()
+                p50 = await run(client, bursts, copies, unique)
+                kind = "unique texts   " if unique else "identical burst"
+                print(
+                    f"  single-flight {label:<3} {kind}  {bursts * copies:5d} requests  "
+                    f"{sum(scored):5d} texts to the model  p50 {p50:6.2f} ms"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure single-flight deduplication of concurrent requests")
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--copies", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.bursts, args.copies))
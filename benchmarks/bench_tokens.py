@@ -0,0 +1,88 @@
+# Token verification cost per request
+#
+#   python benchmarks/bench_tokens.py --tokens 10000 --revoked 50000
+#
+# Verifies a pool of valid tokens in a tight loop (with a large revocation set,
+# to show it does not slow checks down), then times the full /api/protected
+# request through the ASGI app for comparison with the HTTP overhead.
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tokens import InvalidToken, TokenService  # noqa: E402
+
+TARGET_PER_SECOND = 20_000
+
+
+def bench_verify(service, tokens, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for token in tokens:
+            service.verify(token)
+        timings.append((time.perf_counter() - start) / len(tokens))
+    return statistics.median(timings)
+
+
+def bench_rejects(service, tokens, rounds):
+    forged = [token[:-4] + "AAAA" for token in tokens]
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for token in forged:
+            try:
+                service.verify(token)
+            except InvalidToken:
+                pass
+        timings.append((time.perf_counter() - start) / len(forged))
+    return statistics.median(timings)
+
+
+def bench_endpoint(requests):
+    from fastapi.testclient import TestClient
+
+    import api
+
+    client = TestClient(api.app)
+    token = client.post("/api/login", json={"username": "admin", "password": "password123"}).json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get("/api/protected", headers=headers)
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure bearer token verification cost")
+    parser.add_argument("--tokens", type=int, default=10_000)
+    parser.add_argument("--revoked", type=int, default=50_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--endpoint-requests", type=int, default=2_000, help="0 skips the HTTP measurement")
+    args = parser.parse_args()
+
+    service = TokenService(secret="benchmark-secret", ttl=3600)
+    for _ in range(args.revoked):
+        service.revoke(service.issue("revoked-user"))
+    tokens = [service.issue(f"user{i}") for i in range(args.tokens)]
+
+    verify = bench_verify(service, tokens, args.rounds)
+    reject = bench_rejects(service, tokens, args.rounds)
+    print(f"tokens={args.tokens} revoked={args.revoked}")
+    print(f"verify valid:  {verify * 1e6:6.2f} us/token  ({1 / verify:,.0f}/s per core)")
+    print(f"reject forged: {reject * 1e6:6.2f} us/token  ({1 / reject:,.0f}/s per core)")
+    print(f"auth budget at {TARGET_PER_SECOND:,}/s: {TARGET_PER_SECOND * verify:.1%} of one core")
+
+    if args.endpoint_requests:
+        per_request = bench_endpoint(args.endpoint_requests)
+        print(f"GET /api/protected via TestClient: {per_request * 1e6:,.0f} us/request "
+              f"(verification is {verify / per_request:.1%} of it)")
+
+    raise SystemExit(0 if 1 / verify >= TARGET_PER_SECOND else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Memory per worker count for serve.py (Linux)
+#
+#   python benchmarks/bench_workers.py --workers 1,2,4
+#
+# Starts serve.py with each worker count, sends a few moderation requests so
+# every worker has run inference, then sums PSS over the parent and workers.
+# PSS charges shared copy-on-write pages once across all sharers, so it is the
+# real footprint; summed RSS is what naive per-process accounting would show.
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from serve import memory_mb  # noqa: E402
+
+
+def children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def measure(workers, port, requests_per_worker):
+    base_url = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 600
+        while time.monotonic() < deadline:
+            try:
+                if requests.get(f"{base_url}/readyz", timeout=1).status_code == 200:
+                    break
+            except requests.ConnectionError:
+                pass
+            time.sleep(0.5)
+        for i in range(workers * requests_per_worker):
+            requests.post(f"{base_url}/api/moderate", json={"text": f"benchmark text number {i}"})
+
+        pids = [proc.pid] + children(proc.pid)
+        usage = [memory_mb(pid) for pid in pids]
+        return sum(rss for rss, _ in usage), sum(pss for _, pss in usage)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure serve.py memory as workers are added")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--requests-per-worker", type=int, default=20)
+    args = parser.parse_args()
+
+    baseline = None
+    for count in (int(n) for n in args.workers.split(",")):
+        rss, pss = measure(count, args.port, args.requests_per_worker)
+        baseline = baseline or pss / count
+        print(
+            f"workers={count:<2} total pss {pss:7.0f} MB  summed rss {rss:7.0f} MB  "
+            f"({pss / (baseline * count):.0%} of {count} independent copies)"
+        )
+
+
+if __name__ == "__main__":
+    main()
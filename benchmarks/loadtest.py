@@ -0,0 +1,299 @@
+# Async load generator for api.py
+#
+#   python benchmarks/loadtest.py --concurrency 32 --duration 30
+#   python benchmarks/loadtest.py --url http://127.0.0.1:8000 --rps 200 --mix protected=6,moderate=3,login=1
+#   python benchmarks/loadtest.py --save baselines/main.json
+#   python benchmarks/loadtest.py --baseline baselines/main.json --threshold 0.2
+#
+# Without --url the API runs in-process through httpx's ASGI transport (with
+# rate limits off unless --keep-rate-limits). --concurrency runs a closed loop
+# of that many clients; --rps runs an open loop that starts requests on a fixed
+# schedule and measures latency from the scheduled start, so a slow server
+# cannot hide queueing delay. With --baseline the run fails (exit 1) when a
+# route's p95/p99 rises, or its throughput drops, by more than --threshold.
+# Each route also reports the mean server-side phases from Server-Timing.
+#
+# A --url target must run with rate limits off (RATE_LIMITS="" in the server's
+# environment): the default limits turn most of the mix into 429s, which would
+# be measured as if they were real responses. A run where more than
+# --max-throttled of any route's requests got 429 fails (exit 2) without
+# saving or comparing a baseline.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from timing import parse_server_timing  # noqa: E402
+
+LOGIN = {"username": "admin", "password": "password123"}
+# Mostly short chat-like texts, some toxic, a few long ones; repeats exercise the cache
+TEXTS = [
+    "Hello friend, how are you?",
+    "Thanks for the quick reply, that fixed it.",
+    "You are stupid and ugly",
+    "I will find you and hurt you",
+    "Can someone explain how the login token expires?",
+    "This is the worst product I have ever used, total garbage.",
+    "Great write-up, I learned a lot from this thread. " * 6,
+    "Meeting notes: " + "we reviewed the backlog and agreed on priorities. " * 40,
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def parse_mix(spec):
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown route {name!r} in --mix; expected {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def do_login(client, state):
+    return await client.post("/api/login", json=LOGIN)
+
+
+async def do_protected(client, state):
+    return await client.get("/api/protected", headers={"Authorization": f"Bearer {state['token']}"})
+
+
+async def do_moderate(client, state):
+    return await client.post("/api/moderate", json={"text": random.choice(TEXTS)})
+
+
+SCENARIOS = {"login": do_login, "protected": do_protected, "moderate": do_moderate}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {name: [] for name in SCENARIOS}
+        self.statuses = {name: {} for name in SCENARIOS}
+        self.phases = {name: {} for name in SCENARIOS}  # phase -> summed ms
+        self.dropped = 0
+
+    def record(self, name, latency, status, phases=None):
+        self.latencies[name].append(latency)
+        self.statuses[name][status] = self.statuses[name].get(status, 0) + 1
+        for phase, ms in (phases or {}).items():
+            self.phases[name][phase] = self.phases[name].get(phase, 0.0) + ms
+
+    def summary(self, elapsed):
+        routes = {}
+        for name, latencies in self.latencies.items():
+            if not latencies:
+                continue
+            statuses = self.statuses[name]
+            errors = sum(count for status, count in statuses.items() if status != 200)
+            routes[name] = {
+                "requests": len(latencies),
+                "rps": round(len(latencies) / elapsed, 2),
+                "error_rate": round(errors / len(latencies), 4),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+                "max_ms": round(max(latencies) * 1000, 2),
+                "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+                "phases_mean_ms": {
+                    phase: round(ms / len(latencies), 3) for phase, ms in self.phases[name].items()
+                },
+            }
+        return routes
+
+
+async def timed(client, state, name, recorder, started):
+    phases = None
+    try:
+        response = await SCENARIOS[name](client, state)
+        status = response.status_code
+        phases = parse_server_timing(response.headers.get("server-timing", ""))
+    except Exception as e:  # connection errors count against the route, not the run
+        status = type(e).__name__
+    recorder.record(name, time.perf_counter() - started, status, phases)
+
+
+async def closed_loop(client, state, mix, recorder, concurrency, duration):
+    names, weights = list(mix), list(mix.values())
+    stop_at = time.perf_counter() + duration
+
+    async def user():
+        while time.perf_counter() < stop_at:
+            await timed(client, state, random.choices(names, weights)[0], recorder, time.perf_counter())
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+
+
+async def open_loop(client, state, mix, recorder, rps, duration, max_inflight):
+    names, weights = list(mix), list(mix.values())
+    inflight = set()
+    start = time.perf_counter()
+    for i in range(int(rps * duration)):
+        scheduled = start + i / rps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(inflight) >= max_inflight:
+            recorder.dropped += 1  # the server is too far behind; do not queue unboundedly
+            continue
+        task = asyncio.ensure_future(timed(client, state, random.choices(names, weights)[0], recorder, scheduled))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+    if inflight:
+        await asyncio.gather(*inflight)
+
+
+async def run(args):
+    import httpx
+
+    mix = parse_mix(args.mix)
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        if not args.keep_rate_limits:
+            os.environ["RATE_LIMITS"] = ""
+        import api
+
+        try:
+            if "moderate" in mix and not api.wait_until_ready(timeout=600):
+                raise SystemExit("Moderation model did not load")
+        except RuntimeError as e:
+            raise SystemExit(str(e))
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=api.app), base_url="http://loadtest", timeout=args.timeout
+        )
+
+    async with client:
+        state = {}
+        response = await client.post("/api/login", json=LOGIN)
+        response.raise_for_status()
+        state["token"] = response.json()["token"]
+
+        if args.warmup:
+            await closed_loop(client, state, mix, Recorder(), args.concurrency, args.warmup)
+
+        recorder = Recorder()
+        start = time.perf_counter()
+        if args.rps:
+            await open_loop(client, state, mix, recorder, args.rps, args.duration, args.max_inflight)
+        else:
+            await closed_loop(client, state, mix, recorder, args.concurrency, args.duration)
+        elapsed = time.perf_counter() - start
+
+    return {
+        "meta": {
+            "target": args.url or "in-process",
+            "mode": f"rps={args.rps}" if args.rps else f"concurrency={args.concurrency}",
+            "mix": mix,
+            "duration_s": round(elapsed, 2),
+            "dropped": recorder.dropped,
+            "python": platform.python_version(),
+            "timestamp": int(time.time()),
+        },
+        "routes": recorder.summary(elapsed),
+    }
+
+
+def compare(current, baseline, threshold):
+    """Returns human-readable regressions of `current` against `baseline` (empty when none)."""
+    regressions = []
+    for name, before in baseline["routes"].items():
+        after = current["routes"].get(name)
+        if after is None:
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            if before[key] > 0 and after[key] > before[key] * (1 + threshold):
+                regressions.append(f"{name} {key} {before[key]} -> {after[key]}")
+        if after["rps"] < before["rps"] * (1 - threshold):
+            regressions.append(f"{name} rps {before['rps']} -> {after['rps']}")
+        if after["error_rate"] > before["error_rate"] + threshold:
+            regressions.append(f"{name} error_rate {before['error_rate']} -> {after['error_rate']}")
+    return regressions
+
+
+def throttled(result, max_share):
+    """Routes whose share of 429 responses is above `max_share`, as "route share" strings."""
+    found = []
+    for name, route in result["routes"].items():
+        share = route["statuses"].get("429", 0) / route["requests"]
+        if share > max_share:
+            found.append(f"{name} {share:.0%}")
+    return found
+
+
+def print_report(result):
+    meta = result["meta"]
+    print(f"target={meta['target']} {meta['mode']} duration={meta['duration_s']}s mix={meta['mix']}")
+    print(f"{'route':<10} {'requests':>8} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}  statuses")
+    for name, route in result["routes"].items():
+        print(
+            f"{name:<10} {route['requests']:>8} {route['rps']:>9.1f} {route['p50_ms']:>8.2f} "
+            f"{route['p95_ms']:>8.2f} {route['p99_ms']:>8.2f} {route['error_rate']:>7.1%}  {route['statuses']}"
+        )
+    for name, route in result["routes"].items():
+        phases = route.get("phases_mean_ms")
+        if phases:
+            print(f"{name:<10} server mean ms: " + "  ".join(f"{phase}={ms:.2f}" for phase, ms in phases.items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a mix of API calls and report latency per route")
+    parser.add_argument("--url", help="base URL of a running server; default runs api.app in-process")
+    parser.add_argument("--mix", default="protected=6,moderate=3,login=1", help="route=weight list")
+    parser.add_argument("--concurrency", type=int, default=16, help="closed-loop clients")
+    parser.add_argument("--rps", type=float, default=0, help="open-loop arrival rate (overrides --concurrency)")
+    parser.add_argument("--max-inflight", type=int, default=1000, help="open-loop cap on outstanding requests")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--keep-rate-limits", action="store_true", help="in-process only: keep RATE_LIMITS")
+    parser.add_argument("--max-throttled", type=float, default=0.01, help="largest allowed 429 share per route")
+    parser.add_argument("--allow-throttling", action="store_true", help="only warn when --max-throttled is exceeded")
+    parser.add_argument("--save", help="write the result as a JSON baseline")
+    parser.add_argument("--baseline", help="compare with a saved baseline and exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args))
+    print_report(result)
+
+    limited = throttled(result, args.max_throttled)
+    if limited:
+        print(f"warning: rate limited (429) responses: {', '.join(limited)}; "
+              'run the target server with RATE_LIMITS="" to measure the API instead of its limiter')
+        if not args.allow_throttling:
+            raise SystemExit(2)
+
+    if args.save:
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save).write_text(json.dumps(result, indent=2), encoding="utf-8")
+        print(f"saved baseline to {args.save}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        for key in ("target", "mode", "mix"):
+            if baseline["meta"][key] != result["meta"][key]:
+                print(f"warning: baseline {key} was {baseline['meta'][key]}, this run used {result['meta'][key]}")
+        regressions = compare(result, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"no regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
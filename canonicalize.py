@@ -0,0 +1,129 @@
+# Fuzzy canonicalization of test names for the Test Insights table
+#
+# The original merge compared every name with every group leader through
+# fuzzywuzzy's process.extractOne(scorer=token_sort_ratio), one Python call
+# per pair. This module produces the same groups with far fewer comparisons:
+#   - names are preprocessed once (token_sort_ratio's own normalization);
+#   - a length index skips leaders whose length alone rules out a score above
+#     the threshold (Indel similarity is at most 2*min(a, b) / (a + b)), so
+#     the blocking never drops a real match;
+#   - the remaining pairs are scored chunk by chunk with rapidfuzz's threaded
+#     C matrix scorer (process.cdist) instead of one call per pair.
+# Scores are rounded exactly like fuzzywuzzy with python-Levenshtein, whose
+# ratio() is rapidfuzz's Indel.normalized_similarity.
+import os
+import re
+from collections import defaultdict
+
+import numpy as np
+from rapidfuzz.distance import Indel
+from rapidfuzz.process import cdist
+
+MERGE_THRESHOLD = 80  # token_sort_ratio above this joins an existing test name
+CHUNK_SIZE = int(os.getenv("CANONICALIZE_CHUNK_SIZE", "1024"))
+
+_LATIN1 = {code: None for code in range(128, 256)}  # fuzzywuzzy's force_ascii drops these
+_NON_WORD = re.compile(r"(?ui)\W")
+
+
+def sort_key(name):
+    """token_sort_ratio's preprocessing: ascii-only, lowercased, words sorted."""
+    processed = _NON_WORD.sub(" ", name.translate(_LATIN1)).lower().strip()
+    return " ".join(sorted(processed.split())).strip()
+
+
+def score_matrix(queries, choices, threshold=MERGE_THRESHOLD):
+    """0-100 token_sort_ratio scores of sort keys; exact wherever the score is above `threshold`."""
+    # Below the cutoff rapidfuzz returns 0; those pairs can never join a group anyway
+    similarity = cdist(
+        queries, choices, scorer=Indel.normalized_similarity, dtype=np.float64,
+        workers=-1, score_cutoff=max(threshold - 1, 0) / 100,
+    )
+    return np.rint(similarity * 100).astype(np.int64)  # round half to even, like round()
+
+
+class Canonicalizer:
+    """Groups names in order: a name joins the earliest highest-scoring leader
+    above the threshold, otherwise it leads a new group.
+
+    Same decisions as running extractOne against the list of leaders for each
+    name in turn.
+    """
+
+    def __init__(self, leaders=(), threshold=MERGE_THRESHOLD):
+        self.threshold = threshold
+        self.leaders = []  # raw names, in the order they started a group
+        self._keys = []
+        self._by_length = defaultdict(list)  # sort key length -> leader positions
+        for name in leaders:
+            self._add(name, sort_key(name))
+
+    def _add(self, name, key):
+        self._by_length[len(key)].append(len(self.leaders))
+        self.leaders.append(name)
+        self._keys.append(key)
+
+    def _candidates(self, length):
+        """Positions of leaders whose key length still allows a score above the threshold."""
+        t = self.threshold
+        if t < 1:
+            lengths = self._by_length
+        else:
+            # 2*min(a, b) / (a + b) * 100 >= t, solved for the other length
+            lo, hi = -(-t * length // (200 - t)), length * (200 - t) // t
+            lengths = (n for n in self._by_length if lo <= n <= hi)
+        return [position for n in lengths for position in self._by_length[n]]
+
+    def _best_leaders(self, keys):
+        """(score, leader position) of the best current leader for each key; score -1 when none."""
+        best = [(-1, -1)] * len(keys)
+        by_length = defaultdict(list)
+        for row, key in enumerate(keys):
+            by_length[len(key)].append(row)
+        for length, rows in by_length.items():
+            columns = self._candidates(length)
+            if not columns:
+                continue
+            scores = score_matrix([keys[row] for row in rows], [self._keys[c] for c in columns], self.threshold)
+            positions = np.asarray(columns, dtype=np.int64)
+            # Highest score first, then the earliest leader, as extractOne picks
+            picks = (scores * (len(self.leaders) + 1) - positions).argmax(axis=1)
+            for row, pick, line in zip(rows, picks, scores):
+                best[row] = (int(line[pick]), int(positions[pick]))
+        return best
+
+    def assign(self, names, chunk_size=CHUNK_SIZE):
+        """Returns (canonical name, started a new group) for each name, extending the leaders."""
+        decisions = []
+        for start in range(0, len(names), chunk_size):
+            chunk = names[start:start + chunk_size]
+            rows = {}  # sort key -> row; repeated names are scored once
+            chunk_rows = [rows.setdefault(sort_key(name), len(rows)) for name in chunk]
+            keys = list(rows)
+            best = self._best_leaders(keys)
+            within = None  # scores against leaders started inside this chunk, computed on demand
+            fresh_rows, fresh_positions = [], []
+
+            for name, row in zip(chunk, chunk_rows):
+                score, position = best[row]
+                if fresh_rows:
+                    if within is None:
+                        within = score_matrix(keys, keys, self.threshold)
+                    line = within[row, fresh_rows]
+                    pick = int(line.argmax())
+                    if line[pick] > score:  # ties keep the earlier leader
+                        score, position = int(line[pick]), fresh_positions[pick]
+                if score > self.threshold:
+                    decisions.append((self.leaders[position], False))
+                else:
+                    fresh_rows.append(row)
+                    fresh_positions.append(len(self.leaders))
+                    self._add(name, keys[row])
+                    decisions.append((name, True))
+        return decisions
+
+
+def canonical_map(names, threshold=MERGE_THRESHOLD):
+    """Maps each name to its canonical name; later occurrences of a name win."""
+    decisions = Canonicalizer(threshold=threshold).assign(list(names))
+    return {name: canonical for name, (canonical, _) in zip(names, decisions)}
@@ -0,0 +1,81 @@
+# Sliding-window scoring for long moderation texts
+import os
+import re
+
+WINDOW_TOKENS = int(os.environ.get("MODERATION_WINDOW_TOKENS", "256"))
+WINDOW_OVERLAP = int(os.environ.get("MODERATION_WINDOW_OVERLAP", "32"))
+AGGREGATION = os.environ.get("MODERATION_AGGREGATION", "max")  # "max" or "mean"
+
+WORD_RE = re.compile(r"\S+")
+
+
+def _word_spans(text, count_tokens, window_tokens):
+    """Yields (start, end, tokens) per word, splitting words too long for one window."""
+    counts = {}
+    for match in WORD_RE.finditer(text):
+        word = match.group()
+        tokens = counts.get(word)
+        if tokens is None:
+            tokens = counts[word] = max(1, count_tokens(word))
+        if tokens <= window_tokens // 2:
+            yield match.start(), match.end(), tokens
+            continue
+        # e.g. a URL or a run of symbols: cut it into pieces of roughly half a window
+        pieces = -(-tokens * 2 // window_tokens)
+        step = max(1, -(-len(word) // pieces))
+        for offset in range(0, len(word), step):
+            piece = word[offset:offset + step]
+            yield match.start() + offset, match.start() + offset + len(piece), max(1, count_tokens(piece))
+
+
+def plan_windows(text, count_tokens, window_tokens=WINDOW_TOKENS, overlap=WINDOW_OVERLAP):
+    """Splits `text` into overlapping windows of at most `window_tokens` tokens.
+
+    Returns a list of (start, end) character spans covering every word, or an
+    empty list when the text fits in a single window. Consecutive windows share
+    up to `overlap` tokens so content cut at a boundary is still seen whole.
+    """
+    # Every token covers at least one character, so short texts never need a tokenizer pass
+    if len(text) <= window_tokens:
+        return []
+
+    words = list(_word_spans(text, count_tokens, window_tokens))
+    if sum(tokens for _, _, tokens in words) <= window_tokens:
+        return []
+
+    windows, i = [], 0
+    while i < len(words):
+        j, used = i, 0
+        while j < len(words) and (j == i or used + words[j][2] <= window_tokens):
+            used += words[j][2]
+            j += 1
+        windows.append((words[i][0], words[j - 1][1]))
+        if j >= len(words):
+            break
+
+        # Step back so the next window starts `overlap` tokens before this one ended
+        k, shared = j, 0
+        while k - 1 > i and shared + words[k - 1][2] <= overlap:
+            k -= 1
+            shared += words[k][2]
+        i = k
+    return windows
+
+
+def aggregate(window_scores, aggregation=AGGREGATION):
+    """Combines per-window scores into one score per label.
+
+    Returns (scores, driving_index) where driving_index is the window with the
+    highest toxicity, i.e. the span that drove the verdict.
+    """
+    if aggregation not in ("max", "mean"):
+        raise ValueError(f"Unknown aggregation: {aggregation}")
+
+    labels = window_scores[0].keys()
+    if aggregation == "mean":
+        scores = {label: sum(s[label] for s in window_scores) / len(window_scores) for label in labels}
+    else:
+        scores = {label: max(s[label] for s in window_scores) for label in labels}
+
+    driving_index = max(range(len(window_scores)), key=lambda i: window_scores[i]["toxicity"])
+    return scores, driving_index
@@ -0,0 +1,293 @@
+# Test discovery for the Test Insights page
+#
+# Walks the whole tests/ tree (except SKIPPED_DIRS, where the Test Insights
+# pipeline keeps its own unit tests) instead of a fixed list of files:
+#   - Python files are parsed with `ast`, so class-based tests and
+#     parametrized cases are found and commented-out defs are not;
+#   - Postman collections are read with a streaming JSON parser (ijson) and
+#     only request items count, not every "name" in the file;
+#   - an on-disk index (DISCOVERY_INDEX) remembers the tests of every file
+#     by (mtime, size), so a scan only parses files that changed, in a
+#     process pool when there are many of them.
+import ast
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+TESTS_DIR = BASE_DIR / "tests"
+DISCOVERY_INDEX = os.environ.get("DISCOVERY_INDEX", str(BASE_DIR / ".cache" / "test_index.json"))
+DISCOVERY_WORKERS = int(os.environ.get("DISCOVERY_WORKERS", str(os.cpu_count() or 1)))
+DISCOVERY_POOL_MIN = int(os.environ.get("DISCOVERY_POOL_MIN", "32"))  # fewer changed files are parsed inline
+INDEX_VERSION = 1
+
+# Labels the table has always used for these files (path relative to tests/)
+LABELS = {
+    "api/test_login.py": "Pytest (Login)",
+    "api/test_moderate.py": "Pytest (Moderation)",
+    "postman/collection.json": "Postman",
+    "ui/test_ui_login.py": "Playwright Login",
+    "generated/openapi_stubs_groq.py": "Groq",
+    "generated/openapi_stubs_ollama.py": "Ollama",
+    "ui/test_streamlit_ui.py": "Playwright Streamlit",
+}
+# Everything else is labelled by its folder: tests/ui/test_logout.py -> "Playwright Logout"
+FOLDER_LABELS = {"ui": "Playwright {}", "generated": "{}", "postman": "Postman"}
+DEFAULT_LABEL = "Pytest ({})"
+SKIPPED_FILES = {"conftest.py", "__init__.py"}
+# Folders of tests/ holding this page's own unit tests rather than tests of the product
+SKIPPED_DIRS = {"insights"}
+
+last_scan = {"files": 0, "parsed": 0, "seconds": 0.0}  # stats of the latest discover() call
+
+
+def label_for(rel_path):
+    if rel_path in LABELS:
+        return LABELS[rel_path]
+    parts = rel_path.split("/")
+    stem = re.sub(r"^(test_|openapi_stubs_)", "", Path(rel_path).stem).replace("_", " ").strip().title()
+    template = FOLDER_LABELS.get(parts[0], DEFAULT_LABEL) if len(parts) > 1 else DEFAULT_LABEL
+    return template.format(stem)
+
+
+# ---------- Python files ----------
+
+def _is_parametrize(decorator):
+    return (
+        isinstance(decorator, ast.Call)
+        and isinstance(decorator.func, ast.Attribute)
+        and decorator.func.attr == "parametrize"
+    )
+
+
+def _value_id(node, argname, idx):
+    """pytest's id for one parameter value; argname + index when it is not a simple literal."""
+    try:
+        value = ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return f"{argname}{idx}"
+    if isinstance(value, str):
+        return value.encode("unicode_escape").decode("ascii")
+    if value is None or isinstance(value, (bool, int, float, complex)):
+        return str(value)
+    return f"{argname}{idx}"
+
+
+def _unique(ids):
+    """Suffixes repeated ids the way pytest does (a, a -> a0, a1)."""
+    counts = {i: ids.count(i) for i in ids}
+    suffixes = dict.fromkeys(ids, 0)
+    result = []
+    for i in ids:
+        if counts[i] > 1:
+            result.append(f"{i}{'_' if i and i[-1].isdigit() else ''}{suffixes[i]}")
+            suffixes[i] += 1
+        else:
+            result.append(i)
+    return result
+
+
+def _parametrize_ids(decorator):
+    """Ids of one @pytest.mark.parametrize, or None when they cannot be known without running it."""
+    args = list(decorator.args)
+    keywords = {k.arg: k.value for k in decorator.keywords}
+    argnames = args[0] if args else keywords.get("argnames")
+    argvalues = args[1] if len(args) > 1 else keywords.get("argvalues")
+    try:
+        names = ast.literal_eval(argnames)
+    except (ValueError, TypeError, SyntaxError):
+        return None
+    if isinstance(names, str):
+        names = [n.strip() for n in names.split(",") if n.strip()]
+    if not isinstance(argvalues, (ast.List, ast.Tuple)) or not argvalues.elts or not names:
+        return None
+
+    explicit = []
+    if isinstance(keywords.get("ids"), (ast.List, ast.Tuple)):
+        explicit = [e.value if isinstance(e, ast.Constant) and isinstance(e.value, str) else None
+                    for e in keywords["ids"].elts]
+
+    ids = []
+    for idx, element in enumerate(argvalues.elts):
+        given = explicit[idx] if idx < len(explicit) else None
+        values = [element]
+        if isinstance(element, ast.Call) and getattr(element.func, "attr", getattr(element.func, "id", "")) == "param":
+            values = list(element.args)
+            for k in element.keywords:
+                if k.arg == "id" and isinstance(k.value, ast.Constant) and isinstance(k.value.value, str):
+                    given = k.value.value
+        elif len(names) > 1 and isinstance(element, (ast.List, ast.Tuple)):
+            values = list(element.elts)
+        if given is None:
+            given = "-".join(_value_id(v, n, idx) for v, n in zip(values, names))
+        ids.append(given)
+    return _unique(ids)
+
+
+def _test_ids(function, inherited=()):
+    """Test ids of one function: the bare name, or name[id] per parametrized case."""
+    # The decorator closest to the function comes first in the id, as in pytest
+    decorators = [d for d in reversed(function.decorator_list) if _is_parametrize(d)] + list(inherited)
+    cases = [ids for ids in map(_parametrize_ids, decorators) if ids]
+    if not cases:
+        return [function.name]
+    return [f"{function.name}[{'-'.join(combo)}]" for combo in itertools.product(*cases)]
+
+
+def python_tests(source):
+    """Test names defined in a Python test module (functions and Test* classes)."""
+    tests = []
+    for node in ast.parse(source).body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith("test"):
+            tests.extend(_test_ids(node))
+        elif isinstance(node, ast.ClassDef) and node.name.startswith("Test"):
+            methods = [n for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+            if any(m.name == "__init__" for m in methods):
+                continue  # pytest does not collect classes with a constructor
+            inherited = [d for d in reversed(node.decorator_list) if _is_parametrize(d)]
+            tests.extend(
+                name for m in methods if m.name.startswith("test") for name in _test_ids(m, inherited)
+            )
+    return tests
+
+
+# ---------- Postman collections ----------
+
+_ITEM = re.compile(r"item\.item(?:\.item\.item)*")  # ijson prefixes of items, nested folders included
+
+
+def postman_tests(stream):
+    """Names of the request items in a Postman collection, read as a stream."""
+    import ijson
+
+    tests, open_items = [], []  # open_items: [name, is a request] per item map being read
+    for prefix, event, value in ijson.parse(stream):
+        if event == "start_map" and _ITEM.fullmatch(prefix):
+            open_items.append([None, False])
+        elif not open_items:
+            continue
+        elif event == "map_key" and value == "request" and _ITEM.fullmatch(prefix):
+            open_items[-1][1] = True
+        elif event == "string" and prefix.endswith(".name") and _ITEM.fullmatch(prefix[:-5]):
+            open_items[-1][0] = value
+        elif event == "end_map" and _ITEM.fullmatch(prefix):
+            name, is_request = open_items.pop()
+            if is_request and name:
+                tests.append(name.strip())
+    return tests
+
+
+def parse_file(path):
+    """Returns (test names, error) for one file; runs in the discovery process pool."""
+    try:
+        if path.endswith(".json"):
+            with open(path, "rb") as f:
+                return postman_tests(f), None
+        with open(path, "rb") as f:
+            return python_tests(f.read()), None
+    except Exception as e:
+        return [], f"Could not parse {path}: {e}"
+
+
+# ---------- Index ----------
+
+_indexes = {}  # index path -> (mtime_ns, size, entries) as last read or written
+_lock = threading.Lock()
+
+
+def _load_index(index_path, root):
+    try:
+        stat = os.stat(index_path)
+    except OSError:
+        return {}
+    cached = _indexes.get(index_path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != INDEX_VERSION or data.get("root") != str(root):
+        return {}
+    entries = data.get("files", {})
+    _indexes[index_path] = (stat.st_mtime_ns, stat.st_size, entries)
+    return entries
+
+
+def _save_index(index_path, root, entries):
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    tmp = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": INDEX_VERSION, "root": str(root), "files": entries}, f)
+    os.replace(tmp, index_path)  # readers never see a half-written index
+    stat = os.stat(index_path)
+    _indexes[index_path] = (stat.st_mtime_ns, stat.st_size, entries)
+
+
+def _walk(root):
+    """(path relative to root, mtime_ns, size) of every candidate test file, sorted."""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [
+            d for d in dirnames
+            if not d.startswith((".", "__")) and not (d in SKIPPED_DIRS and Path(dirpath) == Path(root))
+        ]
+        for filename in filenames:
+            if filename in SKIPPED_FILES or not filename.endswith((".py", ".json")):
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # deleted while walking
+            found.append((Path(path).relative_to(root).as_posix(), stat.st_mtime_ns, stat.st_size))
+    return sorted(found)
+
+
+def _parse_all(paths, workers, pool_min):
+    if len(paths) < max(pool_min, 2) or workers < 2:
+        return [parse_file(p) for p in paths]
+    # spawn, not fork: Streamlit calls this from a thread of a multi-threaded process
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths)), mp_context=context) as pool:
+        return list(pool.map(parse_file, paths, chunksize=max(1, len(paths) // (workers * 4))))
+
+
+def discover(root=TESTS_DIR, index_path=DISCOVERY_INDEX, workers=DISCOVERY_WORKERS, pool_min=DISCOVERY_POOL_MIN):
+    """Scans `root` for tests; returns ((label, path, tests, error), ...) for files with tests.
+
+    Files keep the order of LABELS first, then path order, so the fuzzy merge
+    sees the same sequence on every scan.
+    """
+    start = time.perf_counter()
+    root = Path(root).resolve()
+    with _lock:
+        entries = _load_index(index_path, root)
+        files = _walk(root)
+        changed = [
+            (rel, mtime_ns, size) for rel, mtime_ns, size in files
+            if entries.get(rel, {}).get("signature") != [mtime_ns, size]
+        ]
+        parsed = _parse_all([str(root / rel) for rel, _, _ in changed], workers, pool_min)
+
+        fresh = {rel: entries[rel] for rel, _, _ in files if rel in entries}
+        for (rel, mtime_ns, size), (tests, error) in zip(changed, parsed):
+            fresh[rel] = {"signature": [mtime_ns, size], "tests": tests, "error": error}
+        if changed or len(fresh) != len(entries):
+            _save_index(index_path, root, fresh)
+
+    last_scan.update(files=len(files), parsed=len(changed), seconds=round(time.perf_counter() - start, 4))
+    order = {rel: n for n, rel in enumerate(LABELS)}
+    ranked = sorted(fresh, key=lambda rel: (order.get(rel, len(order)), rel))
+    return tuple(
+        (label_for(rel), str(root / rel), tuple(fresh[rel]["tests"]), fresh[rel]["error"])
+        for rel in ranked
+        if fresh[rel]["tests"] or fresh[rel]["error"]
+    )
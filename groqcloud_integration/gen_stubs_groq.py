@@ -37,9 +37,10 @@ You are a professional Python QA engineer.
 Generate a pytest file for FastAPI endpoints EXACTLY in the following style and format.
 
 Requirements:
-- Import FastAPI app using: from api import app
+- Import FastAPI app using: from api import app, wait_until_ready
 - Use: from fastapi.testclient import TestClient
 - Instantiate client = TestClient(app)
+- Wait for the model in setup_module (the API loads it in the background)
 - Define constants:
     VALID_USER = {{"username": "{VALID_USERNAME}", "password": "{VALID_PASSWORD}"}}
     INVALID_USER = {{"username": "{VALID_USERNAME}", "password": "wrong_password"}}
@@ -49,11 +50,14 @@ Requirements:
     # --- MODERATE ENDPOINT ---
 - Each test name and body MUST exactly match these:
 
-from api import app
+from api import app, wait_until_ready
 from fastapi.testclient import TestClient
 
 client = TestClient(app)
 
+def setup_module(module):
+    assert wait_until_ready(timeout=600)
+
 VALID_USER = {{"username": "{VALID_USERNAME}", "password": "{VALID_PASSWORD}"}}
 INVALID_USER = {{"username": "{VALID_USERNAME}", "password": "wrong_password"}}
 
@@ -0,0 +1,166 @@
+# Bounded executor that keeps model inference off the asyncio event loop
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import timing
+
+INFERENCE_EXECUTOR = os.environ.get("INFERENCE_EXECUTOR", "thread")  # "thread" or "process"
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "2"))
+INFERENCE_QUEUE_SIZE = int(os.environ.get("INFERENCE_QUEUE_SIZE", "64"))
+INFERENCE_RETRY_AFTER = int(os.environ.get("INFERENCE_RETRY_AFTER", "1"))
+# Workers background work (moderation jobs) must leave free for interactive requests
+INFERENCE_RESERVED_WORKERS = int(os.environ.get("INFERENCE_RESERVED_WORKERS", "1"))
+
+
+class InferenceQueueFull(Exception):
+    """Raised when every worker is busy and the wait queue is at capacity."""
+
+    def __init__(self, retry_after):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+def _timed_call(fn, texts, *args):
+    # Module-level so process workers can unpickle it; wall-clock start lets the parent derive queue wait.
+    # Phases recorded inside fn (tokenize, forward) are returned, since the worker has no request context.
+    started = time.time()
+    begin = time.perf_counter()
+    with timing.collect() as phases:
+        result = fn(texts, *args)
+    return result, started, time.perf_counter() - begin, phases
+
+
+class InferencePool:
+    """Runs blocking calls (model predicts, password hashes) on a bounded thread or process pool.
+
+    `depth` counts submitted batches that have not finished yet (running plus
+    waiting). Once it reaches `workers + queue_size`, new submissions fail fast
+    with InferenceQueueFull instead of piling up latency. Background
+    submissions are only admitted while fewer than `workers - reserved` batches
+    are in flight, so they never wait in the executor queue ahead of an
+    interactive request and `reserved` workers stay free for those.
+
+    In process mode `predict_batch` must be a picklable module-level function;
+    workers use the "spawn" start method so torch never runs in a forked child.
+
+    If set, `on_batch(size, queued_s, inference_s, args)` is called in the
+    caller's process after every batch, so timings survive process workers.
+    The same timings go to the caller's request as the "queue" and `phase`
+    Server-Timing phases, along with any phases recorded by predict_batch.
+    """
+
+    def __init__(
+        self,
+        predict_batch,
+        kind=INFERENCE_EXECUTOR,
+        workers=INFERENCE_WORKERS,
+        queue_size=INFERENCE_QUEUE_SIZE,
+        retry_after=INFERENCE_RETRY_AFTER,
+        reserved=INFERENCE_RESERVED_WORKERS,
+        poll_interval=0.01,
+        phase="inference",
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.predict_batch = predict_batch
+        self.kind = kind
+        self.workers = max(1, int(workers))
+        self.queue_size = max(0, int(queue_size))
+        self.retry_after = retry_after
+        self.reserved = max(0, int(reserved))
+        self.poll_interval = poll_interval
+        self.phase = phase
+        self.rejected = 0
+        self.on_batch = None
+        self._depth = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def capacity(self):
+        return self.workers + self.queue_size
+
+    @property
+    def background_capacity(self):
+        return max(1, self.workers - self.reserved)
+
+    @property
+    def depth(self):
+        return self._depth
+
+    def _get_executor(self):
+        # Created lazily so importing api.py never spawns threads or processes
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.workers,
+                            mp_context=multiprocessing.get_context("spawn"),
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers, thread_name_prefix="inference"
+                        )
+        return self._executor
+
+    def _try_acquire(self, limit):
+        with self._lock:
+            if self._depth >= limit:
+                return False
+            self._depth += 1
+            return True
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._depth -= 1
+
+    async def predict(self, texts, *args, wait=False, background=False):
+        """Scores `texts` on the pool; extra args are passed through to predict_batch.
+
+        With wait=False a full backlog raises InferenceQueueFull right away;
+        with wait=True (bulk work) the caller waits for a free slot. With
+        background=True it also waits until a worker beyond the reserved ones is idle.
+        """
+        limit = self.background_capacity if background else self.capacity
+        while not self._try_acquire(limit):
+            if not wait and not background:
+                with self._lock:
+                    self.rejected += 1
+                raise InferenceQueueFull(self.retry_after)
+            await asyncio.sleep(self.poll_interval)
+
+        submitted = time.time()
+        try:
+            future = self._get_executor().submit(_timed_call, self.predict_batch, texts, *args)
+        except Exception:
+            self._release()
+            raise
+        # Release on completion, not on await, so a cancelled caller still counts until the work ends
+        future.add_done_callback(self._release)
+        result, started, elapsed, phases = await asyncio.wrap_future(future)
+        queued = max(0.0, started - submitted)
+        if self.on_batch is not None:
+            self.on_batch(len(texts), queued, elapsed, args)
+        timing.record("queue", queued)
+        timing.record(self.phase, elapsed)
+        timing.merge(phases)
+        return result
+
+    def stats(self):
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "depth": self._depth,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,242 @@
+# Test Insights pipeline for app.py: discover -> normalize -> fuzzy merge -> table
+#
+# Every stage is cached so a Streamlit rerun (e.g. picking a test in the
+# details dropdown) does no parsing at all:
+#   - discovery.py only parses test files whose (mtime, size) changed;
+#   - the fuzzy merge resumes from the longest unchanged prefix of test names
+#     instead of starting over, and scores names in bulk (canonicalize.py);
+#   - app.py caches the finished table per discovery result, and the
+#     CSV is only rewritten when its content changes.
+import hashlib
+import os
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from canonicalize import MERGE_THRESHOLD, Canonicalizer
+from results_store import FAILED, PASSED, SKIPPED, result_key
+
+CSV_PATH = "final_unified_tests.csv"
+
+COLUMNS = ["Index", "Test Name", "Layer / Area", "Tools That Ran This Test", "Status"]
+# A merged test shows the worst latest outcome of the tests behind it
+STATUSES = {FAILED: "❌ Failed", PASSED: "✅ Passed", SKIPPED: "⏭️ Skipped", None: "⚪ Not Run"}
+
+
+@lru_cache(maxsize=65536)
+def normalize_name(name):
+    name = re.sub(r"^test_", "", name).replace("_", " ").strip().title()
+    name = name.replace("Valid", "Success").replace("Wrong", "Failure (Wrong Credentials)")
+    name = name.replace("Fields", "Invalid Input / Fields")
+    # Fix duplicate pattern like "Failure (Failure (Wrong Credentials) Credentials)"
+    name = re.sub(r"Failure\s*\(Failure\s*\(Wrong Credentials\)\s*Credentials\)", "Failure (Wrong Credentials)", name)
+    name = name.replace("Ollama", "").replace("Groq", "").strip()
+    return name
+
+
+class FuzzyMerger:
+    """Maps each readable name to its canonical name, reusing work from the last call.
+
+    The merge is order dependent (a name joins the best earlier unique name
+    scoring above MERGE_THRESHOLD), so the decision for every position is kept
+    and a new call only recomputes names after the longest common prefix with
+    the previous list. The result is identical to a full recompute.
+    """
+
+    def __init__(self, threshold=MERGE_THRESHOLD):
+        self.threshold = threshold
+        self.names = []
+        self.decisions = []  # per position: (canonical name, started a new group)
+        self._lock = threading.Lock()
+
+    def merge(self, names):
+        with self._lock:
+            keep = 0
+            for old, new in zip(self.names, names):
+                if old != new:
+                    break
+                keep += 1
+            decisions = self.decisions[:keep]
+            leaders = [name for name, (_, new) in zip(names, decisions) if new]
+            canonicalizer = Canonicalizer(leaders, threshold=self.threshold)
+            decisions += canonicalizer.assign(list(names[keep:]))
+            self.names, self.decisions = list(names), decisions
+
+        # Later occurrences of a name win, as in the original single-pass loop
+        return {name: canonical for name, (canonical, _) in zip(names, decisions)}
+
+
+merger = FuzzyMerger()
+
+
+# Determine correct area/layer
+def get_area(name: str):
+    n = name.lower()
+
+    # Backend APIs always take priority
+    if any(k in n for k in ["login", "protected", "moderate"]):
+        return "Backend (Auth/API)" if "moderate" not in n else "Backend (Toxicity / Model)"
+
+    # AI analysis or failure diagnostics
+    if any(k in n for k in ["ai failure", "analyzer", "groq", "ollama"]) and not any(
+        k in n for k in ["login", "protected", "moderate"]
+    ):
+        return "Cloud AI (Groq)" if "groq" in n else "Local AI (Ollama)"
+
+    # Frontend UI tests
+    if any(k in n for k in ["ui", "page", "logout", "navigation"]):
+        return "Frontend (UI)"
+
+    # Default catch-all
+    return "Misc"
+
+
+def _status(outcomes):
+    present = set(outcomes)
+    return next(label for outcome, label in STATUSES.items() if outcome in present or outcome is None)
+
+
+def build_insights(found, results=None):
+    """Builds the consolidated test table from `discovery.discover()`; returns (DataFrame, warnings).
+
+    `results` is `ResultsStore.latest()`; without it every test shows as not run.
+    The DataFrame is None when no tests were found.
+    """
+    results = results or {}
+    all_tests, problems = [], []
+    for label, path, tests, error in found:
+        if error:
+            problems.append(error)
+        all_tests.extend(
+            {"Test": t, "Tool": label, "Outcome": results.get(result_key(path, t), (None,))[0]} for t in tests
+        )
+
+    if not all_tests:
+        return None, problems
+
+    df = pd.DataFrame(all_tests)
+    df["Readable"] = df["Test"].map(normalize_name)
+    df["Canonical"] = df["Readable"].map(merger.merge(df["Readable"].tolist()))
+
+    # Merge tools for same test
+    merged = (
+        df.groupby("Canonical")
+        .agg({"Tool": lambda x: ", ".join(sorted(set(x))), "Outcome": _status})
+        .reset_index()
+    )
+
+    merged["Layer / Area"] = merged["Canonical"].apply(get_area)
+    merged["Status"] = merged["Outcome"]
+    merged["Tools That Ran This Test"] = merged["Tool"].apply(
+        lambda t: "  ".join([f"✅ {x}" for x in t.split(", ")])
+    )
+    merged = merged.drop(columns=["Tool", "Outcome"])
+
+    # Final formatting
+    merged.insert(0, "Index", range(1, len(merged) + 1))
+    merged = merged[["Index", "Canonical", "Layer / Area", "Tools That Ran This Test", "Status"]]
+    merged.columns = COLUMNS
+    return merged, problems
+
+
+def tools_of(cell):
+    """Tool labels of a "Tools That Ran This Test" cell."""
+    return [tool.strip() for tool in cell.split("✅ ") if tool.strip()]
+
+
+def facets(merged):
+    """Distinct layers, tools and statuses of the table, for the filter widgets."""
+    present = set(merged["Status"])
+    return (
+        sorted(merged["Layer / Area"].unique()),
+        sorted({tool for cell in merged["Tools That Ran This Test"] for tool in tools_of(cell)}),
+        [status for status in STATUSES.values() if status in present],
+    )
+
+
+def filter_tests(merged, layers=(), tools=(), statuses=(), search=""):
+    """Rows matching every filter; an empty filter matches everything and search ignores case."""
+    mask = pd.Series(True, index=merged.index)
+    if layers:
+        mask &= merged["Layer / Area"].isin(layers)
+    if statuses:
+        mask &= merged["Status"].isin(statuses)
+    if tools:
+        wanted = set(tools)
+        mask &= merged["Tools That Ran This Test"].map(lambda cell: not wanted.isdisjoint(tools_of(cell)))
+    if search.strip():
+        mask &= merged["Test Name"].str.contains(search.strip(), case=False, regex=False)
+    return merged[mask]
+
+
+def page_of(rows, page, page_size):
+    """Returns (rows on 1-based `page`, page, pages); the page is clamped to the ones that exist."""
+    pages = max(1, -(-len(rows) // page_size))
+    page = min(max(page, 1), pages)
+    return rows.iloc[(page - 1) * page_size:page * page_size], page, pages
+
+
+_written = {}  # path -> (sha256 of content, mtime_ns, size) of our last write
+
+
+def write_csv_if_changed(df, path=CSV_PATH):
+    """Saves `df` as CSV unless the file already holds exactly this content; returns True if written."""
+    data = df.to_csv(index=False).encode("utf-8")
+    digest = hashlib.sha256(data).digest()
+    try:
+        stat = os.stat(path)
+    except OSError:
+        stat = None
+    if stat is not None:
+        if _written.get(path) == (digest, stat.st_mtime_ns, stat.st_size):
+            return False
+        if stat.st_size == len(data) and Path(path).read_bytes() == data:
+            _written[path] = (digest, stat.st_mtime_ns, stat.st_size)
+            return False
+    Path(path).write_bytes(data)
+    stat = os.stat(path)
+    _written[path] = (digest, stat.st_mtime_ns, stat.st_size)
+    return True
+
+
+# Dynamic explanation logic
+def get_test_description(name, layer):
+    n = name.lower()
+    if "login" in n:
+        if "failure" in n:
+            return "This test validates the system’s response to failed login attempts — ensuring authentication rejects incorrect or missing credentials safely."
+        elif "success" in n:
+            return "This test verifies successful login flow using valid credentials and ensures user session is correctly established."
+        elif "blank" in n or "missing" in n:
+            return "Checks for proper error handling when username or password fields are missing or empty."
+        elif "sql" in n:
+            return "Ensures backend resilience against SQL injection attempts in login inputs."
+        else:
+            return "General login-related validation test ensuring authentication reliability."
+    elif "moderate" in n:
+        if "toxic" in n:
+            return "Tests whether the content moderation engine correctly identifies toxic language."
+        elif "clean" in n:
+            return "Ensures safe or non-toxic text is accepted as clean."
+        elif "empty" in n:
+            return "Checks system behavior for empty or missing moderation text fields."
+        else:
+            return "General moderation API validation, ensuring accurate text toxicity detection."
+    elif "protected" in n:
+        if "expired" in n:
+            return "Verifies that expired tokens are correctly rejected by secure endpoints."
+        elif "invalid" in n:
+            return "Ensures proper 401 Unauthorized responses for invalid tokens."
+        elif "missing" in n:
+            return "Checks that missing authorization headers are correctly handled."
+        else:
+            return "Tests general authorization validation logic for protected endpoints."
+    elif "logout" in n:
+        return "Validates logout process, ensuring user sessions are terminated properly and access tokens are invalidated."
+    elif "ui" in n or "page" in n:
+        return "Tests frontend UI behavior — verifying visibility, navigation, and interaction consistency."
+    else:
+        return "General functional or integration test ensuring system reliability."
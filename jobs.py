@@ -0,0 +1,269 @@
+# Persistent moderation job queue (sqlite) with background workers
+#
+# POST /api/moderate/jobs stores the texts and returns an id right away; job
+# workers inside the API process claim queued jobs by priority (higher first,
+# then oldest), score them and store the results for GET /api/moderate/jobs/{id}.
+#
+# A claim is a lease (JOB_LEASE_SECONDS) that a heartbeat renews every third of
+# the lease while the job runs, however long one chunk takes. On graceful shutdown a worker puts its job straight back in the queue;
+# a worker that crashes stops renewing, so its job goes back to any worker once
+# the lease runs out, and after JOB_MAX_ATTEMPTS claims the job fails instead
+# of looping. Several serve.py workers can share one JOBS_DB.
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+JOBS_DB = os.environ.get("JOBS_DB", "moderation_jobs.db")
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "1"))
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "1"))
+JOB_RETENTION = float(os.environ.get("JOB_RETENTION", "86400"))  # seconds finished jobs are kept
+JOB_MAX_TEXTS = int(os.environ.get("JOB_MAX_TEXTS", "10000"))
+
+logger = logging.getLogger("jobs")
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobStore:
+    """Jobs table in sqlite; every method is a short transaction safe to call from any thread."""
+
+    def __init__(self, db_path=JOBS_DB, lease=JOB_LEASE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS, clock=time.time):
+        self.db_path = db_path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # Opened on first use so every (forked) worker process gets its own connection
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=10)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, priority INTEGER NOT NULL, model TEXT NOT NULL, "
+                "texts TEXT NOT NULL, single INTEGER NOT NULL, total INTEGER NOT NULL, "
+                "done INTEGER NOT NULL DEFAULT 0, result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+                "owner TEXT, lease_until REAL, created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, created_at)")
+        return self._db
+
+    def submit(self, texts, model_name, priority=0, single=False):
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._connect().execute(
+                "INSERT INTO jobs (id, status, priority, model, texts, single, total, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, priority, model_name, json.dumps(texts), int(single), len(texts), self.clock()),
+            )
+        return job_id
+
+    def get(self, job_id):
+        """Returns the job as a dict (without its input texts), or None."""
+        with self._lock:
+            cursor = self._connect().execute(
+                "SELECT id, status, priority, model, single, total, done, result, error, attempts, "
+                "created_at, started_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,),
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        job = dict(zip([column[0] for column in cursor.description], row))
+        job["single"] = bool(job["single"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def claim(self, owner):
+        """Leases the highest-priority runnable job to `owner`; returns (id, model, texts, single) or None.
+
+        Runnable means queued, or running with an expired lease (its worker died).
+        """
+        now = self.clock()
+        with self._lock:
+            db = self._connect()
+            # Jobs whose lease ran out too often fail rather than crash workers forever
+            db.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, owner = NULL "
+                "WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, f"Job abandoned after {self.max_attempts} attempts", now, RUNNING, now, self.max_attempts),
+            )
+            row = db.execute(
+                "UPDATE jobs SET status = ?, owner = ?, lease_until = ?, attempts = attempts + 1, "
+                "started_at = COALESCE(started_at, ?) "
+                "WHERE id = (SELECT id FROM jobs WHERE status = ? OR (status = ? AND lease_until < ?) "
+                "ORDER BY priority DESC, created_at LIMIT 1) "
+                "RETURNING id, model, texts, single",
+                (RUNNING, owner, now + self.lease, now, QUEUED, RUNNING, now),
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2]), bool(row[3])
+
+    def progress(self, job_id, owner, done):
+        """Records progress and renews the lease; False if the job is no longer ours."""
+        with self._lock:
+            cursor = self._connect().execute(
+                "UPDATE jobs SET done = ?, lease_until = ? WHERE id = ? AND owner = ? AND status = ?",
+                (done, self.clock() + self.lease, job_id, owner, RUNNING),
+            )
+        return cursor.rowcount == 1
+
+    def renew(self, job_id, owner):
+        """Extends the lease without recording progress; False if the job is no longer ours."""
+        with self._lock:
+            cursor = self._connect().execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND owner = ? AND status = ?",
+                (self.clock() + self.lease, job_id, owner, RUNNING),
+            )
+        return cursor.rowcount == 1
+
+    def finish(self, job_id, owner, result=None, error=None):
+        with self._lock:
+            self._connect().execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, done = CASE WHEN ? THEN total ELSE done END, "
+                "finished_at = ?, owner = NULL, lease_until = NULL WHERE id = ? AND owner = ?",
+                (
+                    FAILED if error else DONE, None if error else json.dumps(result), error,
+                    error is None, self.clock(), job_id, owner,
+                ),
+            )
+
+    def release(self, job_id, owner):
+        """Puts a job that was interrupted by shutdown back in the queue, without counting the attempt."""
+        with self._lock:
+            self._connect().execute(
+                "UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL, attempts = attempts - 1 "
+                "WHERE id = ? AND owner = ? AND status = ?",
+                (QUEUED, job_id, owner, RUNNING),
+            )
+
+    def purge(self, retention=JOB_RETENTION):
+        with self._lock:
+            cursor = self._connect().execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (DONE, FAILED, self.clock() - retention)
+            )
+        return cursor.rowcount
+
+    def counts(self):
+        with self._lock:
+            rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)} | dict(rows)
+
+
+class JobLost(Exception):
+    """The job's lease expired and another worker claimed it."""
+
+
+class JobWorkers:
+    """Background asyncio tasks that claim and run jobs from a JobStore.
+
+    `run(job_id, model_name, texts, report)` does the work and returns the
+    result; it should call `await report(done)` after each chunk, which records
+    progress and raises JobLost if another worker has taken the job over. The
+    lease itself is renewed by a heartbeat while `run` is busy, so a chunk may
+    take longer than the lease; if the heartbeat finds the job taken over, the
+    run is cancelled.
+    If given, `ready()` is awaited before every claim (e.g. until the model
+    has loaded), so no lease runs down while the work cannot start.
+    """
+
+    def __init__(self, store, run, workers=JOB_WORKERS, poll_interval=JOB_POLL_INTERVAL, ready=None):
+        self.store = store
+        self.run = run
+        self.ready = ready
+        self.workers = max(0, int(workers))
+        self.poll_interval = poll_interval
+        self.completed = 0
+        self.failed = 0
+        self._tasks = []
+        self._wake = None
+
+    def start(self):
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._loop(f"{os.getpid()}-{i}")) for i in range(self.workers)]
+
+    def notify(self):
+        """Wakes idle workers in this process after a submit instead of waiting for the next poll."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _loop(self, worker_id):
+        owner = f"{worker_id}-{uuid.uuid4().hex[:8]}"
+        last_purge = 0.0
+        while True:
+            if self.ready is not None:
+                await self.ready()
+            self._wake.clear()
+            try:
+                job = await asyncio.to_thread(self.store.claim, owner)
+            except sqlite3.Error:
+                logger.exception("Claiming a job failed")
+                job = None
+            if job is None:
+                if time.monotonic() - last_purge > 3600:
+                    last_purge = time.monotonic()
+                    await asyncio.to_thread(self.store.purge)
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run_one(owner, *job)
+
+    async def _heartbeat(self, job_id, owner):
+        """Renews the lease every third of it; returns once the job is no longer ours."""
+        while True:
+            await asyncio.sleep(self.store.lease / 3)
+            try:
+                if not await asyncio.to_thread(self.store.renew, job_id, owner):
+                    return
+            except sqlite3.Error:
+                logger.exception("Renewing the lease of job %s failed", job_id)
+
+    async def _run_one(self, owner, job_id, model_name, texts, single):
+        async def report(done):
+            if not await asyncio.to_thread(self.store.progress, job_id, owner, done):
+                raise JobLost(job_id)
+
+        work = asyncio.ensure_future(self.run(job_id, model_name, texts, report))
+        heartbeat = asyncio.ensure_future(self._heartbeat(job_id, owner))
+        try:
+            await asyncio.wait({work, heartbeat}, return_when=asyncio.FIRST_COMPLETED)
+            if not work.done():
+                work.cancel()
+                await asyncio.gather(work, return_exceptions=True)
+                raise JobLost(job_id)
+            results = work.result()
+        except JobLost:
+            logger.warning("Job %s was taken over by another worker", job_id)
+            return
+        except asyncio.CancelledError:
+            # Graceful shutdown: hand the job back now rather than when the lease expires
+            work.cancel()
+            self.store.release(job_id, owner)
+            raise
+        except Exception as e:
+            logger.exception("Job %s failed", job_id)
+            self.failed += 1
+            await asyncio.to_thread(self.store.finish, job_id, owner, error=f"Moderation failed: {str(e)}")
+            return
+        finally:
+            heartbeat.cancel()
+        self.completed += 1
+        await asyncio.to_thread(self.store.finish, job_id, owner, result=results[0] if single else results)
@@ -0,0 +1,126 @@
+# Incremental moderation for the /ws/moderate live channel
+#
+# The client sends the whole text after every edit; the server waits for the
+# typing to pause (WS_DEBOUNCE_MS), splits the latest text into sentences and
+# scores only sentences it has not scored on this connection before. Unchanged
+# sentences reuse their previous scores, and new ones are scored the way
+# /api/moderate scores a text (shared moderation cache, micro-batcher, token
+# windows for long sentences), so a keystroke usually costs one short sentence
+# instead of the whole document.
+import asyncio
+import os
+import re
+
+from chunking import aggregate
+
+WS_DEBOUNCE_MS = float(os.environ.get("WS_DEBOUNCE_MS", "250"))
+WS_MAX_WAIT_MS = float(os.environ.get("WS_MAX_WAIT_MS", "1000"))  # score at least this often while typing
+WS_MAX_TEXT_CHARS = int(os.environ.get("WS_MAX_TEXT_CHARS", "100000"))
+
+# A sentence runs up to terminal punctuation (plus closing quotes/brackets) or a line break
+SENTENCE_RE = re.compile(r"[^.!?\n]+(?:[.!?]+[\"')\]]*|\n|$)|[.!?]+")
+
+
+def split_sentences(text):
+    """Returns (start, end) spans of the non-blank sentences in `text`, whitespace trimmed."""
+    spans = []
+    for match in SENTENCE_RE.finditer(text):
+        sentence = match.group()
+        stripped = sentence.strip()
+        if stripped:
+            start = match.start() + len(sentence) - len(sentence.lstrip())
+            spans.append((start, start + len(stripped)))
+    return spans
+
+
+async def debounced(receive, debounce_ms=WS_DEBOUNCE_MS, max_wait_ms=WS_MAX_WAIT_MS):
+    """Yields the newest message from `receive` once messages pause for `debounce_ms`.
+
+    Messages arriving while the consumer is busy replace each other, so a fast
+    typist never builds a backlog, and a continuous stream still yields at
+    least every `max_wait_ms`. Errors from `receive` (e.g. a disconnect) are
+    re-raised to the consumer.
+    """
+    loop = asyncio.get_running_loop()
+    debounce, max_wait = debounce_ms / 1000, max_wait_ms / 1000
+    latest, errors = [], []
+    arrived = asyncio.Event()
+
+    async def reader():
+        try:
+            while True:
+                latest[:] = [await receive()]
+                arrived.set()
+        except Exception as e:
+            errors.append(e)
+            arrived.set()
+
+    task = asyncio.ensure_future(reader())
+    try:
+        while True:
+            await arrived.wait()
+            first = loop.time()
+            while True:
+                arrived.clear()
+                if errors:
+                    raise errors[0]
+                remaining = min(debounce, first + max_wait - loop.time())
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(arrived.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            yield latest.pop()
+    finally:
+        task.cancel()
+
+
+class LiveSession:
+    """Per-connection sentence scores, so each update only scores what changed.
+
+    `score_sentences(texts, model_name)` is the API's per-sentence scorer. Only
+    the sentences of the latest text are kept, which bounds memory per connection.
+    """
+
+    def __init__(self, score_sentences):
+        self.score_sentences = score_sentences
+        self.model_name = None
+        self.sentences = {}  # sentence -> scores from the previous update
+        self.rescored = 0
+        self.reused = 0
+
+    async def update(self, text, model_name):
+        spans = split_sentences(text)
+        pieces = [text[start:end] for start, end in spans]
+        previous = self.sentences if model_name == self.model_name else {}
+        changed = list(dict.fromkeys(piece for piece in pieces if piece not in previous))
+        fresh = dict(zip(changed, await self.score_sentences(changed, model_name))) if changed else {}
+        scores = [previous[piece] if piece in previous else fresh[piece] for piece in pieces]
+
+        self.model_name = model_name
+        self.sentences = dict(zip(pieces, scores))
+        self.rescored += len(changed)
+        self.reused += len(pieces) - len(changed)
+
+        result = {
+            "toxicity": "non-toxic",
+            "sentences": [
+                {
+                    "start": start,
+                    "end": end,
+                    "toxicity": "toxic" if sentence_scores["toxicity"] > 0.5 else "non-toxic",
+                    "score": sentence_scores["toxicity"],
+                }
+                for (start, end), sentence_scores in zip(spans, scores)
+            ],
+            "rescored": len(changed),
+            "reused": len(pieces) - len(changed),
+        }
+        if scores:
+            combined, driver = aggregate(scores)
+            start, end = spans[driver]
+            result["toxicity"] = "toxic" if combined["toxicity"] > 0.5 else "non-toxic"
+            result["toxicity_scores"] = combined
+            result["driving_span"] = {"start": start, "end": end, "toxicity": scores[driver]["toxicity"]}
+        return result
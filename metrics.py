@@ -0,0 +1,213 @@
+# Minimal Prometheus text-format metrics with lock-free recording
+#
+# Each thread records into its own shard (threading.local), so observing a
+# value never takes a lock; shards are only summed when /metrics is scraped.
+import threading
+import time
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class Registry:
+    """The metrics one /metrics endpoint exposes, in registration order."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()  # what api.py serves; tests pass their own so nothing leaks into it
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Sharded:
+    def __init__(self, name, help_text, registry=REGISTRY):
+        self.name = name
+        self.help = help_text
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()  # only taken when a thread records for the first time
+        registry.register(self)
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshot(self):
+        with self._lock:
+            return [dict(shard) for shard in self._shards]
+
+
+class Counter(_Sharded):
+    type = "counter"
+
+    def inc(self, value=1, **labels):
+        shard = self._shard()
+        key = _label_key(labels)
+        shard[key] = shard.get(key, 0) + value
+
+    def render(self):
+        totals = {}
+        for shard in self._snapshot():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0) + value
+        return [f"{self.name}{_format_labels(key)} {value}" for key, value in sorted(totals.items())]
+
+
+class Gauge(Counter):
+    """A value that goes up and down, recorded lock-free like a counter."""
+
+    type = "gauge"
+
+    def dec(self, value=1, **labels):
+        self.inc(-value, **labels)
+
+
+class Histogram(_Sharded):
+    type = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        super().__init__(name, help_text, registry)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        shard = self._shard()
+        key = _label_key(labels)
+        entry = shard.get(key)
+        if entry is None:
+            # [per-bucket counts (last slot is +Inf), sum, count]
+            entry = shard[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def render(self):
+        merged = {}
+        for shard in self._snapshot():
+            for key, (counts, total, count) in shard.items():
+                into = merged.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+                into[0] = [a + b for a, b in zip(into[0], counts)]
+                into[1] += total
+                into[2] += count
+
+        lines = []
+        for key, (counts, total, count) in sorted(merged.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class Callback:
+    """A gauge or counter read from its owner at scrape time.
+
+    `read()` returns a number, or a list of (labels dict, number) pairs.
+    """
+
+    def __init__(self, name, help_text, read, type="gauge", registry=REGISTRY):
+        self.name = name
+        self.help = help_text
+        self.read = read
+        self.type = type
+        registry.register(self)
+
+    def render(self):
+        value = self.read()
+        if isinstance(value, list):
+            return [f"{self.name}{_format_labels(_label_key(labels))} {v}" for labels, v in value]
+        return [f"{self.name} {value}"]
+
+
+def render():
+    return REGISTRY.render()
+
+
+class HttpMetrics:
+    """The per-route series MetricsMiddleware records, registered in one registry."""
+
+    def __init__(self, registry=REGISTRY):
+        self.requests = Counter("http_requests_total", "HTTP requests by route, method and status", registry)
+        self.latency = Histogram(
+            "http_request_duration_seconds", "End-to-end HTTP latency by route", registry=registry
+        )
+        self.errors = Counter("http_errors_total", "HTTP responses with status >= 400 by route and status", registry)
+        self.in_flight = Gauge("http_requests_in_flight", "HTTP requests being served", registry)
+
+
+HTTP = HttpMetrics()
+ROUTE_KEY = "metrics.route"  # route label for requests answered before routing
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, latency and error statuses per route.
+
+    Routes are labelled by their path template (e.g. /api/moderate/batch), and
+    requests that match no route share the "unmatched" label to keep label
+    cardinality bounded. Middleware that answers before routing (rate limits)
+    names the route in scope[ROUTE_KEY]. `metrics` defaults to the series in
+    REGISTRY.
+    """
+
+    def __init__(self, app, metrics=None):
+        self.app = app
+        self.metrics = metrics or HTTP
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics = self.metrics
+        metrics.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight.dec()
+            path = getattr(scope.get("route"), "path", None) or scope.get(ROUTE_KEY, "unmatched")
+            method = scope["method"]
+            metrics.latency.observe(time.perf_counter() - start, route=path, method=method)
+            metrics.requests.inc(route=path, method=method, status=status)
+            if status >= 400:
+                metrics.errors.inc(route=path, status=status)
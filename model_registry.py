@@ -0,0 +1,92 @@
+# Memory-bounded registry of lazily loaded moderation models
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+AVAILABLE_MODELS = tuple(
+    name.strip()
+    for name in os.environ.get("MODERATION_MODELS", "original,unbiased,multilingual").split(",")
+    if name.strip()
+)
+MODEL_MEMORY_BUDGET_MB = float(os.environ.get("MODEL_MEMORY_BUDGET_MB", "1500"))
+
+
+class UnknownModel(ValueError):
+    pass
+
+
+class ModelRegistry:
+    """Loads models on first use and evicts the least recently used under a memory budget.
+
+    `loader(name)` builds a model; its footprint comes from the model's
+    `size_mb()` when it has one. Concurrent first requests for the same model
+    wait on a single shared load. The most recently requested model is never
+    evicted, so a budget smaller than one model still serves that model.
+    """
+
+    def __init__(self, loader, budget_mb=MODEL_MEMORY_BUDGET_MB, available=AVAILABLE_MODELS):
+        self.loader = loader
+        self.budget_mb = budget_mb
+        self.available = tuple(available)
+        self.loads = 0
+        self.evictions = 0
+        self._models = OrderedDict()  # name -> (model, size_mb)
+        self._loading = {}  # name -> Future shared by everyone waiting on that load
+        self._lock = threading.Lock()
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def get(self, name):
+        if name not in self.available:
+            raise UnknownModel(f"Unknown model '{name}'")
+
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is not None:
+                self._models.move_to_end(name)
+                return entry[0]
+            future = self._loading.get(name)
+            owner = future is None
+            if owner:
+                future = self._loading[name] = Future()
+
+        if not owner:
+            return future.result()
+
+        try:
+            model = self.loader(name)
+            size_mb = model.size_mb() if hasattr(model, "size_mb") else 0.0
+        except BaseException as e:
+            with self._lock:
+                del self._loading[name]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._models[name] = (model, size_mb)
+            del self._loading[name]
+            self.loads += 1
+            self._evict()
+        future.set_result(model)
+        return model
+
+    def _evict(self):
+        # Callers that already hold an evicted model keep using it until they finish
+        while len(self._models) > 1 and self.used_mb() > self.budget_mb:
+            self._models.popitem(last=False)
+            self.evictions += 1
+
+    def used_mb(self):
+        return sum(size for _, size in self._models.values())
+
+    def stats(self):
+        return {
+            "available": list(self.available),
+            "loaded": [{"name": name, "size_mb": round(size, 1)} for name, (_, size) in self._models.items()],
+            "used_mb": round(self.used_mb(), 1),
+            "budget_mb": self.budget_mb,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
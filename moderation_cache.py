@@ -0,0 +1,209 @@
+# Content-addressed cache for moderation scores (LRU + TTL, optional sqlite tier)
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_MAX_ENTRIES = int(os.environ.get("MODERATION_CACHE_SIZE", "10000"))
+CACHE_TTL = float(os.environ.get("MODERATION_CACHE_TTL", "3600"))
+CACHE_DB = os.environ.get("MODERATION_CACHE_DB")  # unset = memory tier only
+DB_PURGE_EVERY = 1000  # writes between sweeps of expired sqlite rows
+DB_WRITE_BATCH = 500  # most rows the background writer commits per transaction
+
+logger = logging.getLogger("moderation_cache")
+
+
+def cache_key(text, model_name):
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class ModerationCache:
+    """Maps sha256(model, text) to the per-label scores returned by the model.
+
+    The memory tier holds at most `max_entries` results and evicts the least
+    recently used one first; entries older than `ttl` seconds are treated as
+    misses. When `db_path` is set, results are also written to sqlite so they
+    survive restarts, and memory misses fall through to it.
+
+    Serving code only touches sqlite off the event loop: `get_many` reads it
+    on a thread, and `put` queues rows for a background writer that commits
+    them in batches.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, db_path=CACHE_DB):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl = ttl
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()  # key -> (expires_at, scores)
+        self._lock = threading.Lock()  # memory tier only, never held across sqlite calls
+        self._db = None
+        self._db_pid = None
+        self._db_lock = threading.Lock()
+        self._pending = []  # (key, scores json, expires_at) rows waiting for the writer
+        self._writing = 0
+        self._writer = None
+        self._writer_wakeup = threading.Condition()
+        self._writes = 0
+
+    def _connect(self):
+        # Opened on first use so every (forked) worker process gets its own connection
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")  # safe with WAL; commits skip the fsync
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS moderation_cache ("
+                "key TEXT PRIMARY KEY, scores TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db_pid = os.getpid()
+        return self._db
+
+    def get(self, text, model_name):
+        """Looks one text up in both tiers, blocking on sqlite; not for the event loop."""
+        keys, results, missing, now = self._get_memory([text], model_name)
+        if missing:
+            results = self._merge(keys, results, self._get_disk(missing, now))
+        return results[0]
+
+    async def get_many(self, texts, model_name):
+        """Scores per text (None on a miss); sqlite is only read, on a thread, for memory misses."""
+        keys, results, missing, now = self._get_memory(texts, model_name)
+        if missing:
+            results = self._merge(keys, results, await asyncio.to_thread(self._get_disk, missing, now))
+        return results
+
+    def _get_memory(self, texts, model_name):
+        keys = [cache_key(text, model_name) for text in texts]
+        now = time.time()
+        results = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] <= now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    results.append(None)
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                results.append(dict(entry[1]))
+            missing = [key for key, scores in zip(keys, results) if scores is None]
+            if not self.db_path:
+                self.misses += len(missing)
+                missing = []
+        return keys, results, list(dict.fromkeys(missing)), now
+
+    def _get_disk(self, keys, now):
+        rows = []
+        with self._db_lock:
+            db = self._connect()
+            for offset in range(0, len(keys), DB_WRITE_BATCH):  # stays under sqlite's variable limit
+                part = keys[offset:offset + DB_WRITE_BATCH]
+                rows += db.execute(
+                    f"SELECT key, scores, expires_at FROM moderation_cache WHERE key IN ({', '.join('?' * len(part))})",
+                    part,
+                ).fetchall()
+        found = {key: (expires_at, json.loads(scores)) for key, scores, expires_at in rows if expires_at > now}
+        with self._lock:
+            for key, (expires_at, scores) in found.items():
+                self._store(key, expires_at, scores)
+        return {key: scores for key, (_, scores) in found.items()}
+
+    def _merge(self, keys, results, disk):
+        merged = []
+        with self._lock:
+            for key, scores in zip(keys, results):
+                if scores is None and key in disk:
+                    scores = dict(disk[key])
+                    self.hits += 1
+                    self.disk_hits += 1
+                elif scores is None:
+                    self.misses += 1
+                merged.append(scores)
+        return merged
+
+    def put(self, text, model_name, scores):
+        """Stores in memory at once; the sqlite row is committed later by the background writer."""
+        key = cache_key(text, model_name)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, expires_at, dict(scores))
+        if self.db_path:
+            with self._writer_wakeup:
+                self._pending.append((key, json.dumps(scores), expires_at))
+                if self._writer is None or not self._writer.is_alive():  # threads do not survive fork()
+                    self._writer = threading.Thread(target=self._write_loop, name="moderation-cache-writer", daemon=True)
+                    self._writer.start()
+                self._writer_wakeup.notify_all()
+
+    def _write_loop(self):
+        while True:
+            with self._writer_wakeup:
+                while not self._pending:
+                    self._writer_wakeup.wait()
+                rows, self._pending = self._pending[:DB_WRITE_BATCH], self._pending[DB_WRITE_BATCH:]
+                self._writing = len(rows)
+            try:
+                self._write(rows)
+            except sqlite3.Error:
+                logger.exception("Could not write %d moderation cache rows", len(rows))
+            with self._writer_wakeup:
+                self._writing = 0
+                self._writer_wakeup.notify_all()
+
+    def _write(self, rows):
+        with self._db_lock:
+            db = self._connect()
+            db.execute("BEGIN")
+            try:
+                db.executemany(
+                    "INSERT OR REPLACE INTO moderation_cache (key, scores, expires_at) VALUES (?, ?, ?)", rows
+                )
+                if (self._writes + len(rows)) // DB_PURGE_EVERY > self._writes // DB_PURGE_EVERY:
+                    db.execute("DELETE FROM moderation_cache WHERE expires_at <= ?", (time.time(),))
+                db.execute("COMMIT")
+            except sqlite3.Error:
+                db.execute("ROLLBACK")
+                raise
+            self._writes += len(rows)
+
+    def flush(self, timeout=None):
+        """Blocks until queued sqlite writes are committed; False if `timeout` ran out first."""
+        with self._writer_wakeup:
+            return self._writer_wakeup.wait_for(lambda: not self._pending and not self._writing, timeout)
+
+    def _store(self, key, expires_at, scores):
+        if not self.max_entries:
+            return
+        self._entries[key] = (expires_at, scores)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "disk": bool(self.db_path),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
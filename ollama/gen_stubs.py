@@ -46,6 +46,7 @@ Generate a Python test file that matches *exactly* this structure and style:
     11. test_moderate_with_valid_text
     12. test_moderate_with_empty_text
     13. test_moderate_invalid_payload_ollama
+- test_protected_with_valid_token must log in first and send the returned token; tokens are signed, so never hardcode one
 - Use consistent indentation, spacing, and sectioning.
 
 Output only the final Python code — no explanations, comments, or markdown formatting.
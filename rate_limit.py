@@ -0,0 +1,157 @@
+# Sliding-window rate limiting for login and moderation
+#
+# Each key keeps two fixed-window counters (previous and current); the sliding
+# count is the current window plus the previous one weighted by how much of it
+# still overlaps the sliding window. That is O(1) time and memory per key.
+#
+# RATE_LIMITS sets per-IP limits per path, e.g.
+#   RATE_LIMITS="/api/login=100/60,/api/moderate=600/60"
+# and LOGIN_USERNAME_LIMIT caps failed logins per username (default 20 per 5 min).
+import json
+import math
+import os
+import time
+
+from metrics import ROUTE_KEY, Counter
+
+DEFAULT_RATE_LIMITS = "/api/login=100/60,/api/moderate=600/60,/api/moderate/batch=60/60"
+RATE_LIMITS = os.environ.get("RATE_LIMITS", DEFAULT_RATE_LIMITS)
+LOGIN_USERNAME_LIMIT = os.environ.get("LOGIN_USERNAME_LIMIT", "20/300")
+# Use the first X-Forwarded-For hop as the client IP (only behind a trusted proxy)
+TRUST_FORWARDED_FOR = os.environ.get("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+SHARDS = 16
+SWEEP_EVERY = 1024  # hits between sweeps of one shard for idle keys
+
+RATE_LIMITED = Counter("rate_limited_total", "Requests rejected with 429 by limiter and path")
+
+
+def parse_limit(spec):
+    """Parses "100/60" into (100, 60.0): at most 100 hits per 60 seconds."""
+    count, _, seconds = spec.partition("/")
+    return int(count), float(seconds or 60)
+
+
+def parse_route_limits(spec):
+    limits = {}
+    for item in spec.split(","):
+        if item.strip():
+            path, _, limit = item.strip().partition("=")
+            limits[path.strip()] = SlidingWindowLimiter(*parse_limit(limit))
+    return limits
+
+
+class SlidingWindowLimiter:
+    """Counts hits per key over a sliding `window` and admits at most `limit`.
+
+    Keys are spread over SHARDS plain dicts; every call runs on the event loop,
+    so updates need no locks. Every SWEEP_EVERY hits one shard is swept for
+    keys idle for two windows, which keeps memory bounded by active clients.
+    """
+
+    def __init__(self, limit, window, clock=time.monotonic):
+        self.limit = limit
+        self.window = window
+        self.clock = clock
+        self.rejected = 0
+        self._shards = [{} for _ in range(SHARDS)]
+        self._hits = 0
+        self._next_sweep = 0
+
+    def _entry(self, key, now):
+        shard = self._shards[hash(key) % SHARDS]
+        slot = int(now // self.window)
+        entry = shard.get(key)
+        if entry is None:
+            entry = shard[key] = [slot, 0, 0]  # [window slot, previous count, current count]
+        elif entry[0] != slot:
+            entry[1] = entry[2] if entry[0] == slot - 1 else 0
+            entry[2] = 0
+            entry[0] = slot
+        return entry
+
+    def _retry_after(self, entry, now):
+        """Seconds until one more hit fits under the limit."""
+        elapsed = now - entry[0] * self.window
+        if entry[2] >= self.limit or entry[1] == 0:
+            return max(1, math.ceil(self.window - elapsed))
+        # previous * (1 - (elapsed + t) / window) + current < limit
+        wait = self.window * (1 - (self.limit - entry[2]) / entry[1]) - elapsed
+        return max(1, math.ceil(wait))
+
+    def check(self, key):
+        """Returns 0 if `key` may proceed, else the seconds to wait; does not count a hit."""
+        now = self.clock()
+        entry = self._entry(key, now)
+        overlap = 1 - (now - entry[0] * self.window) / self.window
+        if entry[1] * overlap + entry[2] < self.limit:
+            return 0
+        self.rejected += 1
+        return self._retry_after(entry, now)
+
+    def add(self, key):
+        self._entry(key, self.clock())[2] += 1
+        self._hits += 1
+        if self._hits % SWEEP_EVERY == 0:
+            self._sweep()
+
+    def hit(self, key):
+        """check() and, if admitted, add(); returns 0 or the seconds to wait."""
+        retry_after = self.check(key)
+        if not retry_after:
+            self.add(key)
+        return retry_after
+
+    def _sweep(self):
+        shard = self._shards[self._next_sweep]
+        self._next_sweep = (self._next_sweep + 1) % SHARDS
+        oldest = int(self.clock() // self.window) - 1
+        for key in [key for key, entry in shard.items() if entry[0] < oldest]:
+            del shard[key]
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+
+def client_ip(scope):
+    if TRUST_FORWARDED_FOR:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying per-IP limits by exact request path.
+
+    Runs before routing, so rejected requests never have their body read,
+    parsed or scored. Register it before CORSMiddleware so 429s carry the
+    CORS headers.
+    """
+
+    def __init__(self, app, limits=None):
+        self.app = app
+        self.limits = parse_route_limits(RATE_LIMITS) if limits is None else limits
+
+    async def __call__(self, scope, receive, send):
+        limiter = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limiter is None or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+
+        retry_after = limiter.hit(client_ip(scope))
+        if not retry_after:
+            return await self.app(scope, receive, send)
+
+        RATE_LIMITED.inc(limiter="ip", path=scope["path"])
+        scope[ROUTE_KEY] = scope["path"]  # a configured limit path, so label cardinality stays bounded
+        body = json.dumps({"detail": "Too many requests"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
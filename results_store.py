@@ -0,0 +1,377 @@
+# Real pass/fail outcomes for the Test Insights page
+#
+# Report artifacts are ingested into a small sqlite store (RESULTS_DB):
+#   - newman JSON exports (artifacts/newman-report.json),
+#   - pytest-html 4 reports (the data-jsonblob attribute of *.html),
+#   - JUnit XML (*.xml, e.g. pytest --junitxml),
+#   - AI failure reports written by tests/conftest.py (failure_reports/*.md).
+# Every format is read as a stream (ijson, iterparse, chunked HTML) so memory
+# stays flat however large a report grows, and a file is only parsed again
+# when its (mtime, size) changed, so a rerun with unchanged artifacts only
+# costs a directory walk. The latest outcome of each test wins.
+import html
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+ARTIFACTS_DIR = os.environ.get("ARTIFACTS_DIR", str(BASE_DIR / "artifacts"))
+RESULTS_DB = os.environ.get("RESULTS_DB", "test_results.db")
+READ_CHUNK = 1 << 16
+
+logger = logging.getLogger("results_store")
+
+PASSED, FAILED, SKIPPED = "passed", "failed", "skipped"
+# pytest-html result column -> outcome; reruns are superseded by the final run
+PYTEST_HTML_OUTCOMES = {
+    "Passed": PASSED, "XPassed": PASSED, "Failed": FAILED, "Error": FAILED, "Skipped": SKIPPED, "XFailed": SKIPPED,
+}
+
+
+def result_key(path, name):
+    """Store key of a discovered test: (file relative to the repo, test name); Postman items match by name."""
+    if str(path).endswith(".json"):
+        return "", name
+    try:
+        return Path(path).resolve().relative_to(BASE_DIR).as_posix(), name
+    except ValueError:
+        return Path(path).as_posix(), name
+
+
+def _split_nodeid(nodeid):
+    """tests/api/test_x.py::TestY::test_z[id] -> ("tests/api/test_x.py", "test_z[id]")"""
+    parts = nodeid.replace("\\", "/").split("::")
+    return parts[0], parts[-1]
+
+
+# ---------- newman ----------
+
+_EXECUTION = "run.executions.item"
+_NEWMAN_ERRORS = {_EXECUTION + ".assertions.item.error", _EXECUTION + ".requestError", _EXECUTION + ".testScript.item.error"}
+
+def parse_newman(stream):
+    """Yields (file, name, outcome, finished_at, duration, message) per request execution."""
+    import ijson
+
+    pending, finished_at = [], None  # rows seen before the run's completion time, if it comes last
+    name, failed, assertions, skipped = None, False, 0, 0
+    # Dispatch on the event first: most events are response body bytes and fall through cheaply
+    for prefix, event, value in ijson.parse(stream):
+        if event == "number":
+            if prefix == "run.timings.completed":
+                finished_at = float(value) / 1000
+        elif event == "start_map":
+            if prefix == _EXECUTION:
+                name, failed, assertions, skipped = None, False, 0, 0
+            elif prefix == _EXECUTION + ".assertions.item":
+                assertions += 1
+            elif prefix in _NEWMAN_ERRORS:
+                failed = True
+        elif event == "string":
+            if prefix == _EXECUTION + ".item.name":
+                name = value
+        elif event == "boolean":
+            if prefix == _EXECUTION + ".assertions.item.skipped" and value:
+                skipped += 1
+        elif event == "end_map" and prefix == _EXECUTION and name:
+            outcome = FAILED if failed else SKIPPED if assertions and skipped == assertions else PASSED
+            if finished_at is None:
+                pending.append(("", name, outcome))
+            else:
+                yield "", name, outcome, finished_at, None, None
+    for row in pending:
+        yield (*row, finished_at, None, None)
+
+
+# ---------- pytest-html ----------
+
+_GENERATED = re.compile(r"Report generated on (\d{2}-\w{3}-\d{4}) at (\d{2}:\d{2}:\d{2})")
+_ENTITY_TAIL = re.compile(r"&[#\w]{0,16}$")
+
+
+class JsonBlob:
+    """The data-jsonblob attribute of a pytest-html 4 report as a byte stream for ijson.
+
+    The attribute is HTML-escaped JSON on a single line that can be tens of
+    MB long; it is unescaped chunk by chunk instead of being loaded whole.
+    """
+
+    MARKER = 'data-jsonblob="'
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.generated = None  # "Report generated on ..." time, printed above the data
+        self.found = False
+        self._raw = ""  # escaped text read ahead, possibly ending in half an entity
+        self._text = ""  # unescaped text not returned yet
+        self._done = True
+        window = ""
+        while True:
+            chunk = stream.read(READ_CHUNK)
+            if not chunk:
+                return
+            window += chunk
+            if self.generated is None:
+                match = _GENERATED.search(window)
+                if match:
+                    self.generated = datetime.strptime(" ".join(match.groups()), "%d-%b-%Y %H:%M:%S").timestamp()
+            start = window.find(self.MARKER)
+            if start >= 0:
+                self.found, self._done = True, False
+                self._raw = window[start + len(self.MARKER):]
+                return
+            window = window[-200:]  # a marker or the generated line may straddle two chunks
+
+    def read(self, size=-1):
+        while not self._done and (size < 0 or len(self._text) < size):
+            chunk = self.stream.read(READ_CHUNK)
+            raw = self._raw + chunk
+            end = raw.find('"')  # quotes inside the JSON are escaped as &#34;
+            if end >= 0 or not chunk:
+                self._text += html.unescape(raw if end < 0 else raw[:end])
+                self._raw, self._done = "", True
+            else:
+                tail = _ENTITY_TAIL.search(raw)
+                cut = tail.start() if tail else len(raw)
+                self._text += html.unescape(raw[:cut])
+                self._raw = raw[cut:]
+        if size < 0:
+            out, self._text = self._text, ""
+        else:
+            out, self._text = self._text[:size], self._text[size:]
+        return out.encode("utf-8")
+
+
+def _duration(text):
+    """pytest-html durations: "9 ms" or "00:01:02"."""
+    try:
+        if text.endswith(" ms"):
+            return float(text[:-3]) / 1000
+        hours, minutes, seconds = text.split(":")
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except (ValueError, AttributeError):
+        return None
+
+
+def parse_pytest_html(stream):
+    """Yields (file, name, outcome, finished_at, duration, message) per test of a pytest-html report."""
+    import ijson
+
+    blob = JsonBlob(stream)
+    if not blob.found:
+        return
+    latest = {}  # test id -> (outcome, duration) of its last run
+    test_id = result = duration = None
+    for prefix, event, value in ijson.parse(blob):
+        if prefix == "tests" and event == "map_key":
+            test_id = value
+        elif test_id is None or not prefix.startswith(f"tests.{test_id}.item"):
+            continue
+        elif prefix == f"tests.{test_id}.item" and event == "start_map":
+            result = duration = None
+        elif prefix == f"tests.{test_id}.item.result" and event == "string":
+            result = value
+        elif prefix == f"tests.{test_id}.item.duration" and event == "string":
+            duration = _duration(value)
+        elif prefix == f"tests.{test_id}.item" and event == "end_map" and result in PYTEST_HTML_OUTCOMES:
+            latest[test_id] = (PYTEST_HTML_OUTCOMES[result], duration)
+    for test_id, (outcome, duration) in latest.items():
+        yield (*_split_nodeid(test_id), outcome, blob.generated, duration, None)
+
+
+# ---------- JUnit XML ----------
+
+def _junit_file(case):
+    if case.get("file"):
+        return case.get("file").replace("\\", "/")
+    # pytest: classname is the dotted module path, followed by the class for class-based tests
+    parts = (case.get("classname") or "").split(".")
+    while parts and parts[-1][:1].isupper():
+        parts.pop()
+    return "/".join(parts) + ".py" if parts else ""
+
+
+def parse_junit(stream):
+    """Yields (file, name, outcome, finished_at, duration, message) per <testcase>."""
+    suites = []  # timestamps of the enclosing <testsuite> elements
+    for event, element in ElementTree.iterparse(stream, events=("start", "end")):
+        if element.tag == "testsuite":
+            if event == "start":
+                stamp = element.get("timestamp")
+                try:
+                    suites.append(datetime.fromisoformat(stamp).timestamp() if stamp else None)
+                except ValueError:
+                    suites.append(None)
+            else:
+                suites.pop()
+                element.clear()
+        elif element.tag == "testcase" and event == "end":
+            children = {child.tag: child for child in element}
+            problem = children.get("failure", children.get("error"))
+            outcome = FAILED if problem is not None else SKIPPED if "skipped" in children else PASSED
+            message = (problem.get("message") or "")[:500] if problem is not None else None
+            try:
+                duration = float(element.get("time"))
+            except (TypeError, ValueError):
+                duration = None
+            finished_at = next((stamp for stamp in reversed(suites) if stamp is not None), None)
+            yield _junit_file(element), element.get("name", ""), outcome, finished_at, duration, message
+            element.clear()
+
+
+# ---------- failure reports ----------
+
+_REPORT_TITLE = re.compile(r"^#\s*\S*\s*Failure Report:\s*(\S+)")
+_REPORT_TIME = re.compile(r"\*\*Timestamp:\*\*\s*(\d{8}_\d{6})")
+
+
+def parse_failure_report(stream, path):
+    """The failed test of one conftest.py failure report; only the header lines are read."""
+    nodeid = stamp = None
+    for _, line in zip(range(10), stream):
+        title, when = _REPORT_TITLE.match(line.strip()), _REPORT_TIME.search(line)
+        if title and nodeid is None:
+            nodeid = title.group(1)
+        if when:
+            stamp = datetime.strptime(when.group(1), "%Y%m%d_%H%M%S").timestamp()
+    if nodeid:
+        yield (*_split_nodeid(nodeid), FAILED, stamp, None, path)
+
+
+def parse_artifact(path):
+    """Yields the result rows of one artifact, dispatching on the file type."""
+    if path.endswith(".json"):
+        with open(path, "rb") as f:
+            yield from parse_newman(f)
+    elif path.endswith(".html"):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            yield from parse_pytest_html(f)
+    elif path.endswith(".xml"):
+        with open(path, "rb") as f:
+            yield from parse_junit(f)
+    else:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            yield from parse_failure_report(f, path)
+
+
+def _artifacts(root):
+    """(path, mtime_ns, size) of every report artifact under `root`."""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in ("images", "videos") and not d.startswith(".")]
+        in_failures = os.path.basename(dirpath) == "failure_reports"
+        for filename in filenames:
+            if not filename.endswith((".json", ".html", ".xml")) and not (in_failures and filename.endswith(".md")):
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            found.append((path, stat.st_mtime_ns, stat.st_size))
+    return sorted(found)
+
+
+class ResultsStore:
+    """Results table in sqlite, one row per (artifact, test); safe to call from any thread."""
+
+    def __init__(self, db_path=RESULTS_DB):
+        self.db_path = db_path
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=10)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sources ("
+                "path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, "
+                "results INTEGER NOT NULL, error TEXT, ingested_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "source TEXT NOT NULL, file TEXT NOT NULL, name TEXT NOT NULL, outcome TEXT NOT NULL, "
+                "finished_at REAL, duration REAL, message TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_test ON results (file, name, finished_at)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_source ON results (source)")
+        return self._db
+
+    def ingest(self, artifacts_dir=ARTIFACTS_DIR):
+        """Loads new and changed artifacts, forgets deleted ones; returns a version for caching.
+
+        The version is the tuple of (path, mtime_ns, size) of every artifact.
+        """
+        found = _artifacts(artifacts_dir)
+        with self._lock:
+            db = self._connect()
+            known = {row[0]: tuple(row[1:]) for row in db.execute("SELECT path, mtime_ns, size FROM sources")}
+            for path, mtime_ns, size in found:
+                if known.get(path) == (mtime_ns, size):
+                    continue
+                db.execute("BEGIN")
+                try:
+                    db.execute("DELETE FROM results WHERE source = ?", (path,))
+                    before, error = db.total_changes, None
+                    try:
+                        # Rows go from the parser straight into sqlite, never into a list
+                        db.executemany(
+                            "INSERT INTO results (source, file, name, outcome, finished_at, duration, message) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (
+                                # Reports without a run time of their own count as written at their mtime
+                                (path, file, name, outcome, mtime_ns / 1e9 if at is None else at, duration, message)
+                                for file, name, outcome, at, duration, message in parse_artifact(path)
+                            ),
+                        )
+                    except Exception as e:
+                        error = f"Could not ingest {path}: {e}"
+                        logger.warning(error)
+                        db.execute("DELETE FROM results WHERE source = ?", (path,))
+                    results = 0 if error else db.total_changes - before
+                    db.execute(
+                        "INSERT OR REPLACE INTO sources (path, mtime_ns, size, results, error, ingested_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (path, mtime_ns, size, results, error, time.time()),
+                    )
+                    db.execute("COMMIT")
+                except BaseException:
+                    db.execute("ROLLBACK")
+                    raise
+            gone = set(known) - {path for path, _, _ in found}
+            if gone:
+                db.execute("BEGIN")
+                db.executemany("DELETE FROM results WHERE source = ?", [(path,) for path in gone])
+                db.executemany("DELETE FROM sources WHERE path = ?", [(path,) for path in gone])
+                db.execute("COMMIT")
+        return tuple(found)
+
+    def latest(self):
+        """{(file, name): (outcome, finished_at, source)} with the most recent result of every test.
+
+        When two artifacts report the same run time, a failure wins.
+        """
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT file, name, outcome, finished_at, source FROM ("
+                "SELECT *, ROW_NUMBER() OVER (PARTITION BY file, name "
+                "ORDER BY finished_at DESC, outcome = 'failed' DESC) AS n FROM results) WHERE n = 1"
+            ).fetchall()
+        return {(file, name): (outcome, finished_at, source) for file, name, outcome, finished_at, source in rows}
+
+    def errors(self):
+        with self._lock:
+            return [row[0] for row in self._connect().execute("SELECT error FROM sources WHERE error IS NOT NULL")]
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -6,7 +6,15 @@ $backend = Start-Process uvicorn -ArgumentList "api:app --reload --host 127.0.0.
     -PassThru `
     -RedirectStandardOutput artifacts/backend.log `
     -RedirectStandardError artifacts/backend.log
-Start-Sleep -Seconds 5
+# /healthz answers immediately; wait on /readyz until the model is loaded and warmed
+for ($i = 0; $i -lt 120; $i++) {
+    try {
+        Invoke-WebRequest -Uri http://127.0.0.1:8000/readyz -UseBasicParsing | Out-Null
+        break
+    } catch {
+        Start-Sleep -Seconds 1
+    }
+}
 
 Write-Host "Running Newman API tests..."
 newman run tests/postman/collection.json -e tests/postman/environment.json -r cli,html,json `
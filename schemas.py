@@ -0,0 +1,215 @@
+# Request and response models for the API routes
+#
+# Request bodies are parsed straight from bytes by Pydantic's JSON parser
+# (`parse_body`) instead of json.loads + field-by-field checks, and the routes
+# declare response models so FastAPI serializes them with Pydantic's
+# dump_json. Validation errors keep the API's original 400/415 details.
+from typing import Dict, List, Literal, Optional, Union
+
+from fastapi import HTTPException
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
+
+from jobs import JOB_MAX_TEXTS
+from timing import phase
+
+
+class LoginRequest(BaseModel):
+    username: str = Field(min_length=1)
+    password: str = Field(min_length=1)
+
+
+class LoginResponse(BaseModel):
+    status: Literal["success"] = "success"
+    token: str
+    expires_in: int = Field(description="Seconds until the token expires")
+
+
+class ProtectedResponse(BaseModel):
+    message: str
+
+
+class LogoutResponse(BaseModel):
+    status: Literal["logged out"] = "logged out"
+
+
+class ModerateRequest(BaseModel):
+    text: str
+    model: Optional[str] = Field(None, description="Detoxify model; defaults to MODERATION_MODEL")
+
+    @field_validator("text")
+    @classmethod
+    def not_blank(cls, text):
+        if not text.strip():
+            raise ValueError("Text required")
+        return text
+
+
+class DrivingSpan(BaseModel):
+    start: int
+    end: int
+    toxicity: float
+
+
+class LongText(BaseModel):
+    windows: int
+    window_tokens: int
+    aggregation: str
+    driving_span: DrivingSpan
+
+
+class ModerateResponse(BaseModel):
+    text: str
+    toxicity: Literal["toxic", "non-toxic"]
+    toxicity_scores: Dict[str, float]
+    long_text: Optional[LongText] = Field(None, description="Only present when the text was scored in windows")
+
+
+class JobRequest(BaseModel):
+    text: Optional[str] = Field(None, description="One document; use `texts` for several")
+    texts: Optional[List[str]] = Field(None, min_length=1, max_length=JOB_MAX_TEXTS)
+    model: Optional[str] = Field(None, description="Detoxify model; defaults to MODERATION_MODEL")
+    priority: int = Field(0, ge=0, le=9, description="Higher priorities run first")
+
+    @field_validator("text")
+    @classmethod
+    def text_not_blank(cls, text):
+        if text is not None and not text.strip():
+            raise ValueError("Text required")
+        return text
+
+    @field_validator("texts")
+    @classmethod
+    def texts_not_blank(cls, texts):
+        if texts is not None and not all(text.strip() for text in texts):
+            raise ValueError("Texts must be non-empty strings")
+        return texts
+
+    @model_validator(mode="after")
+    def one_input(self):
+        if (self.text is None) == (self.texts is None):
+            raise ValueError("Provide either 'text' or 'texts'")
+        return self
+
+
+class JobSubmitted(BaseModel):
+    id: str
+    status: Literal["queued"] = "queued"
+
+
+class JobStatus(BaseModel):
+    id: str
+    status: Literal["queued", "running", "done", "failed"]
+    priority: int
+    model: str
+    total: int = Field(description="Texts in the job")
+    done: int = Field(description="Texts scored so far")
+    attempts: int
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Union[ModerateResponse, List[ModerateResponse]]] = Field(
+        None, description="One result for `text` jobs, a list for `texts` jobs"
+    )
+    error: Optional[str] = None
+
+
+class ErrorResponse(BaseModel):
+    detail: str
+
+
+LOGIN_ERRORS = {
+    ("username", None): "Username required",
+    ("password", None): "Password required",
+}
+MODERATE_ERRORS = {
+    ("text", "missing"): "Missing 'text' field",
+    ("text", "string_type"): "Text must be a string",
+    ("text", None): "Text required",
+}
+JOB_ERRORS = {
+    ("text", "string_type"): "Text must be a string",
+    ("text", None): "Text required",
+    ("texts", "list_type"): "Texts must be a list",
+    ("texts", "too_short"): "Texts required",
+    ("texts", "too_long"): f"At most {JOB_MAX_TEXTS} texts per job",
+    ("texts", None): "Texts must be non-empty strings",
+    ("model", None): "Model must be a string",
+    ("priority", None): "Priority must be an integer from 0 to 9",
+    (None, None): "Provide either 'text' or 'texts'",
+}
+
+
+# Pydantic error type -> what the field should have been, for fields without a message of their own
+EXPECTED_TYPES = {
+    "string_type": "a string",
+    "int_type": "an integer",
+    "int_parsing": "an integer",
+    "int_from_float": "an integer",
+    "float_type": "a number",
+    "float_parsing": "a number",
+    "bool_type": "a boolean",
+    "bool_parsing": "a boolean",
+    "list_type": "a list",
+    "dict_type": "an object",
+    "model_type": "an object",
+}
+
+
+def field_error(error):
+    """A 400 detail naming the offending field, worded like the per-field messages.
+
+    `{"text": "hi", "model": 3}` -> "Model must be a string"; nested fields are
+    named by their path, e.g. "texts.2".
+    """
+    field = ".".join(str(part) for part in error["loc"])
+    if error["type"] == "missing" or error.get("input", "") is None:
+        return f"Missing '{field}' field"
+    expected = EXPECTED_TYPES.get(error["type"])
+    if expected:
+        return f"{field[:1].upper()}{field[1:]} must be {expected}"
+    return f"Invalid '{field}' field"
+
+
+def error_responses(*statuses):
+    """OpenAPI `responses=` entries documenting {"detail": ...} errors."""
+    return {status: {"model": ErrorResponse} for status in statuses}
+
+
+def request_body(model):
+    """OpenAPI `openapi_extra=` for routes that parse their own body with parse_body."""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": model.model_json_schema()}},
+        }
+    }
+
+
+async def parse_body(request, model, messages, require_json=False):
+    """Validates the raw request body against `model`, raising the API's usual HTTP errors.
+
+    415 when `require_json` and the content type is not JSON, 400 "Invalid JSON"
+    for unparseable bodies, otherwise 400 with the detail from `messages`
+    (keyed by (field, error type), with None as the per-field fallback). Fields
+    without a message get one naming them (`field_error`).
+    """
+    if require_json:
+        media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        if media_type != "application/json":
+            raise HTTPException(status_code=415, detail="Unsupported Media Type: JSON required")
+
+    with phase("read"):
+        raw = await request.body()
+    try:
+        with phase("parse"):  # JSON decoding and schema validation are one fused pass
+            return model.model_validate_json(raw)
+    except ValidationError as e:
+        error = e.errors(include_url=False)[0]
+        if error["type"] == "json_invalid":
+            raise HTTPException(status_code=400, detail="Invalid JSON")
+        field = error["loc"][0] if error["loc"] else None
+        kind = "missing" if error.get("input", "") is None else error["type"]  # explicit null counts as missing
+        detail = messages.get((field, kind)) or messages.get((field, None))
+        if detail is None:
+            detail = field_error(error) if field is not None else "Invalid payload"
+        raise HTTPException(status_code=400, detail=detail)
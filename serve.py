@@ -0,0 +1,266 @@
+# Pre-fork production launcher for api.py
+#
+#   python serve.py --workers 4 --port 8000
+#
+# The parent imports api.py, loads and warms MODERATION_MODEL once, freezes the
+# garbage collector and binds the listening socket, then forks N uvicorn
+# workers. The workers inherit the model weights copy-on-write: tensor storage
+# is never written after loading, so those pages stay shared and total memory
+# grows by each worker's private heap rather than by a full model copy.
+#
+# Signals to the parent:
+#   SIGTERM / SIGINT  graceful shutdown (workers finish in-flight requests)
+#   SIGHUP            rolling restart: start a fresh worker, then retire an old one
+#   SIGUSR1           log RSS / PSS per worker
+#
+# Notes:
+#   - State that api.py keeps in memory (rate-limit counters, the moderation
+#     cache memory tier, metrics, an in-memory USER_DB, token revocations) is
+#     per worker. Point USER_DB, MODERATION_CACHE_DB and AUTH_REVOCATION_DB at
+#     files to share them; without AUTH_REVOCATION_DB a logout only revokes the
+#     token on the worker that handled it.
+#   - Leave AUTH_SECRET unset only if the parent may generate it: workers
+#     inherit the parent's value, so tokens verify on every worker.
+#   - ONNX Runtime sessions are not fork-safe, so with MODERATION_BACKEND=onnx
+#     each worker loads its own session instead of sharing the parent's.
+#   - Windows has no fork(); there serve.py runs a single uvicorn process.
+import argparse
+import gc
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+SERVE_WORKERS = int(os.environ.get("SERVE_WORKERS", str(os.cpu_count() or 1)))
+TORCH_THREADS = int(os.environ.get("TORCH_THREADS", "0"))  # per worker; 0 = cores / workers
+MAX_REQUESTS = int(os.environ.get("SERVE_MAX_REQUESTS", "0"))  # recycle a worker after N requests; 0 = never
+MAX_REQUESTS_JITTER = int(os.environ.get("SERVE_MAX_REQUESTS_JITTER", "0"))
+GRACEFUL_TIMEOUT = float(os.environ.get("SERVE_GRACEFUL_TIMEOUT", "30"))
+
+logger = logging.getLogger("serve")
+
+
+def memory_mb(pid):
+    """(rss, pss) in MB from /proc/<pid>/smaps_rollup; PSS splits shared pages between sharers."""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in ("Rss", "Pss"):
+                    values[name] = int(rest.split()[0]) / 1024
+    except OSError:
+        pass
+    return values.get("Rss", float("nan")), values.get("Pss", float("nan"))
+
+
+def set_torch_threads(threads):
+    torch = sys.modules.get("torch")
+    if torch is not None and threads > 0:
+        torch.set_num_threads(threads)
+
+
+class Arbiter:
+    """Owns the listening socket and keeps `workers` forked uvicorn servers running."""
+
+    def __init__(self, host, port, workers, threads, max_requests, jitter, graceful_timeout):
+        self.host = host
+        self.port = port
+        self.num_workers = max(1, workers)
+        self.threads = threads or max(1, (os.cpu_count() or 1) // self.num_workers)
+        self.max_requests = max_requests
+        self.jitter = jitter
+        self.graceful_timeout = graceful_timeout
+        self.workers = {}  # pid -> start time
+        self.retiring = set()
+        self.stopping = False
+        self.deadline = None
+        self.restart_requested = False
+        self.sock = None
+        self.app = None
+
+    def preload(self):
+        from backends import BACKEND
+
+        if BACKEND in ("torch", "quantized"):
+            try:
+                import torch
+            except ImportError:
+                pass  # api.py reports the missing dependency when the model fails to load
+            else:
+                # Keep the parent single-threaded: intra-op pools started before fork() do not survive it
+                torch.set_num_threads(1)
+
+        import api
+
+        self.app = api.app
+        if self.num_workers > 1 and not api.tokens.db_path:
+            logger.warning(
+                "AUTH_REVOCATION_DB is unset: /api/logout only revokes a token on the worker that handled it; "
+                "the other %d workers keep accepting it until it expires", self.num_workers - 1,
+            )
+        if BACKEND == "onnx":
+            logger.warning("ONNX Runtime sessions are not fork-safe; each worker loads its own model")
+        else:
+            api.get_model()
+        # Objects alive now are never collected, so the GC never writes to (and un-shares) their pages
+        gc.collect()
+        gc.freeze()
+
+    def bind(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(2048)
+        self.sock.set_inheritable(True)
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = time.monotonic()
+            return pid
+
+        code = 0
+        try:
+            self.run_worker()
+        except BaseException:
+            logger.exception("Worker %d crashed", os.getpid())
+            code = 1
+        finally:
+            os._exit(code)  # never run the parent's atexit handlers in a child
+
+    def run_worker(self):
+        for sig in (signal.SIGHUP, signal.SIGUSR1):
+            signal.signal(sig, signal.SIG_IGN)
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(sig, signal.SIG_DFL)  # uvicorn installs its own graceful handlers
+        random.seed()
+        set_torch_threads(self.threads)
+
+        limit = self.max_requests + random.randint(0, self.jitter) if self.max_requests else None
+        config = uvicorn.Config(
+            self.app,
+            lifespan="on",
+            limit_max_requests=limit,
+            timeout_graceful_shutdown=self.graceful_timeout,
+        )
+        uvicorn.Server(config).run(sockets=[self.sock])
+
+    def handle_stop(self, signum, frame):
+        if not self.stopping:
+            logger.info("Received %s, stopping workers", signal.Signals(signum).name)
+            self.stopping = True
+            self.deadline = time.monotonic() + self.graceful_timeout
+            self.signal_workers(signal.SIGTERM)
+
+    def handle_restart(self, signum, frame):
+        self.restart_requested = True
+
+    def handle_report(self, signum, frame):
+        self.log_memory()
+
+    def signal_workers(self, sig, pids=None):
+        for pid in list(self.workers if pids is None else pids):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def log_memory(self):
+        parent_rss, parent_pss = memory_mb(os.getpid())
+        total_rss, total_pss = parent_rss, parent_pss
+        for pid in sorted(self.workers):
+            rss, pss = memory_mb(pid)
+            total_rss += rss
+            total_pss += pss
+            logger.info("worker %d: rss %.0f MB, pss %.0f MB", pid, rss, pss)
+        logger.info(
+            "parent: rss %.0f MB; total pss %.0f MB vs %.0f MB summed rss (%d workers)",
+            parent_rss, total_pss, total_rss, len(self.workers),
+        )
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            started = self.workers.pop(pid, None)
+            retired = pid in self.retiring
+            self.retiring.discard(pid)
+            if started is not None and not self.stopping:
+                code = os.waitstatus_to_exitcode(status)
+                logger.info("Worker %d exited (%s) after %.0fs", pid, code, time.monotonic() - started)
+                if not retired and code > 0 and time.monotonic() - started < 2:
+                    time.sleep(1)  # crash loop: do not fork as fast as the workers die
+
+    def rolling_restart(self):
+        self.restart_requested = False
+        logger.info("Rolling restart of %d workers", len(self.workers))
+        for pid in [pid for pid in self.workers if pid not in self.retiring]:
+            self.spawn()
+            self.retiring.add(pid)
+            self.signal_workers(signal.SIGTERM, [pid])
+
+    def run(self):
+        self.preload()
+        self.bind()
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        signal.signal(signal.SIGHUP, self.handle_restart)
+        signal.signal(signal.SIGUSR1, self.handle_report)
+        logger.info(
+            "Serving on http://%s:%d with %d workers, %d torch threads each",
+            self.host, self.port, self.num_workers, self.threads,
+        )
+
+        while True:
+            self.reap()
+            if self.stopping:
+                if not self.workers:
+                    break
+                if time.monotonic() > self.deadline:
+                    logger.warning("Graceful timeout, killing %d workers", len(self.workers))
+                    self.signal_workers(signal.SIGKILL)
+                    self.deadline = float("inf")
+            else:
+                if self.restart_requested:
+                    self.rolling_restart()
+                while len(self.workers) - len(self.retiring) < self.num_workers:
+                    self.spawn()
+            time.sleep(0.1)
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run api.py on pre-forked workers sharing one model load")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS)
+    parser.add_argument("--threads", type=int, default=TORCH_THREADS, help="torch intra-op threads per worker")
+    parser.add_argument("--max-requests", type=int, default=MAX_REQUESTS)
+    parser.add_argument("--max-requests-jitter", type=int, default=MAX_REQUESTS_JITTER)
+    parser.add_argument("--graceful-timeout", type=float, default=GRACEFUL_TIMEOUT)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(name)s %(message)s")
+
+    if not hasattr(os, "fork"):
+        logger.warning("fork() is unavailable on this platform; running a single worker")
+        uvicorn.run("api:app", host=args.host, port=args.port)
+        return
+
+    Arbiter(
+        args.host, args.port, args.workers, args.threads,
+        args.max_requests, args.max_requests_jitter, args.graceful_timeout,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
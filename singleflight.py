@@ -0,0 +1,59 @@
+# Collapses concurrent identical calls into one computation
+import asyncio
+
+import timing
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share its outcome.
+
+    The first caller for a key starts `fn(*args)` as a task and later callers
+    with the same key await that task instead of starting their own. Every
+    waiter gets the same result, or the same exception. The task is shielded,
+    so a waiter that disconnects never cancels the work for the others. The
+    key is forgotten as soon as the call finishes, so results are never
+    reused after that (the moderation cache covers that case).
+
+    Waiters that joined an existing call record the time as a "shared" phase.
+    """
+
+    def __init__(self):
+        self.leaders = 0
+        self.shared = 0
+        self.errors = 0
+        self._calls = {}  # key -> task
+
+    async def do(self, key, fn, *args):
+        loop = asyncio.get_running_loop()
+        task = self._calls.get(key)
+        if task is not None and task.get_loop() is loop:
+            self.shared += 1
+            with timing.phase("shared"):
+                return await asyncio.shield(task)
+
+        # TestClient may drive each request on a fresh loop; a task from another loop is never shared
+        task = loop.create_task(fn(*args))
+        self._calls[key] = task
+        self.leaders += 1
+        task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Retrieve the exception here so it is not reported as unhandled when every waiter left
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def __len__(self):
+        return len(self._calls)
+
+    def stats(self):
+        calls = self.leaders + self.shared
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "shared": self.shared,
+            "errors": self.errors,
+            "shared_rate": round(self.shared / calls, 4) if calls else 0.0,
+        }
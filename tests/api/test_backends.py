@@ -0,0 +1,68 @@
+# Backend selection and parity-check tests (no model needed)
+import pytest
+
+from backends import TorchBackend, check_parity, load_backend
+from batching import PaddingStats
+
+
+class FixedScores:
+    def __init__(self, toxicity):
+        self.toxicity = toxicity
+
+    def predict(self, texts):
+        return {"toxicity": [self.toxicity] * len(texts), "insult": [0.0] * len(texts)}
+
+
+class WordTokenizer:
+    def __call__(self, texts, truncation=True):
+        return {"input_ids": [[1] * len(text.split()) for text in texts]}
+
+    def pad(self, features):
+        width = max(len(ids) for ids in features["input_ids"])
+        return {"input_ids": [ids + [0] * (width - len(ids)) for ids in features["input_ids"]]}
+
+
+class WordCountBackend(TorchBackend):
+    """Scores each text with its word count and remembers the padded width of every pass."""
+
+    def __init__(self):
+        self.tokenizer = WordTokenizer()
+        self.class_names = ["toxicity"]
+        self.device = "cpu"
+        self.widths = []
+
+    def pad(self, features):
+        return self.tokenizer.pad(features)
+
+    def forward(self, inputs):
+        self.widths.append(len(inputs["input_ids"][0]))
+        return [[float(sum(ids))] for ids in inputs["input_ids"]]
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        load_backend("original", "tensorrt")
+
+
+def test_parity_within_tolerance():
+    result = check_parity(FixedScores(0.81), FixedScores(0.80), texts=["a", "b"], tolerance=0.02)
+    assert result["ok"]
+    assert result["label_agreement"] == 1.0
+
+
+def test_parity_fails_when_verdict_flips():
+    result = check_parity(FixedScores(0.49), FixedScores(0.51), texts=["a"], tolerance=0.05)
+    assert not result["ok"]
+    assert result["label_agreement"] == 0.0
+
+
+def test_score_batch_buckets_by_length_and_keeps_order():
+    backend = WordCountBackend()
+    padding = PaddingStats()
+    texts = ["w " * 40, "one", "two words", "w " * 10, "three little words"]
+    results = backend.score_batch(texts, boundaries=(4, 16, 64), padding=padding)
+
+    assert [r["toxicity"] for r in results] == [40.0, 1.0, 2.0, 10.0, 3.0]
+    assert sorted(backend.widths) == [3, 10, 40]
+    assert padding.real_tokens == 56
+    assert padding.padded_tokens == 59
@@ -0,0 +1,113 @@
+# Micro-batching tests (no model needed)
+import asyncio
+import gc
+
+from batching import MicroBatcher, PaddingStats, bucket_by_length
+
+
+def fake_predict(calls):
+    def predict(texts):
+        calls.append(list(texts))
+        return [{"toxicity": float(len(t))} for t in texts]
+    return predict
+
+
+def test_concurrent_requests_share_one_batch():
+    calls = []
+    batcher = MicroBatcher(fake_predict(calls), max_batch_size=8, max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit("x" * n) for n in range(1, 6)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert [r["toxicity"] for r in results] == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_batch_flushes_at_max_size():
+    calls = []
+    batcher = MicroBatcher(fake_predict(calls), max_batch_size=2, max_wait_ms=1000)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit("abc") for _ in range(4)))
+
+    results = asyncio.run(run())
+    assert [len(c) for c in calls] == [2, 2]
+    assert len(results) == 4
+
+
+def test_single_request_is_not_delayed_past_max_wait():
+    calls = []
+    batcher = MicroBatcher(fake_predict(calls), max_batch_size=32, max_wait_ms=0)
+    result = asyncio.run(batcher.submit("hello"))
+    assert result == {"toxicity": 5.0}
+    assert calls == [["hello"]]
+
+
+def test_batches_in_flight_survive_garbage_collection():
+    async def slow_predict(texts):
+        await asyncio.sleep(0.05)
+        return [{"toxicity": 0.0} for _ in texts]
+
+    batcher = MicroBatcher(slow_predict, max_batch_size=2, max_wait_ms=1000)
+
+    async def run():
+        submitted = asyncio.gather(batcher.submit("a"), batcher.submit("b"))
+        await asyncio.sleep(0.01)
+        assert len(batcher._tasks) == 1  # held strongly while the batch runs
+        gc.collect()
+        results = await submitted
+        await asyncio.sleep(0)
+        return results, len(batcher._tasks)
+
+    results, running = asyncio.run(run())
+    assert results == [{"toxicity": 0.0}] * 2 and running == 0
+
+
+def test_errors_reach_every_caller():
+    def broken(texts):
+        raise RuntimeError("model exploded")
+
+    batcher = MicroBatcher(broken, max_batch_size=4, max_wait_ms=5)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.submit("a"), batcher.submit("b"), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_batches_are_grouped_by_extra_args():
+    calls = []
+
+    def predict(texts, model_name):
+        calls.append((model_name, list(texts)))
+        return [{"toxicity": 0.0} for _ in texts]
+
+    batcher = MicroBatcher(predict, max_batch_size=8, max_wait_ms=10)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.submit("a", "original"),
+            batcher.submit("b", "unbiased"),
+            batcher.submit("c", "original"),
+        )
+
+    asyncio.run(run())
+    assert sorted(calls) == [("original", ["a", "c"]), ("unbiased", ["b"])]
+
+
+def test_bucket_by_length_groups_similar_lengths():
+    lengths = [500, 3, 30, 12, 700, 5]
+    groups = bucket_by_length(lengths, boundaries=(8, 32, 512), max_rows=2)
+    assert groups == [(8, [1, 5]), (32, [3, 2]), (512, [0, 4])]
+
+
+def test_padding_efficiency():
+    padding = PaddingStats()
+    padding.record(8, [4, 8])
+    padding.record(512, [100])
+    assert padding.efficiency == 112 / 116
+    assert padding.stats()["rows_per_bucket"] == {"8": 2, "512": 1}
@@ -0,0 +1,46 @@
+# Sliding-window planning tests (whitespace tokenizer, no model needed)
+import pytest
+
+from chunking import aggregate, plan_windows
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def test_short_text_is_a_single_window():
+    assert plan_windows("hello there", count_words, window_tokens=8) == []
+
+
+def test_windows_cover_every_word_with_overlap():
+    text = " ".join(f"w{i}" for i in range(50))
+    windows = plan_windows(text, count_words, window_tokens=10, overlap=3)
+    assert len(windows) > 1
+    assert windows[0][0] == 0 and windows[-1][1] == len(text)
+    for (_, prev_end), (start, _) in zip(windows, windows[1:]):
+        assert start < prev_end  # consecutive windows overlap
+    assert all(count_words(text[s:e]) <= 10 for s, e in windows)
+
+
+def test_oversized_word_is_split_instead_of_truncated():
+    text = "x" * 100
+
+    def count_chars(piece):
+        return len(piece)
+
+    windows = plan_windows(text, count_chars, window_tokens=20, overlap=0)
+    assert "".join(text[s:e] for s, e in windows) == text
+
+
+def test_aggregate_max_and_mean():
+    window_scores = [{"toxicity": 0.1, "insult": 0.4}, {"toxicity": 0.9, "insult": 0.2}]
+    scores, driver = aggregate(window_scores, "max")
+    assert scores == {"toxicity": 0.9, "insult": 0.4}
+    assert driver == 1
+    scores, _ = aggregate(window_scores, "mean")
+    assert scores["toxicity"] == pytest.approx(0.5)
+
+
+def test_unknown_aggregation_rejected():
+    with pytest.raises(ValueError):
+        aggregate([{"toxicity": 0.1}], "median")
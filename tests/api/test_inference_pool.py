@@ -0,0 +1,87 @@
+# Inference pool backpressure tests (no model needed)
+import asyncio
+import threading
+
+import pytest
+
+from inference_pool import InferencePool, InferenceQueueFull
+
+
+def blocking_predict(release):
+    def predict(texts):
+        release.wait(5)
+        return [{"toxicity": 0.0} for _ in texts]
+    return predict
+
+
+def test_predict_runs_off_the_event_loop():
+    loop_thread = []
+
+    def predict(texts):
+        loop_thread.append(threading.current_thread().name)
+        return [{"toxicity": 0.1} for _ in texts]
+
+    pool = InferencePool(predict, workers=1, queue_size=0)
+    result = asyncio.run(pool.predict(["hello"]))
+    assert result == [{"toxicity": 0.1}]
+    assert loop_thread[0].startswith("inference")
+    assert pool.depth == 0
+
+
+def test_full_queue_fails_fast_with_retry_after():
+    release = threading.Event()
+    pool = InferencePool(blocking_predict(release), workers=1, queue_size=1, retry_after=3)
+
+    async def run():
+        first = asyncio.ensure_future(pool.predict(["a"]))
+        second = asyncio.ensure_future(pool.predict(["b"]))
+        await asyncio.sleep(0.05)
+        assert pool.depth == 2
+        with pytest.raises(InferenceQueueFull) as excinfo:
+            await pool.predict(["c"])
+        release.set()
+        await asyncio.gather(first, second)
+        return excinfo.value
+
+    error = asyncio.run(run())
+    assert error.retry_after == 3
+    assert pool.stats()["rejected"] == 1
+    assert pool.depth == 0
+
+
+def test_wait_mode_queues_instead_of_rejecting():
+    release = threading.Event()
+    pool = InferencePool(blocking_predict(release), workers=1, queue_size=0)
+
+    async def run():
+        first = asyncio.ensure_future(pool.predict(["a"]))
+        await asyncio.sleep(0.05)
+        second = asyncio.ensure_future(pool.predict(["b"], wait=True))
+        await asyncio.sleep(0.05)
+        assert not second.done()
+        release.set()
+        return await asyncio.gather(first, second)
+
+    results = asyncio.run(run())
+    assert len(results) == 2
+    assert pool.stats()["rejected"] == 0
+
+
+def test_background_work_leaves_reserved_workers_idle():
+    release = threading.Event()
+    pool = InferencePool(blocking_predict(release), workers=2, queue_size=4, reserved=1)
+
+    async def run():
+        first = asyncio.ensure_future(pool.predict(["a"], background=True))
+        await asyncio.sleep(0.05)
+        second = asyncio.ensure_future(pool.predict(["b"], background=True))
+        await asyncio.sleep(0.05)
+        assert pool.depth == 1 and not second.done()  # one worker stays free
+        interactive = asyncio.ensure_future(pool.predict(["c"]))
+        await asyncio.sleep(0.05)
+        assert pool.depth == 2
+        release.set()
+        return await asyncio.gather(first, second, interactive)
+
+    assert len(asyncio.run(run())) == 3
+    assert pool.depth == 0
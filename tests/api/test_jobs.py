@@ -0,0 +1,144 @@
+# Moderation job queue: priorities, leases across restarts, and the job API
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+import api
+from jobs import DONE, FAILED, QUEUED, RUNNING, JobStore, JobWorkers
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_claims_by_priority_then_age(tmp_path):
+    clock = Clock()
+    store = JobStore(tmp_path / "jobs.db", clock=clock)
+    low = store.submit(["a"], "original", priority=0)
+    clock.now += 1
+    high = store.submit(["b"], "original", priority=5)
+    clock.now += 1
+    low_later = store.submit(["c"], "original", priority=0)
+
+    assert [store.claim("w")[0] for _ in range(3)] == [high, low, low_later]
+    assert store.claim("w") is None
+    store.finish(high, "w", result=[{"ok": True}])
+    assert store.get(high)["status"] == DONE
+    assert store.counts() == {QUEUED: 0, RUNNING: 2, DONE: 1, FAILED: 0}
+
+
+def test_expired_lease_is_reclaimed_then_abandoned(tmp_path):
+    clock = Clock()
+    path = tmp_path / "jobs.db"
+    store = JobStore(path, lease=10, max_attempts=2, clock=clock)
+    job_id = store.submit(["text"], "original", single=True)
+    assert store.claim("crashed")[0] == job_id
+
+    # A new process (same db file) cannot take it until the lease runs out
+    restarted = JobStore(path, lease=10, max_attempts=2, clock=clock)
+    assert restarted.claim("fresh") is None
+    clock.now += 11
+    assert restarted.claim("fresh") == (job_id, "original", ["text"], True)
+    assert not store.progress(job_id, "crashed", 1)  # the old owner lost it
+
+    clock.now += 11
+    assert restarted.claim("fresh") is None
+    job = restarted.get(job_id)
+    assert (job["status"], job["attempts"]) == (FAILED, 2)
+
+    # Graceful shutdown hands the job back without spending an attempt
+    other = restarted.submit(["x"], "original")
+    restarted.claim("stopping")
+    restarted.release(other, "stopping")
+    assert (restarted.get(other)["status"], restarted.get(other)["attempts"]) == (QUEUED, 0)
+
+
+def run_workers(store, run, until):
+    async def main():
+        workers = JobWorkers(store, run, workers=1, poll_interval=0.05)
+        workers.start()
+        deadline = time.monotonic() + 10
+        while not until():
+            assert time.monotonic() < deadline
+            await asyncio.sleep(0.05)
+        await workers.stop()
+        return workers
+
+    return asyncio.run(main())
+
+
+def test_heartbeat_keeps_a_chunk_longer_than_the_lease(tmp_path):
+    path = tmp_path / "jobs.db"
+    store = JobStore(path, lease=0.3)
+    other_process = JobStore(path, lease=0.3)
+    job_id = store.submit(["one long chunk"], "original", single=True)
+
+    async def run(job_id, model_name, texts, report):
+        for _ in range(5):  # 1 s in one chunk, without calling report(): over three leases
+            await asyncio.sleep(0.2)
+            assert other_process.claim("other") is None
+        return [{"text": texts[0]}]
+
+    workers = run_workers(store, run, until=lambda: store.get(job_id)["status"] == DONE)
+    job = store.get(job_id)
+    assert (job["attempts"], job["result"], workers.completed) == (1, {"text": "one long chunk"}, 1)
+
+
+def test_heartbeat_cancels_a_run_that_was_taken_over(tmp_path):
+    store = JobStore(tmp_path / "jobs.db", lease=0.3)
+    job_id = store.submit(["text"], "original")
+    cancelled = []
+
+    async def run(job_id, model_name, texts, report):
+        store._connect().execute("UPDATE jobs SET owner = 'other' WHERE id = ?", (job_id,))  # a takeover
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(job_id)
+            raise
+
+    workers = run_workers(store, run, until=lambda: cancelled)
+    assert store.get(job_id)["status"] == RUNNING  # still the other worker's job
+    assert (workers.completed, workers.failed) == (0, 0)
+
+
+def test_job_api_round_trip(tmp_path, monkeypatch):
+    assert api.wait_until_ready(timeout=600), "Detoxify model did not load"
+    store = JobStore(tmp_path / "jobs.db")
+    monkeypatch.setattr(api, "job_store", store)
+    monkeypatch.setattr(api.job_workers, "store", store)
+
+    with TestClient(api.app) as client:
+        response = client.post("/api/moderate/jobs", json={"texts": ["Hello there", "You are an idiot"], "priority": 3})
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+        assert response.headers["location"] == f"/api/moderate/jobs/{job_id}"
+
+        deadline = time.monotonic() + 30
+        while (job := client.get(f"/api/moderate/jobs/{job_id}").json())["status"] in (QUEUED, RUNNING):
+            assert time.monotonic() < deadline, job
+            time.sleep(0.05)
+        assert (job["status"], job["done"], job["total"], job["priority"]) == (DONE, 2, 2, 3)
+        assert [result["text"] for result in job["result"]] == ["Hello there", "You are an idiot"]
+
+        single = client.post("/api/moderate/jobs", json={"text": "Just one document"}).json()["id"]
+        while (job := client.get(f"/api/moderate/jobs/{single}").json())["status"] in (QUEUED, RUNNING):
+            time.sleep(0.05)
+        assert job["result"]["text"] == "Just one document"
+
+        assert client.get("/api/moderate/jobs/nope").status_code == 404
+        for body, detail in [
+            ({}, "Provide either 'text' or 'texts'"),
+            ({"text": "a", "texts": ["b"]}, "Provide either 'text' or 'texts'"),
+            ({"texts": []}, "Texts required"),
+            ({"texts": ["ok", " "]}, "Texts must be non-empty strings"),
+            ({"text": "a", "priority": 10}, "Priority must be an integer from 0 to 9"),
+            ({"text": "a", "model": "nope"}, "Unknown model 'nope'"),
+        ]:
+            response = client.post("/api/moderate/jobs", json=body)
+            assert (response.status_code, response.json()["detail"]) == (400, detail), body
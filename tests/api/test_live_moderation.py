@@ -0,0 +1,95 @@
+# Live moderation channel: sentence splitting, debouncing and incremental re-scoring
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import api
+from api import app, wait_until_ready
+from live_moderation import LiveSession, debounced, split_sentences
+
+client = TestClient(app)
+
+
+def test_split_sentences():
+    text = '  Hello there. Are you OK?!\n"Fine." she said\n\nbye'
+    assert [text[start:end] for start, end in split_sentences(text)] == [
+        "Hello there.", "Are you OK?!", '"Fine."', "she said", "bye",
+    ]
+    assert split_sentences(" \n ") == []
+
+
+def test_session_only_scores_changed_sentences():
+    scored = []
+
+    async def score_sentences(texts, model_name):
+        scored.append(list(texts))
+        return [{"toxicity": 0.9 if "idiot" in text else 0.1} for text in texts]
+
+    session = LiveSession(score_sentences)
+
+    async def main():
+        first = await session.update("Nice day. See you soon.", "original")
+        second = await session.update("Nice day. See you soon, idiot.", "original")
+        third = await session.update("Nice day. See you soon, idiot.", "other")
+        return first, second, third
+
+    first, second, third = asyncio.run(main())
+    assert scored == [["Nice day.", "See you soon."], ["See you soon, idiot."], ["Nice day.", "See you soon, idiot."]]
+    assert (first["toxicity"], first["rescored"], first["reused"]) == ("non-toxic", 2, 0)
+    assert (second["toxicity"], second["rescored"], second["reused"]) == ("toxic", 1, 1)
+    assert second["driving_span"] == {"start": 10, "end": 30, "toxicity": 0.9}
+    assert third["rescored"] == 2  # a different model never reuses scores
+
+
+def test_debounce_yields_latest_message_after_a_pause():
+    async def main():
+        messages = asyncio.Queue()
+        for text in ("h", "he", "hel"):
+            messages.put_nowait(text)
+        updates = debounced(messages.get, debounce_ms=30, max_wait_ms=1000)
+        first = await updates.__anext__()
+        messages.put_nowait("hello")
+        second = await updates.__anext__()
+        await updates.aclose()
+        return first, second
+
+    assert asyncio.run(main()) == ("hel", "hello")
+
+
+def test_websocket_pushes_incremental_verdicts():
+    assert wait_until_ready(timeout=600), "Detoxify model did not load"
+    with client.websocket_connect("/ws/moderate") as ws:
+        ws.send_json({"seq": 1, "text": "Hello"})
+        ws.send_json({"seq": 2, "text": "Hello friend. How are you?"})
+        reply = ws.receive_json()
+        assert reply["seq"] == 2  # the edits were debounced into one update
+        assert reply["toxicity"] in ("toxic", "non-toxic")
+        assert [s["end"] - s["start"] for s in reply["sentences"]] == [13, 12]
+
+        ws.send_json({"seq": 3, "text": "Hello friend. How are you today?"})
+        reply = ws.receive_json()
+        assert (reply["seq"], reply["rescored"], reply["reused"]) == (3, 1, 1)
+
+        ws.send_text("{not json")
+        assert ws.receive_json() == {"error": "Invalid JSON"}
+        ws.send_json({"seq": 4, "text": "hi", "model": "nope"})
+        assert ws.receive_json() == {"seq": 4, "error": "Unknown model 'nope'"}
+
+
+def test_live_sentences_go_through_the_batcher_and_windows(monkeypatch):
+    assert wait_until_ready(timeout=600), "Detoxify model did not load"
+    submitted = []
+    submit = api.batcher.submit
+
+    async def spy(text, model_name):
+        submitted.append(text)
+        return await submit(text, model_name)
+
+    monkeypatch.setattr(api.batcher, "submit", spy)
+    short = "A short sentence only the live batcher test sends."  # not cached yet
+    long_sentence = "word " * 2000 + "end."
+    with client.websocket_connect("/ws/moderate") as ws:
+        ws.send_json({"seq": 1, "text": f"{short} {long_sentence}"})
+        reply = ws.receive_json()
+    assert reply["seq"] == 1 and len(reply["sentences"]) == 2
+    assert submitted == [short]  # the long sentence was scored as windows, not truncated
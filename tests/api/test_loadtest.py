@@ -0,0 +1,58 @@
+# Load generator tests: a short in-process run and baseline comparison
+import pytest
+
+from benchmarks import loadtest
+from benchmarks.loadtest import compare, main, percentile, throttled
+
+
+def route(rps, p95, p99, error_rate=0.0):
+    return {"rps": rps, "p95_ms": p95, "p99_ms": p99, "error_rate": error_rate}
+
+
+def test_percentile():
+    values = [i / 100 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.51
+    assert percentile(values, 99) == 1.0
+    assert percentile([], 95) == 0.0
+
+
+def test_compare_flags_only_regressions_past_threshold():
+    baseline = {"routes": {"protected": route(1000, 5.0, 8.0), "login": route(50, 100.0, 150.0)}}
+    current = {"routes": {"protected": route(900, 5.9, 8.5), "login": route(30, 100.0, 200.0, 0.5)}}
+    assert compare(current, baseline, threshold=0.2) == [
+        "login p99_ms 150.0 -> 200.0",
+        "login rps 50 -> 30",
+        "login error_rate 0.0 -> 0.5",
+    ]
+
+
+def test_short_in_process_run_saves_a_baseline(tmp_path, capsys):
+    path = tmp_path / "baseline.json"
+    main(["--mix", "protected=1", "--concurrency", "2", "--duration", "0.3", "--warmup", "0", "--save", str(path)])
+    main(["--mix", "protected=1", "--concurrency", "2", "--duration", "0.3", "--warmup", "0",
+          "--baseline", str(path), "--threshold", "100"])
+    assert "no regressions" in capsys.readouterr().out
+
+
+def test_rate_limited_runs_fail_without_saving(tmp_path, monkeypatch, capsys):
+    result = {
+        "meta": {"target": "http://127.0.0.1:8000", "mode": "concurrency=2", "mix": {}, "duration_s": 1.0},
+        "routes": {
+            "login": {**route(10, 1.0, 1.0, 0.9), "p50_ms": 1.0, "requests": 10, "statuses": {"200": 1, "429": 9}},
+            "protected": {**route(10, 1.0, 1.0), "p50_ms": 1.0, "requests": 10, "statuses": {"200": 10}},
+        },
+    }
+    assert throttled(result, 0.01) == ["login 90%"]
+
+    async def fake_run(args):
+        return result
+
+    monkeypatch.setattr(loadtest, "run", fake_run)
+    path = tmp_path / "baseline.json"
+    with pytest.raises(SystemExit) as exit_info:
+        main(["--url", "http://127.0.0.1:8000", "--save", str(path)])
+    assert exit_info.value.code == 2 and not path.exists()
+    assert 'RATE_LIMITS=""' in capsys.readouterr().out
+
+    main(["--url", "http://127.0.0.1:8000", "--save", str(path), "--allow-throttling"])
+    assert path.exists()
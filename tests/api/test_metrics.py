@@ -0,0 +1,85 @@
+# Metrics registry and /metrics exposition tests (no model needed)
+import threading
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+import api
+from metrics import Counter, Histogram, HttpMetrics, MetricsMiddleware, Registry
+
+
+def test_counter_sums_shards_from_every_thread():
+    counter = Counter("test_events_total", "events", Registry())
+
+    def work():
+        for _ in range(1000):
+            counter.inc(route="/api/login")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counter.render() == ['test_events_total{route="/api/login"} 4000']
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_latency_seconds", "latency", buckets=(0.1, 1.0), registry=Registry())
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, route="/api/moderate")
+    lines = histogram.render()
+    assert 'test_latency_seconds_bucket{route="/api/moderate",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{route="/api/moderate",le="1.0"} 2' in lines
+    assert 'test_latency_seconds_bucket{route="/api/moderate",le="+Inf"} 3' in lines
+    assert 'test_latency_seconds_count{route="/api/moderate"} 3' in lines
+    assert "test_latency_seconds" not in api.render_metrics()  # test metrics stay out of the served registry
+
+
+def test_middleware_labels_by_route_template_and_tracks_in_flight():
+    registry = Registry()
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, metrics=HttpMetrics(registry))
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404, detail="Not found")
+        return {"id": item_id}
+
+    @app.get("/metrics")
+    async def metrics():
+        return PlainTextResponse(registry.render())
+
+    client = TestClient(app)
+    assert client.get("/items/1").status_code == 200
+    assert client.get("/items/2").status_code == 200
+    assert client.get("/items/0").status_code == 404
+    assert client.get("/nowhere").status_code == 404
+    during = client.get("/metrics").text.splitlines()
+    assert "http_requests_in_flight 1" in during  # the scrape itself
+
+    lines = client.get("/metrics").text.splitlines()
+    assert 'http_requests_total{method="GET",route="/items/{item_id}",status="200"} 2' in lines
+    assert 'http_requests_total{method="GET",route="/items/{item_id}",status="404"} 1' in lines
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"} 1' in lines
+    assert 'http_errors_total{route="/items/{item_id}",status="404"} 1' in lines
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}"} 3' in lines
+    assert "http_requests_in_flight 1" in lines and "# TYPE http_requests_in_flight gauge" in lines
+    assert not any("/items/1" in line for line in lines)
+
+
+def test_api_metrics_endpoint_exposes_templated_routes():
+    client = TestClient(api.app)
+
+    def count(lines, prefix):
+        return sum(float(line.rsplit(" ", 1)[1]) for line in lines if line.startswith(prefix))
+
+    series = 'http_requests_total{method="GET",route="/api/moderate/jobs/{job_id}",status="404"}'
+    before = count(client.get("/metrics").text.splitlines(), series)
+    assert client.get("/api/moderate/jobs/no-such-job").status_code == 404
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    assert count(lines, series) == before + 1
+    assert "# TYPE http_requests_in_flight gauge" in lines
@@ -0,0 +1,72 @@
+# Model registry tests (fake loader, no weights needed)
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from model_registry import ModelRegistry, UnknownModel
+
+
+class FakeModel:
+    def __init__(self, name, size):
+        self.name = name
+        self._size = size
+
+    def size_mb(self):
+        return self._size
+
+
+def counting_loader(sizes, loads, delay=0.0):
+    lock = threading.Lock()
+
+    def load(name):
+        time.sleep(delay)
+        with lock:
+            loads.append(name)
+        return FakeModel(name, sizes[name])
+    return load
+
+
+def test_unknown_model_rejected():
+    registry = ModelRegistry(counting_loader({}, []), available=("original",))
+    with pytest.raises(UnknownModel):
+        registry.get("gpt")
+
+
+def test_concurrent_first_requests_share_one_load():
+    loads = []
+    registry = ModelRegistry(counting_loader({"original": 100}, loads, delay=0.1), available=("original",))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        models = list(pool.map(lambda _: registry.get("original"), range(8)))
+    assert loads == ["original"]
+    assert all(m is models[0] for m in models)
+
+
+def test_lru_eviction_under_budget():
+    loads = []
+    sizes = {"original": 400, "unbiased": 500, "multilingual": 1000}
+    registry = ModelRegistry(counting_loader(sizes, loads), budget_mb=1000, available=tuple(sizes))
+    registry.get("original")
+    registry.get("unbiased")
+    registry.get("original")  # "unbiased" becomes least recently used
+    registry.get("multilingual")
+    assert [m["name"] for m in registry.stats()["loaded"]] == ["multilingual"]
+    registry.get("original")
+    assert registry.stats()["evictions"] == 3
+    assert loads == ["original", "unbiased", "multilingual", "original"]
+
+
+def test_failed_load_is_retried_next_time():
+    attempts = []
+
+    def flaky(name):
+        attempts.append(name)
+        if len(attempts) == 1:
+            raise OSError("download failed")
+        return FakeModel(name, 10)
+
+    registry = ModelRegistry(flaky, available=("original",))
+    with pytest.raises(OSError):
+        registry.get("original")
+    assert registry.get("original").name == "original"
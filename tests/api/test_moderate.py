@@ -1,9 +1,57 @@
 # Samle to conduct tests on toxic detection
+import json
+import threading
+import time
+
+import pytest
 from fastapi.testclient import TestClient
-from api import app
+
+import api
+from api import app, wait_until_ready
 
 client = TestClient(app)
 
+def setup_module(module):
+    # The model loads in the background; /api/moderate answers 503 until it is ready
+    assert wait_until_ready(timeout=600), "Detoxify model did not load"
+
+def test_health_and_readiness():
+    assert client.get("/healthz").json() == {"status": "ok"}
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+
+def test_wait_until_ready_fails_fast_when_the_model_cannot_load(monkeypatch):
+    loads = []
+
+    def broken(name=api.MODEL_NAME):
+        loads.append(name)
+        raise OSError("weights not found")
+
+    monkeypatch.setattr(api, "model_ready", threading.Event())
+    monkeypatch.setattr(api, "_model_settled", threading.Event())
+    monkeypatch.setattr(api, "_loader_thread", None)
+    monkeypatch.setattr(api, "_model_failed_at", None)
+    monkeypatch.setattr(api, "model_error", None)
+    monkeypatch.setattr(api, "get_model", broken)
+    start = time.monotonic()
+    with pytest.raises(RuntimeError, match="weights not found"):
+        wait_until_ready(timeout=60)
+    assert time.monotonic() - start < 5
+    assert client.get("/readyz").json()["status"] == "failed"
+
+    # Requests during the retry delay get 503s without starting another load each
+    for _ in range(5):
+        assert client.post("/api/moderate", json={"text": "hi"}).status_code == 503
+    with pytest.raises(RuntimeError):
+        wait_until_ready(timeout=60)
+    assert len(loads) == 1
+
+    monkeypatch.setattr(api, "_model_failed_at", time.monotonic() - api.MODEL_RETRY_AFTER)
+    with pytest.raises(RuntimeError):
+        wait_until_ready(timeout=60)
+    assert len(loads) == 2  # retried once the delay passed
+
 def test_moderate_clean_text():
     response = client.post("/api/moderate", json={"text": "Hello friend, how are you?"})
     assert response.status_code == 200
@@ -48,3 +96,57 @@ def test_moderate_html_tags():
     assert "toxicity" in response.json()
 
 
+
+def test_moderate_batch_json_list():
+    """Bulk: results stream back as NDJSON in input order"""
+    texts = ["Hello friend, how are you?", "You are stupid and ugly", ""]
+    response = client.post("/api/moderate/batch", json={"texts": texts})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert lines[0]["toxicity"] == "non-toxic"
+    assert lines[1]["toxicity"] == "toxic"
+    assert lines[2]["status"] == 400 and lines[2]["error"] == "Text required"
+
+def test_moderate_batch_ndjson_upload():
+    """Bulk: NDJSON upload uses the same per-item validation as /api/moderate"""
+    body = '{"text": "Have a nice day"}\n{"text": 42}\nnot json\n'
+    response = client.post(
+        "/api/moderate/batch", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["status"] == 200
+    assert lines[1]["error"] == "Text must be a string"
+    assert lines[2]["error"] == "Invalid JSON"
+
+def test_moderate_batch_missing_texts():
+    response = client.post("/api/moderate/batch", json={"text": "hi"})
+    assert response.status_code == 400
+
+def test_moderate_repeated_text_hits_cache():
+    """Repeat: the second identical request is served from the result cache"""
+    text = "Thanks for the quick reply!"
+    first = client.post("/api/moderate", json={"text": text}).json()
+    hits_before = client.get("/api/moderate/stats").json()["cache"]["hits"]
+    second = client.post("/api/moderate", json={"text": text}).json()
+    assert second == first
+    assert client.get("/api/moderate/stats").json()["cache"]["hits"] == hits_before + 1
+
+def test_moderate_long_text_scores_every_window():
+    """Long text: toxic content at the very end is not truncated away"""
+    long_text = "good " * 500 + "You are stupid and ugly"
+    response = client.post("/api/moderate", json={"text": long_text})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["toxicity"] == "toxic"
+    span = data["long_text"]["driving_span"]
+    assert data["long_text"]["windows"] > 1
+    assert "stupid" in long_text[span["start"]:span["end"]]
+
+def test_moderate_unknown_model():
+    """Negative: only registered models can be requested"""
+    response = client.post("/api/moderate", json={"text": "hello", "model": "not-a-model"})
+    assert response.status_code == 400
+    assert "Unknown model" in response.text
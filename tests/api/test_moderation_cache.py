@@ -0,0 +1,77 @@
+# Moderation result cache tests (no model needed)
+import asyncio
+import sqlite3
+import threading
+import time
+
+from moderation_cache import ModerationCache, cache_key
+
+SCORES = {"toxicity": 0.01, "insult": 0.0}
+
+
+def test_key_depends_on_model_and_text():
+    assert cache_key("hi", "original") != cache_key("hi", "unbiased")
+    assert cache_key("hi", "original") != cache_key("hi ", "original")
+
+
+def test_hit_after_put_and_counters():
+    cache = ModerationCache(max_entries=10, ttl=60)
+    assert cache.get("hello", "original") is None
+    cache.put("hello", "original", SCORES)
+    assert cache.get("hello", "original") == SCORES
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_lru_eviction():
+    cache = ModerationCache(max_entries=2, ttl=60)
+    cache.put("a", "original", SCORES)
+    cache.put("b", "original", SCORES)
+    cache.get("a", "original")  # "b" is now least recently used
+    cache.put("c", "original", SCORES)
+    assert cache.get("b", "original") is None
+    assert cache.get("a", "original") == SCORES
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    cache = ModerationCache(max_entries=10, ttl=0.01)
+    cache.put("a", "original", SCORES)
+    time.sleep(0.02)
+    assert cache.get("a", "original") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    cache = ModerationCache(max_entries=10, ttl=60, db_path=db_path)
+    cache.put("a", "original", SCORES)
+    assert cache.flush(timeout=5)
+
+    restarted = ModerationCache(max_entries=10, ttl=60, db_path=db_path)
+    assert restarted.get("a", "original") == SCORES
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_sqlite_tier_stays_off_the_event_loop(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    cache = ModerationCache(max_entries=10, ttl=60, db_path=db_path)
+    for text in "abc":
+        cache.put(text, "original", SCORES)  # queued for the background writer
+    assert cache.flush(timeout=5)
+    assert sqlite3.connect(db_path).execute("SELECT COUNT(*) FROM moderation_cache").fetchone() == (3,)
+    assert cache._connect().execute("PRAGMA synchronous").fetchone() == (1,)  # NORMAL
+
+    restarted = ModerationCache(max_entries=10, ttl=60, db_path=db_path)
+    loop_thread, disk_threads = threading.get_ident(), []
+    load = restarted._get_disk
+    restarted._get_disk = lambda *args: disk_threads.append(threading.get_ident()) or load(*args)
+
+    async def lookups():
+        return await restarted.get_many(["a", "b", "x", "a"], "original"), await restarted.get_many(["a"], "original")
+
+    first, second = asyncio.run(lookups())
+    assert first == [SCORES, SCORES, None, SCORES] and second == [SCORES]
+    assert len(disk_threads) == 1 and loop_thread not in disk_threads  # one query, memory hits after it
+    stats = restarted.stats()
+    assert (stats["hits"], stats["disk_hits"], stats["misses"]) == (4, 3, 1)
@@ -0,0 +1,94 @@
+# Sliding-window rate limiter tests (fake clock, no model needed)
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.testclient import TestClient
+
+import api
+from metrics import HttpMetrics, MetricsMiddleware, Registry
+from rate_limit import RateLimitMiddleware, SlidingWindowLimiter
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_limit_then_sliding_recovery():
+    clock = Clock(960.0)  # start of a 60s window
+    limiter = SlidingWindowLimiter(3, 60, clock=clock)
+    assert [limiter.hit("1.2.3.4") for _ in range(3)] == [0, 0, 0]
+    assert limiter.hit("1.2.3.4") > 0
+    assert limiter.hit("5.6.7.8") == 0  # other keys are unaffected
+
+    clock.now = 1019.0  # still the same window
+    assert limiter.check("1.2.3.4") > 0
+
+    # 6s into the next window the previous three weigh 3 * 0.9 = 2.7
+    clock.now = 1026.0
+    assert limiter.hit("1.2.3.4") == 0
+    assert limiter.hit("1.2.3.4") > 0
+    clock.now = 1065.0  # 3 * 0.25 + 1 < 3
+    assert limiter.hit("1.2.3.4") == 0
+
+
+def test_idle_keys_are_swept():
+    clock = Clock()
+    limiter = SlidingWindowLimiter(10**6, 1, clock=clock)
+    for i in range(500):
+        limiter.add(f"client-{i}")
+    clock.now += 5
+    for _ in range(1024 * 16):
+        limiter.add("busy")
+    assert len(limiter) == 1
+
+
+def test_rejected_requests_never_reach_the_route():
+    calls = []
+    mini = FastAPI()
+
+    @mini.post("/api/login")
+    async def login():
+        calls.append(1)
+        return {}
+
+    mini.add_middleware(RateLimitMiddleware, limits={"/api/login": SlidingWindowLimiter(2, 60)})
+    client = TestClient(mini)
+    statuses = [client.post("/api/login", content=b"{").status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    assert len(calls) == 2
+
+
+def test_failed_logins_limited_per_username(monkeypatch):
+    monkeypatch.setattr(api, "login_failures", SlidingWindowLimiter(2, 60))
+    client = TestClient(api.app)
+    wrong = {"username": "victim", "password": "guess"}
+    statuses = [client.post("/api/login", json=wrong).status_code for _ in range(3)]
+    assert statuses == [401, 401, 429]
+    assert "Retry-After" in client.post("/api/login", json=wrong).headers
+
+
+def test_429s_carry_cors_headers_and_their_route_label():
+    middleware = [m.cls for m in api.app.user_middleware]  # outermost first
+    assert middleware.index(CORSMiddleware) < middleware.index(RateLimitMiddleware)
+
+    registry = Registry()
+    mini = FastAPI()
+
+    @mini.post("/api/login")
+    async def login():
+        return {}
+
+    mini.add_middleware(RateLimitMiddleware, limits={"/api/login": SlidingWindowLimiter(1, 60)})
+    mini.add_middleware(CORSMiddleware, allow_origins=["*"], expose_headers=["Retry-After"])
+    mini.add_middleware(MetricsMiddleware, metrics=HttpMetrics(registry))
+    client = TestClient(mini)
+    origin = {"Origin": "http://localhost:8501"}
+    assert client.post("/api/login", headers=origin).status_code == 200
+    rejected = client.post("/api/login", headers=origin)
+    assert rejected.status_code == 429
+    assert rejected.headers["Access-Control-Allow-Origin"] == "*"
+    assert "Retry-After" in rejected.headers["Access-Control-Expose-Headers"]
+    assert 'http_requests_total{method="POST",route="/api/login",status="429"} 1' in registry.render().splitlines()
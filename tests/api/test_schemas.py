@@ -0,0 +1,42 @@
+# Request validation keeps the original status codes and details (no model needed)
+from fastapi.testclient import TestClient
+
+from api import app
+
+client = TestClient(app)
+
+
+def detail(response):
+    return response.status_code, response.json()["detail"]
+
+
+def test_login_validation_errors():
+    assert detail(client.post("/api/login", content=b'{"username": "admin"}')) == (
+        415, "Unsupported Media Type: JSON required"
+    )
+    headers = {"Content-Type": "application/json"}
+    assert detail(client.post("/api/login", content=b'{"username": "admin"', headers=headers)) == (400, "Invalid JSON")
+    assert detail(client.post("/api/login", json={"password": "x"})) == (400, "Username required")
+    assert detail(client.post("/api/login", json={"username": "", "password": ""})) == (400, "Username required")
+    assert detail(client.post("/api/login", json={"username": "admin", "password": None})) == (400, "Password required")
+    assert detail(client.post("/api/login", json=["admin"])) == (400, "Invalid payload")
+
+
+def test_moderate_validation_errors():
+    assert detail(client.post("/api/moderate", json={})) == (400, "Missing 'text' field")
+    assert detail(client.post("/api/moderate", json={"text": None})) == (400, "Missing 'text' field")
+    assert detail(client.post("/api/moderate", json={"text": 12345})) == (400, "Text must be a string")
+    assert detail(client.post("/api/moderate", json={"text": "   "})) == (400, "Text required")
+    assert detail(client.post("/api/moderate", content=b"not json")) == (400, "Invalid JSON")
+    assert detail(client.post("/api/moderate", json={"text": "hi", "model": 3})) == (400, "Model must be a string")
+    assert detail(client.post("/api/moderate", json={"text": "hi", "model": ["original"]})) == (
+        400, "Model must be a string"
+    )
+
+
+def test_openapi_has_real_schemas():
+    document = client.get("/openapi.json").json()
+    login = document["paths"]["/api/login"]["post"]
+    assert login["requestBody"]["content"]["application/json"]["schema"]["required"] == ["username", "password"]
+    assert login["responses"]["200"]["content"]["application/json"]["schema"]["$ref"].endswith("/LoginResponse")
+    assert "toxicity_scores" in document["components"]["schemas"]["ModerateResponse"]["properties"]
@@ -0,0 +1,69 @@
+# Pre-fork launcher test: starts serve.py on a free port (loads the model once)
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+import requests
+
+from serve import memory_mb
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(proc, base_url, timeout, stderr_path):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        assert proc.poll() is None, f"serve.py exited with {proc.returncode}:\n{stderr_path.read_text()}"
+        try:
+            if requests.get(f"{base_url}/readyz", timeout=1).status_code == 200:
+                return
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.5)
+    raise AssertionError(f"serve.py was not ready after {timeout}s:\n{stderr_path.read_text()}")
+
+
+def test_memory_of_own_process():
+    rss, pss = memory_mb(os.getpid())
+    if sys.platform.startswith("linux"):
+        assert rss > 0 and 0 < pss <= rss
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="serve.py pre-forks only where fork() exists")
+def test_workers_serve_survive_restart_and_stop_gracefully(tmp_path):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    # A file rather than a pipe: nobody drains the child's log while it runs
+    stderr_path = tmp_path / "serve.stderr"
+    with stderr_path.open("wb") as stderr:
+        proc = subprocess.Popen(
+            [sys.executable, "serve.py", "--workers", "2", "--port", str(port), "--max-requests", "3"],
+            cwd=ROOT,
+            stderr=stderr,
+        )
+    try:
+        wait_ready(proc, base_url, timeout=600, stderr_path=stderr_path)
+        login = {"username": "admin", "password": "password123"}
+        # More requests than --max-requests allows per worker, so workers recycle mid-run
+        assert [requests.post(f"{base_url}/api/login", json=login).status_code for _ in range(10)] == [200] * 10
+
+        proc.send_signal(signal.SIGHUP)
+        time.sleep(1)
+        wait_ready(proc, base_url, timeout=60, stderr_path=stderr_path)
+
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=60) == 0
+    finally:
+        if proc.poll() is None:
+            proc.kill()
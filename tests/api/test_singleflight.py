@@ -0,0 +1,85 @@
+# Single-flight deduplication: shared results, shared errors, cancellation
+import asyncio
+
+import httpx
+import pytest
+
+import api
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return {"value": value}
+
+    async def main():
+        same = [flight.do("k", compute, 1) for _ in range(5)]
+        return await asyncio.gather(*same, flight.do("other", compute, 2))
+
+    results = asyncio.run(main())
+    assert results == [{"value": 1}] * 5 + [{"value": 2}]
+    assert sorted(calls) == [1, 2]
+    assert flight.stats() == {"in_flight": 0, "leaders": 2, "shared": 4, "errors": 0, "shared_rate": 0.6667}
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    flight = SingleFlight()
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise RuntimeError("model crashed")
+        return "ok"
+
+    async def main():
+        first = await asyncio.gather(*(flight.do("k", flaky) for _ in range(3)), return_exceptions=True)
+        return first, await flight.do("k", flaky)
+
+    first, retry = asyncio.run(main())
+    assert [str(e) for e in first] == ["model crashed"] * 3
+    assert retry == "ok" and len(attempts) == 2
+    assert flight.errors == 1
+
+
+def test_cancelled_waiter_does_not_cancel_the_others():
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("k", slow))
+        follower = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_duplicate_moderations_run_once():
+    assert api.wait_until_ready(timeout=600), "Detoxify model did not load"
+    before = api.inflight.stats()
+
+    async def burst():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            body = {"text": "Buy cheap followers now!!! single-flight burst"}
+            return await asyncio.gather(*(client.post("/api/moderate", json=body) for _ in range(10)))
+
+    responses = asyncio.run(burst())
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.text for response in responses}) == 1
+    after = api.inflight.stats()
+    assert after["leaders"] + after["shared"] - before["leaders"] - before["shared"] == 10
+    assert after["shared"] > before["shared"]
@@ -0,0 +1,81 @@
+# Server-Timing phases: collector, micro-batch attribution, middleware and access log
+import asyncio
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import timing
+from api import app, wait_until_ready
+from batching import MicroBatcher
+
+client = TestClient(app)
+
+
+def test_phases_accumulate_and_round_trip():
+    with timing.collect() as phases:
+        with timing.phase("parse"):
+            pass
+        timing.record("queue", 0.002)
+        timing.record("queue", 0.001)
+    timing.record("queue", 1.0)  # no collector: ignored
+    assert set(phases) == {"parse", "queue"}
+
+    header = timing.server_timing({"queue": 0.003, "_handler_end": 5.0, "total": 0.0125})
+    assert header == "queue;dur=3.00, total;dur=12.50"
+    assert timing.parse_server_timing(header) == {"queue": 3.0, "total": 12.5}
+    assert timing.parse_server_timing('cache;desc="hit", db;dur=1') == {"db": 1.0}
+
+
+def test_batch_phases_are_charged_to_every_caller():
+    def predict_batch(texts):
+        timing.record("forward", 0.01)
+        return [len(text) for text in texts]
+
+    batcher = MicroBatcher(predict_batch, max_batch_size=2, max_wait_ms=50)
+
+    async def caller(text):
+        with timing.collect() as phases:
+            return await batcher.submit(text), phases
+
+    async def main():
+        return await asyncio.gather(caller("a"), caller("bb"))
+
+    for (result, phases), text in zip(asyncio.run(main()), ("a", "bb")):
+        assert result == len(text)
+        assert phases["forward"] == 0.01
+        assert phases["batch"] >= 0
+
+
+def test_moderate_reports_server_timing():
+    assert wait_until_ready(timeout=600), "Detoxify model did not load"
+    text = "Server-Timing phases for a fresh moderation request"
+    response = client.post("/api/moderate", json={"text": text})
+    assert response.status_code == 200
+    phases = timing.parse_server_timing(response.headers["server-timing"])
+    for name in ("read", "parse", "validate", "plan", "cache", "batch", "queue", "inference", "serialize", "total"):
+        assert name in phases, name
+    assert phases["total"] >= phases["inference"]
+
+    # Errors are timed too
+    response = client.post("/api/login", content=b"{", headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
+    assert "total" in timing.parse_server_timing(response.headers["server-timing"])
+
+
+def test_json_access_log(tmp_path):
+    path = tmp_path / "access.log"
+    mini = FastAPI()
+
+    @mini.get("/ping")
+    @timing.timed_endpoint
+    async def ping():
+        with timing.phase("work"):
+            await asyncio.sleep(0)
+        return {"ok": True}
+
+    mini.add_middleware(timing.TimingMiddleware, access_log=str(path))
+    assert TestClient(mini).get("/ping").status_code == 200
+    entry = json.loads(path.read_text().strip().splitlines()[-1])
+    assert entry["path"] == "/ping" and entry["status"] == 200
+    assert {"work", "serialize", "total"} <= set(entry["phases_ms"])
@@ -0,0 +1,111 @@
+# Signed token tests (no model or server needed)
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import app
+from tokens import ExpiredToken, InvalidToken, TokenService
+
+client = TestClient(app)
+VALID_USER = {"username": "admin", "password": "password123"}
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_issued_token_verifies():
+    service = TokenService(secret="s3cret", ttl=60)
+    claims = service.verify(service.issue("admin"))
+    assert claims["sub"] == "admin"
+
+
+def test_tampered_or_foreign_tokens_rejected():
+    service = TokenService(secret="s3cret", ttl=60)
+    token = service.issue("admin")
+    version, payload, signature = token.split(".")
+    forged = service.issue("root").split(".")[1]
+
+    for bad in (f"{version}.{forged}.{signature}", token[:-2], "fake-jwt-token", "v1..", "v1.é.x"):
+        with pytest.raises(InvalidToken):
+            service.verify(bad)
+    with pytest.raises(InvalidToken):
+        TokenService(secret="other", ttl=60).verify(token)
+
+
+def test_expired_token():
+    clock = Clock()
+    service = TokenService(secret="s3cret", ttl=60, clock=clock)
+    token = service.issue("admin")
+    clock.now += 61
+    with pytest.raises(ExpiredToken):
+        service.verify(token)
+
+
+def test_revocation_is_dropped_after_expiry():
+    clock = Clock()
+    service = TokenService(secret="s3cret", ttl=60, clock=clock)
+    first, second = service.issue("admin"), service.issue("admin")
+    service.revoke(first)
+    with pytest.raises(InvalidToken, match="revoked"):
+        service.verify(first)
+    service.verify(second)
+
+    clock.now += 61
+    service.verify(service.issue("admin"))  # any verify past the oldest expiry compacts the set
+    assert service.stats()["revoked"] == 0
+
+
+def test_revocations_are_shared_through_sqlite(tmp_path):
+    db_path = str(tmp_path / "revoked.db")
+    worker_a = TokenService(secret="s3cret", ttl=60, db_path=db_path, sync_interval=0.02)
+    worker_b = TokenService(secret="s3cret", ttl=60, db_path=db_path, sync_interval=0.02)
+    first, second = worker_a.issue("admin"), worker_a.issue("admin")
+
+    worker_a.revoke(first)
+    worker_b.start_sync()  # at startup: reads every earlier revocation
+    with pytest.raises(InvalidToken, match="revoked"):
+        worker_b.verify(first)
+
+    worker_b.verify(second)
+    worker_a.revoke(second)  # picked up by worker_b's background sync
+    deadline = time.monotonic() + 5
+    while worker_b.stats()["revoked"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    with pytest.raises(InvalidToken, match="revoked"):
+        worker_b.verify(second)
+
+
+def test_verify_never_syncs_on_the_calling_thread(tmp_path):
+    service = TokenService(secret="s3cret", ttl=60, db_path=str(tmp_path / "revoked.db"), sync_interval=60)
+    synced = threading.Event()
+    sync_threads = []
+    sync = service.sync
+    service.sync = lambda: sync_threads.append(threading.get_ident()) or sync() or synced.set()
+
+    service.verify(service.issue("admin"))  # a process that skipped start_sync()
+    assert synced.wait(5)
+    assert sync_threads and threading.get_ident() not in sync_threads
+
+
+def test_login_protected_logout_flow():
+    token = client.post("/api/login", json=VALID_USER).json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/protected", headers=headers).status_code == 200
+
+    assert client.post("/api/logout", headers=headers).status_code == 200
+    response = client.get("/api/protected", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token revoked"
+
+
+def test_old_fixed_token_no_longer_accepted():
+    response = client.get("/api/protected", headers={"Authorization": "Bearer fake-jwt-token"})
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Invalid or expired token"
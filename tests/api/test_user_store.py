@@ -0,0 +1,39 @@
+# User store and password hashing tests (cheap scrypt cost, no server needed)
+from user_store import UserStore, hash_password, verify_password
+
+CHEAP = {"n": 2**4, "r": 8, "p": 1}
+
+
+def test_hash_round_trip_keeps_its_cost():
+    stored = hash_password("s3cret", **CHEAP)
+    assert stored.startswith("scrypt$16$8$1$")
+    assert verify_password("s3cret", stored)
+    assert not verify_password("S3cret", stored)
+    assert not verify_password("s3cret", "not-a-hash")
+
+
+def test_authenticate_seeded_and_unknown_users():
+    store = UserStore(":memory:", seed={"admin": "password123"})
+    assert store.authenticate("admin", "password123")
+    assert not store.authenticate("admin", "wrong")
+    assert not store.authenticate("ghost", "password123")
+    assert not store.authenticate("Admin", "password123")
+
+
+def test_bulk_store_lookups(tmp_path):
+    store = UserStore(str(tmp_path / "users.db"), seed=None)
+    stored = hash_password("pw", **CHEAP)
+    store.add_hashes((f"user{i}", stored) for i in range(100_000))
+    store.set_password("user99999", "new-pw", **CHEAP)
+
+    assert store.count() == 100_000
+    assert store.authenticate("user42", "pw")
+    assert store.authenticate("user99999", "new-pw")
+
+
+def test_import_csv(tmp_path):
+    path = tmp_path / "users.csv"
+    path.write_text("alice,wonderland\nbob,builder\n", encoding="utf-8")
+    store = UserStore(":memory:", seed=None)
+    assert store.import_csv(path) == 2
+    assert store.authenticate("bob", "builder")
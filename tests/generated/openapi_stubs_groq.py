@@ -1,8 +1,11 @@
-from api import app
+from api import app, wait_until_ready
 from fastapi.testclient import TestClient
 
 client = TestClient(app)
 
+def setup_module(module):
+    assert wait_until_ready(timeout=600)
+
 VALID_USER = {"username": "admin", "password": "password123"}
 INVALID_USER = {"username": "admin", "password": "wrong_password"}
 
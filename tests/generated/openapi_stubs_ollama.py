@@ -11,7 +11,7 @@ def test_login_valid():
     assert response.status_code == 200, response.text
     data = response.json()
     assert "token" in data
-    assert data.get("token") == "fake-jwt-token"
+    assert data.get("token")
 
 def test_login_invalid_input():
     """Negative test: Empty username/password should return 400"""
@@ -51,8 +51,10 @@ def test_login_missing_password():
 # PROTECTED ENDPOINT TESTS
 def test_protected_with_valid_token():
     """Positive test: Protected route with valid token"""
+    login_response = requests.post(f"{BASE_URL}/login", json={"username": "admin", "password": "password123"})
+    token = login_response.json()["token"]
     url = f"{BASE_URL}/protected"
-    headers = {"Authorization": "Bearer fake-jwt-token"}
+    headers = {"Authorization": f"Bearer {token}"}
     response = requests.get(url, headers=headers)
     assert response.status_code == 200, response.text
     data = response.json()
@@ -0,0 +1,19 @@
+# The original Test Insights merge loop, the reference the bulk canonicalizer must match
+import pytest
+
+
+def full_merge(names):
+    """The original merge loop, kept as the reference."""
+    fuzzywuzzy = pytest.importorskip("fuzzywuzzy.process")
+    fuzz = pytest.importorskip("fuzzywuzzy.fuzz")
+    # Without python-Levenshtein fuzzywuzzy falls back to difflib, which rounds differently
+    assert fuzz.SequenceMatcher.__module__ == "fuzzywuzzy.StringMatcher", "pip install fuzzywuzzy[speedup]"
+    unique_names, canonical_map = [], {}
+    for name in names:
+        match = fuzzywuzzy.extractOne(name, unique_names, scorer=fuzz.token_sort_ratio)
+        if match and match[1] > 80:
+            canonical_map[name] = match[0]
+        else:
+            unique_names.append(name)
+            canonical_map[name] = name
+    return canonical_map
@@ -0,0 +1,49 @@
+# Bulk canonicalization must reproduce the fuzzywuzzy merge exactly
+import random
+
+from canonicalize import Canonicalizer, canonical_map, sort_key
+from merge_reference import full_merge
+
+WORDS = ["login", "logout", "moderate", "toxic", "clean", "protected", "token", "expired", "page", "ui", "success"]
+
+
+def synthetic_names(count, seed):
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        words = rng.sample(WORDS, rng.randint(1, 4))
+        name = " ".join(word.title() for word in words)
+        roll = rng.random()
+        if roll < 0.2 and len(name) > 3:  # typo
+            cut = rng.randrange(len(name))
+            name = name[:cut] + name[cut + 1:]
+        elif roll < 0.3:
+            name += rng.choice([" (Wrong Credentials)", "!", " ü", " - v2", "  "])
+        elif roll < 0.35:
+            name = rng.choice(["", "___", "Ünïcödé", "ΛΟΓΙΝ page"])
+        names.append(name)
+    return names
+
+
+def test_sort_key_matches_token_sort_preprocessing():
+    assert sort_key("Success Login!") == "login success"
+    assert sort_key("  Ünïcödé_test ") == "ncd_test"  # latin-1 letters dropped, '_' is a word char
+    assert sort_key("ΛΟΓΙΝ page") == "page λογιν"
+    assert sort_key("(Wrong)") == "wrong"
+    assert sort_key("!!") == ""
+
+
+def test_same_groups_as_the_reference_loop():
+    for seed in range(4):
+        names = synthetic_names(400, seed)
+        assert canonical_map(names) == full_merge(names)
+
+
+def test_small_chunks_and_resumed_leaders_give_the_same_decisions():
+    names = synthetic_names(300, 7)
+    whole = Canonicalizer().assign(names)
+    assert Canonicalizer().assign(names, chunk_size=7) == whole
+
+    head = Canonicalizer().assign(names[:120])
+    leaders = [name for name, (_, new) in zip(names, head) if new]
+    assert head + Canonicalizer(leaders).assign(names[120:], chunk_size=16) == whole
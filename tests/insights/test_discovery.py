@@ -0,0 +1,126 @@
+# Test discovery: AST parsing, streamed Postman collections, the on-disk index
+import io
+import json
+import os
+
+import discovery
+from discovery import discover, postman_tests, python_tests
+
+MODULE = '''
+import pytest
+
+# def test_commented_out():
+#     pass
+
+def test_plain():
+    pass
+
+async def test_async():
+    pass
+
+@pytest.mark.parametrize("text", ["clean", "toxic", None])
+def test_moderate(text):
+    pass
+
+@pytest.mark.parametrize("user,password", [("admin", "admin123"), pytest.param("x", "y", id="bad")])
+@pytest.mark.parametrize("retry", [1, 2], ids=["once", "twice"])
+def test_login(user, password, retry):
+    pass
+
+class TestProtected:
+    def helper(self):
+        pass
+
+    def test_missing_token(self):
+        pass
+
+    @pytest.mark.parametrize("token", [TOKEN, "expired"])
+    def test_bad_token(self, token):
+        pass
+
+class TestWithInit:
+    def __init__(self):
+        pass
+
+    def test_not_collected(self):
+        pass
+
+def helper_test():
+    pass
+'''
+
+
+def test_python_tests_come_from_the_syntax_tree():
+    assert python_tests(MODULE) == [
+        "test_plain",
+        "test_async",
+        "test_moderate[clean]",
+        "test_moderate[toxic]",
+        "test_moderate[None]",
+        "test_login[once-admin-admin123]",
+        "test_login[once-bad]",
+        "test_login[twice-admin-admin123]",
+        "test_login[twice-bad]",
+        "test_missing_token",
+        "test_bad_token[token0]",
+        "test_bad_token[expired]",
+    ]
+
+
+def test_postman_collections_yield_request_items_only():
+    collection = {
+        "info": {"name": "Login App API", "schema": "https://schema.getpostman.com/json/collection/v2.1.0/"},
+        "item": [
+            {"name": "Login Success", "request": {"method": "POST", "header": [{"key": "name", "value": "x"}]}},
+            {"name": "Moderation", "item": [
+                {"request": {"url": "/api/moderate"}, "name": "Moderate Toxic Text", "event": [{"name": "x"}]},
+            ]},
+        ],
+    }
+    stream = io.BytesIO(json.dumps(collection).encode())
+    assert postman_tests(stream) == ["Login Success", "Moderate Toxic Text"]
+
+
+def test_only_changed_files_are_parsed_again(tmp_path):
+    root = tmp_path / "tests"
+    (root / "api").mkdir(parents=True)
+    (root / "ui").mkdir()
+    (root / "__pycache__").mkdir()
+    (root / "api" / "test_login.py").write_text("def test_login_valid():\n    pass\n")
+    (root / "api" / "test_timing.py").write_text("def test_header():\n    pass\n")
+    (root / "ui" / "test_logout.py").write_text("def test_logout_page():\n    pass\n")
+    (root / "api" / "test_broken.py").write_text("def test_(:\n")
+    (root / "api" / "conftest.py").write_text("def test_fixture_helper():\n    pass\n")
+    (root / "__pycache__" / "test_stale.py").write_text("def test_stale():\n    pass\n")
+    (root / "insights").mkdir()  # the page's own unit tests are not product tests
+    (root / "insights" / "test_discovery.py").write_text("def test_walk():\n    pass\n")
+    index = str(tmp_path / "cache" / "index.json")
+
+    found = discover(root, index, workers=2, pool_min=0)  # through the process pool
+    assert discovery.last_scan["parsed"] == 4
+    assert [(label, tests) for label, _, tests, _ in found] == [
+        ("Pytest (Login)", ("test_login_valid",)),
+        ("Pytest (Broken)", ()),
+        ("Pytest (Timing)", ("test_header",)),
+        ("Playwright Logout", ("test_logout_page",)),
+    ]
+    assert found[1][3].startswith("Could not parse")
+
+    discovery._indexes.clear()  # a new process only has the file on disk
+    assert discover(root, index) == found
+    assert discovery.last_scan["parsed"] == 0
+
+    (root / "ui" / "test_logout.py").write_text("class TestLogout:\n    def test_button(self):\n        pass\n")
+    os.utime(root / "ui" / "test_logout.py", ns=(1, 1))  # force a different mtime even on coarse filesystems
+    (root / "api" / "test_timing.py").unlink()
+    found = discover(root, index)
+    assert discovery.last_scan["parsed"] == 1
+    assert [label for label, *_ in found] == ["Pytest (Login)", "Pytest (Broken)", "Playwright Logout"]
+    assert found[-1][2] == ("test_button",)
+    assert set(json.loads(open(index).read())["files"]) == {"api/test_login.py", "api/test_broken.py", "ui/test_logout.py"}
+
+
+def test_the_real_tree_leaves_out_the_pipeline_tests(tmp_path):
+    labels = [label for label, *_ in discover(index_path=str(tmp_path / "index.json"))]
+    assert "Pytest (Login)" in labels
+    assert not {"Pytest (Discovery)", "Pytest (Canonicalize)", "Pytest (Insights)", "Pytest (Results Store)"} & set(labels)
@@ -0,0 +1,78 @@
+# Test Insights pipeline: tool merging, incremental fuzzy merge, CSV rewrites, filtering and paging
+import os
+
+import insights
+from insights import (
+    FuzzyMerger, build_insights, facets, filter_tests, normalize_name, page_of, write_csv_if_changed,
+)
+from merge_reference import full_merge
+
+
+def test_tools_are_merged_per_canonical_test():
+    found = (
+        ("Pytest", "tests/api/test_login.py", ("test_login_valid", "test_protected_missing"), None),
+        ("Playwright", "tests/ui/test_ui.py", ("test_login_valid_ui",), None),
+        ("Postman", "tests/postman/collection.json", ("Login Success",), None),
+        ("Broken", "tests/api/test_broken.py", (), "Could not parse tests/api/test_broken.py: invalid syntax"),
+    )
+    merged, problems = build_insights(found)
+    assert problems == ["Could not parse tests/api/test_broken.py: invalid syntax"]
+    assert list(merged.columns) == insights.COLUMNS
+    rows = dict(zip(merged["Test Name"], merged["Tools That Ran This Test"]))
+    assert rows["Login Success"] == "✅ Playwright  ✅ Postman  ✅ Pytest"
+    assert "Protected Missing" in rows
+    assert build_insights(found[-1:]) == (None, [found[-1][3]])
+
+
+def test_only_the_leading_test_prefix_is_dropped():
+    assert normalize_name("test_debounce_yields_latest_message_after_a_pause") == (
+        "Debounce Yields Latest Message After A Pause"
+    )
+    assert normalize_name("test_login_valid") == "Login Success"
+
+
+def test_incremental_merge_matches_a_full_recompute():
+    merger = FuzzyMerger()
+    base = ["Login Success", "Login Success Ui", "Moderate Toxic", "Moderate Toxic Text", "Logout Page"]
+    variants = [
+        base,
+        base + ["Protected Missing Token", "Login Success"],
+        base[:2] + ["Protected Expired"] + base[2:],
+        ["Moderate Toxic Text"] + base,
+        [],
+    ]
+    for names in variants:
+        assert merger.merge(names) == full_merge(names)
+
+
+def test_csv_is_only_rewritten_when_content_changes(tmp_path):
+    merged, _ = build_insights((("Pytest", "test_moderate.py", ("test_moderate_clean", "test_moderate_toxic"), None),))
+    path = str(tmp_path / "final_unified_tests.csv")
+    assert write_csv_if_changed(merged, path)
+    assert not write_csv_if_changed(merged, path)
+    os.remove(path)
+    assert write_csv_if_changed(merged, path)  # deleted files come back
+    assert write_csv_if_changed(merged.head(1), path)
+
+
+def test_filters_search_and_pages_slice_the_merged_table():
+    found = (
+        ("Pytest (Login)", "tests/api/test_login.py", ("test_login_valid", "test_protected_expired"), None),
+        ("Playwright Login", "tests/ui/test_ui_login.py", ("test_logout_page", "test_login_valid_ui"), None),
+        ("Postman", "tests/postman/collection.json", ("Moderate Toxic Text",), None),
+    )
+    merged, _ = build_insights(found)
+    layers, tools, statuses = facets(merged)
+    assert tools == ["Playwright Login", "Postman", "Pytest (Login)"]
+    assert statuses == ["⚪ Not Run"] and "Frontend (UI)" in layers
+
+    assert len(filter_tests(merged)) == len(merged)
+    assert filter_tests(merged, tools=["Postman"])["Test Name"].tolist() == ["Moderate Toxic Text"]
+    assert filter_tests(merged, layers=["Frontend (UI)"])["Test Name"].tolist() == ["Logout Page"]
+    assert filter_tests(merged, search=" LOGIN s")["Test Name"].tolist() == ["Login Success"]
+    assert filter_tests(merged, tools=["Pytest (Login)"], statuses=["❌ Failed"]).empty
+
+    rows, page, pages = page_of(merged, 2, 3)
+    assert (page, pages) == (2, 2) and rows["Index"].tolist() == merged["Index"].tolist()[3:]
+    assert page_of(merged, 9, 3)[1] == 2  # clamped to the last page
+    assert page_of(merged.head(0), 1, 50)[1:] == (1, 1)
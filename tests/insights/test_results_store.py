@@ -0,0 +1,134 @@
+# Results store: streaming report parsers, incremental ingestion, statuses in the table
+import html
+import io
+import json
+import os
+from datetime import datetime
+
+import results_store
+from insights import build_insights
+from results_store import ResultsStore, parse_junit, parse_newman, parse_pytest_html
+
+
+def pytest_html_report(tests, generated="09-Oct-2025 at 10:00:00"):
+    blob = html.escape(json.dumps({"environment": {"Python": "3.11"}, "tests": tests}))
+    return (
+        f"<html><body><p>Report generated on {generated} by <a>pytest-html</a></p>"
+        f'<div id="data-container" data-jsonblob="{blob}"></div></body></html>'
+    )
+
+
+def run(test_id, result, duration="9 ms"):
+    return {"extras": [], "result": result, "testId": test_id, "duration": duration, "log": "x & <y>"}
+
+
+def newman_report(executions, completed_ms=1760000000000):
+    return json.dumps({
+        "collection": {"info": {"name": "API"}},
+        "run": {"timings": {"completed": completed_ms}, "executions": executions},
+    })
+
+
+def test_parsers_read_each_format_as_a_stream(monkeypatch):
+    executions = [
+        {"item": {"name": "Login Success"}, "assertions": [{"assertion": "200", "skipped": False}],
+         "response": {"stream": {"type": "Buffer", "data": [123, 125]}}},
+        {"item": {"name": "Login Failure"}, "assertions": [{"assertion": "401", "error": {"message": "got 500"}}]},
+        {"item": {"name": "Moderate Offline"}, "requestError": {"code": "ECONNREFUSED"}},
+        {"item": {"name": "Moderate Skipped"}, "assertions": [{"assertion": "x", "skipped": True}]},
+    ]
+    assert list(parse_newman(io.BytesIO(newman_report(executions).encode()))) == [
+        ("", "Login Success", "passed", 1760000000.0, None, None),
+        ("", "Login Failure", "failed", 1760000000.0, None, None),
+        ("", "Moderate Offline", "failed", 1760000000.0, None, None),
+        ("", "Moderate Skipped", "skipped", 1760000000.0, None, None),
+    ]
+
+    monkeypatch.setattr(results_store, "READ_CHUNK", 7)  # split entities and the marker across reads
+    report = pytest_html_report({
+        "tests/api/test_login.py::test_login_success": [run("a", "Passed")],
+        "tests/api/test_login.py::TestProtected::test_expired[token0]": [
+            run("b", "Rerun"), run("b", "Failed", "00:00:02"),
+        ],
+        "tests/api/test_moderate.py::test_flaky": [run("c", "Rerun"), run("c", "Passed")],
+    })
+    generated = datetime(2025, 10, 9, 10, 0, 0).timestamp()
+    assert list(parse_pytest_html(io.StringIO(report))) == [
+        ("tests/api/test_login.py", "test_login_success", "passed", generated, 0.009, None),
+        ("tests/api/test_login.py", "test_expired[token0]", "failed", generated, 2.0, None),
+        ("tests/api/test_moderate.py", "test_flaky", "passed", generated, 0.009, None),
+    ]
+    assert list(parse_pytest_html(io.StringIO("<html>newman</html>"))) == []
+
+    junit = b"""<?xml version="1.0"?>
+<testsuites><testsuite name="pytest" timestamp="2025-10-09T10:00:00">
+  <testcase classname="tests.api.test_login" name="test_login_success" time="0.5"/>
+  <testcase classname="tests.api.test_login.TestProtected" name="test_expired" time="0.1">
+    <failure message="assert 200 == 401">trace</failure></testcase>
+  <testcase classname="tests.ui.test_ui_login" name="test_logout"><skipped message="no browser"/></testcase>
+</testsuite></testsuites>"""
+    stamp = datetime(2025, 10, 9, 10, 0, 0).timestamp()
+    assert list(parse_junit(io.BytesIO(junit))) == [
+        ("tests/api/test_login.py", "test_login_success", "passed", stamp, 0.5, None),
+        ("tests/api/test_login.py", "test_expired", "failed", stamp, 0.1, "assert 200 == 401"),
+        ("tests/ui/test_ui_login.py", "test_logout", "skipped", stamp, None, None),
+    ]
+
+
+def test_ingest_only_parses_changed_artifacts_and_latest_run_wins(tmp_path, monkeypatch):
+    artifacts = tmp_path / "artifacts"
+    (artifacts / "failure_reports").mkdir(parents=True)
+    (artifacts / "images").mkdir()
+    (artifacts / "images" / "shot.json").write_text("not a report")
+    old = artifacts / "login-report.html"
+    old.write_text(pytest_html_report({"tests/api/test_login.py::test_login_success": [run("a", "Passed")]},
+                                      generated="08-Oct-2025 at 10:00:00"))
+    report = artifacts / "failure_reports" / "tests_api_test_login.py__test_login_success_20251009_120000.md"
+    report.write_text("# 🧪 Failure Report: tests/api/test_login.py::test_login_success\n"
+                      "**Layer:** Backend  \n**Timestamp:** 20251009_120000\n")
+    (artifacts / "newman-report.json").write_text("{broken")
+
+    parsed = []
+    parse = results_store.parse_artifact
+    monkeypatch.setattr(results_store, "parse_artifact", lambda path: parsed.append(path) or parse(path))
+    store = ResultsStore(str(tmp_path / "results.db"))
+
+    version = store.ingest(str(artifacts))
+    assert len(parsed) == 3 and len(version) == 3
+    [error] = store.errors()
+    assert error.startswith(f"Could not ingest {artifacts / 'newman-report.json'}: ")
+    assert store.latest()[("tests/api/test_login.py", "test_login_success")][:2] == (
+        "failed", datetime(2025, 10, 9, 12, 0, 0).timestamp(),
+    )
+
+    assert store.ingest(str(artifacts)) == version
+    assert len(parsed) == 3  # nothing changed, nothing parsed
+
+    old.write_text(pytest_html_report({"tests/api/test_login.py::test_login_success": [run("a", "Passed")]},
+                                      generated="10-Oct-2025 at 10:00:00"))
+    os.utime(old, ns=(1, 1))
+    report.unlink()
+    store.ingest(str(artifacts))
+    assert parsed[3:] == [str(old)]
+    assert store.latest() == {
+        ("tests/api/test_login.py", "test_login_success"): ("passed", datetime(2025, 10, 10, 10).timestamp(), str(old)),
+    }
+
+
+def test_table_shows_the_worst_latest_outcome_per_merged_test():
+    base = results_store.BASE_DIR
+    found = (
+        ("Pytest (Login)", str(base / "tests/api/test_login.py"), ("test_login_valid", "test_logout_page"), None),
+        ("Postman", str(base / "tests/postman/collection.json"), ("Login Success", "Protected Missing"), None),
+    )
+    results = {
+        ("tests/api/test_login.py", "test_login_valid"): ("passed", 1.0, "a"),
+        ("", "Login Success"): ("failed", 2.0, "b"),
+        ("", "Protected Missing"): ("skipped", 2.0, "b"),
+    }
+    merged, _ = build_insights(found, results)
+    statuses = dict(zip(merged["Test Name"], merged["Status"]))
+    assert statuses == {
+        "Login Success": "❌ Failed", "Logout Page": "⚪ Not Run", "Protected Missing": "⏭️ Skipped",
+    }
+    assert set(build_insights(found)[0]["Status"]) == {"⚪ Not Run"}
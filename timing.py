@@ -0,0 +1,155 @@
+# Per-request phase timing, reported as Server-Timing headers
+#
+# TimingMiddleware opens a phase collector for every HTTP request; code on the
+# request path wraps its work in `with phase("parse"):` (or calls `record`) and
+# the durations come back in the response as
+#
+#   Server-Timing: read;dur=0.04, parse;dur=0.02, ..., serialize;dur=0.1, total;dur=7.9
+#
+# Work done on pool workers (tokenize/forward) is collected in the worker with
+# `collect()` and merged into the request by the caller, so it is attributed
+# correctly even when one forward pass serves a whole micro-batch.
+#
+# TIMING_ACCESS_LOG=stderr (or a file path) also writes one JSON line per
+# request with the same phases.
+import functools
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+ACCESS_LOG = os.environ.get("TIMING_ACCESS_LOG", "")  # "", "stderr" or a file path
+HANDLER_END = "_handler_end"  # perf_counter stamp, used to derive "serialize"
+
+_phases = ContextVar("timing_phases", default=None)
+
+
+def current():
+    """The active {phase: seconds} dict, or None outside a collector."""
+    return _phases.get()
+
+
+@contextmanager
+def collect():
+    phases = {}
+    token = _phases.set(phases)
+    try:
+        yield phases
+    finally:
+        _phases.reset(token)
+
+
+def record(name, seconds, into=None):
+    phases = current() if into is None else into
+    if phases is not None:
+        phases[name] = phases.get(name, 0.0) + seconds
+
+
+def merge(source, into=None):
+    for name, seconds in source.items():
+        record(name, seconds, into)
+
+
+@contextmanager
+def phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def timed_endpoint(func):
+    """Marks when an async route handler returns, so the time until the response starts counts as serialize."""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            phases = current()
+            if phases is not None:
+                phases[HANDLER_END] = time.perf_counter()
+
+    return wrapper
+
+
+def server_timing(phases):
+    return ", ".join(
+        f"{name};dur={seconds * 1000:.2f}" for name, seconds in phases.items() if not name.startswith("_")
+    )
+
+
+def parse_server_timing(header):
+    """"parse;dur=0.12, total;dur=3" -> {"parse": 0.12, "total": 3.0} (milliseconds)."""
+    phases = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur" and name:
+                phases[name] = float(value)
+    return phases
+
+
+def _access_logger(target):
+    if not target:
+        return None
+    log = logging.getLogger("api.access")
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    if not log.handlers:
+        handler = logging.StreamHandler(sys.stderr) if target == "stderr" else logging.FileHandler(target)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(handler)
+    return log
+
+
+class TimingMiddleware:
+    """ASGI middleware adding a Server-Timing header and an optional JSON access log line."""
+
+    def __init__(self, app, access_log=ACCESS_LOG):
+        self.app = app
+        self.access_log = _access_logger(access_log)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = 500
+
+        with collect() as phases:
+
+            async def send_wrapper(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    now = time.perf_counter()
+                    handler_end = phases.pop(HANDLER_END, None)
+                    if handler_end is not None:
+                        phases["serialize"] = now - handler_end
+                    phases["total"] = now - start
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(phases).encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                if self.access_log is not None:
+                    self.access_log.info(json.dumps({
+                        "ts": round(time.time(), 3),
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status,
+                        "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                        "phases_ms": {
+                            name: round(seconds * 1000, 3)
+                            for name, seconds in phases.items() if not name.startswith("_")
+                        },
+                    }))
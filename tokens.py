@@ -0,0 +1,219 @@
+# Stateless HMAC-signed bearer tokens
+#
+# A token is "v1.<payload>.<signature>": the payload is base64url("sub:exp:jti")
+# and the signature is base64url(HMAC-SHA256(AUTH_SECRET, payload)). Verifying
+# needs one HMAC and no server-side lookup, except for the small in-memory set
+# of tokens revoked by /api/logout before they expire.
+#
+# AUTH_SECRET must be the same for every process that verifies tokens; when it
+# is unset a random secret is generated, so tokens stop working on restart.
+#
+# Revocations are per process unless AUTH_REVOCATION_DB names a sqlite file:
+# then /api/logout also records the token there, and every process copies new
+# rows into its in-memory set from a background thread every
+# AUTH_REVOCATION_SYNC seconds (the first copy is made at startup, see
+# start_sync). Verification itself never touches sqlite.
+import base64
+import hashlib
+import heapq
+import hmac
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+AUTH_SECRET = os.environ.get("AUTH_SECRET") or secrets.token_hex(32)
+TOKEN_TTL = int(os.environ.get("AUTH_TOKEN_TTL", "3600"))
+REVOCATION_DB = os.environ.get("AUTH_REVOCATION_DB")  # unset = revocations stay in this process
+REVOCATION_SYNC = float(os.environ.get("AUTH_REVOCATION_SYNC", "1"))
+VERSION = "v1"
+
+logger = logging.getLogger("tokens")
+
+
+class InvalidToken(Exception):
+    """Raised for malformed, forged or revoked tokens; the message is safe to return to clients."""
+
+    def __init__(self, message="Invalid or expired token"):
+        super().__init__(message)
+
+
+class ExpiredToken(InvalidToken):
+    def __init__(self):
+        super().__init__("Token expired")
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class TokenService:
+    """Issues and verifies signed tokens, and tracks revocations until they expire.
+
+    Revoked token ids live in a dict (for O(1) checks) plus a heap ordered by
+    expiry, so cleanup only ever touches entries that have actually expired.
+    With `db_path` set, revocations are shared with every process using the
+    same file, at most `sync_interval` seconds late.
+    """
+
+    def __init__(self, secret=AUTH_SECRET, ttl=TOKEN_TTL, clock=time.time, db_path=REVOCATION_DB,
+                 sync_interval=REVOCATION_SYNC):
+        key = secret.encode() if isinstance(secret, str) else secret
+        self._mac = hmac.new(key, digestmod=hashlib.sha256)
+        self.ttl = ttl
+        self.clock = clock
+        self.db_path = db_path
+        self.sync_interval = sync_interval
+        self.issued = 0
+        self.rejected = 0
+        self._revoked = {}  # jti -> exp
+        self._expiry_heap = []  # (exp, jti)
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+        self._db_lock = threading.Lock()  # never held by verify(), so sqlite cannot stall it
+        self._synced_id = 0
+        self._syncer_pid = None
+
+    def _sign(self, payload):
+        # Copying a keyed HMAC skips re-hashing the key for every token
+        mac = self._mac.copy()
+        mac.update(payload.encode())
+        return _b64encode(mac.digest())
+
+    def issue(self, subject):
+        exp = int(self.clock()) + self.ttl
+        payload = _b64encode(f"{subject}:{exp}:{secrets.token_hex(8)}".encode())
+        self.issued += 1
+        return f"{VERSION}.{payload}.{self._sign(payload)}"
+
+    def verify(self, token):
+        """Returns {"sub", "exp", "jti"} for a valid token, else raises InvalidToken/ExpiredToken."""
+        try:
+            claims = self._verify(token)
+        except InvalidToken:
+            self.rejected += 1
+            raise
+        return claims
+
+    def _verify(self, token):
+        parts = token.split(".")
+        if len(parts) != 3 or parts[0] != VERSION:
+            raise InvalidToken()
+        _, payload, signature = parts
+        if not hmac.compare_digest(signature.encode(), self._sign(payload).encode()):
+            raise InvalidToken()
+
+        if self.db_path and self._syncer_pid != os.getpid():
+            self.start_sync(wait=False)  # normally done at startup; never blocks a request on sqlite
+
+        # Only reached with a genuine signature, so the payload is well formed
+        subject, exp, jti = _b64decode(payload).decode().rsplit(":", 2)
+        exp = int(exp)
+        now = self.clock()
+        if exp <= now:
+            raise ExpiredToken()
+        if self._expiry_heap and self._expiry_heap[0][0] <= now:
+            self._purge(now)
+        if jti in self._revoked:
+            raise InvalidToken("Token revoked")
+        return {"sub": subject, "exp": exp, "jti": jti}
+
+    def revoke(self, token):
+        """Revokes a valid token until its expiry; returns its claims.
+
+        Blocks on a sqlite write when `db_path` is set, so call it off the event loop.
+        """
+        claims = self.verify(token)
+        self._add_revoked([(claims["jti"], claims["exp"])])
+        if self.db_path:
+            with self._db_lock:
+                self._connect().execute(
+                    "INSERT OR IGNORE INTO revoked_tokens (jti, exp) VALUES (?, ?)", (claims["jti"], claims["exp"])
+                )
+        return claims
+
+    def _add_revoked(self, entries):
+        with self._lock:
+            for jti, exp in entries:
+                if jti not in self._revoked:
+                    self._revoked[jti] = exp
+                    heapq.heappush(self._expiry_heap, (exp, jti))
+
+    def _connect(self):
+        # One connection per (forked) process; callers hold self._db_lock
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            # AUTOINCREMENT: ids of purged rows are never reused, so "id > last seen" misses nothing
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS revoked_tokens ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, jti TEXT NOT NULL UNIQUE, exp INTEGER NOT NULL)"
+            )
+            self._db_pid = os.getpid()
+            self._synced_id = 0
+        return self._db
+
+    def sync(self):
+        """Copies revocations recorded by other processes into memory and drops expired rows."""
+        with self._db_lock:
+            db = self._connect()
+            rows = db.execute(
+                "SELECT id, jti, exp FROM revoked_tokens WHERE id > ? ORDER BY id", (self._synced_id,)
+            ).fetchall()
+            if rows:
+                self._synced_id = rows[-1][0]
+            db.execute("DELETE FROM revoked_tokens WHERE exp <= ?", (int(self.clock()),))
+        now = self.clock()
+        self._add_revoked([(jti, exp) for _, jti, exp in rows if exp > now])
+
+    def start_sync(self, wait=True):
+        """Starts this process's background copy of shared revocations (no-op without `db_path`).
+
+        With `wait` the first sync runs before returning, so call it at startup
+        off the event loop; otherwise the sync thread does it. Each (forked)
+        process needs its own call, since threads do not survive fork().
+        """
+        with self._lock:
+            if not self.db_path or self._syncer_pid == os.getpid():
+                return
+            self._syncer_pid = os.getpid()
+        if wait:
+            self._sync_logged()
+        threading.Thread(target=self._sync_loop, args=(not wait,), name="token-revocation-sync", daemon=True).start()
+
+    def _sync_loop(self, sync_first):
+        if sync_first:
+            self._sync_logged()
+        while True:
+            time.sleep(self.sync_interval)
+            self._sync_logged()
+
+    def _sync_logged(self):
+        try:
+            self.sync()
+        except sqlite3.Error:
+            logger.exception("Could not read revoked tokens from %s", self.db_path)
+
+    def _purge(self, now):
+        # Expired tokens fail on their own, so their revocation entries can go
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                _, jti = heapq.heappop(self._expiry_heap)
+                self._revoked.pop(jti, None)
+
+    def stats(self):
+        return {
+            "ttl": self.ttl,
+            "issued": self.issued,
+            "rejected": self.rejected,
+            "revoked": len(self._revoked),
+            "shared": bool(self.db_path),
+        }
@@ -0,0 +1,155 @@
+# Sqlite-backed user store with scrypt password hashes
+#
+# Hashes are stored as "scrypt$<n>$<r>$<p>$<salt>$<hash>" so the cost can be
+# raised (PASSWORD_SCRYPT_N) without invalidating existing users: each hash is
+# checked with the parameters it was created with.
+#
+#   python user_store.py add alice          # prompts for a password
+#   python user_store.py import users.csv   # "username,password" rows
+import argparse
+import base64
+import csv
+import getpass
+import hashlib
+import hmac
+import os
+import secrets
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+USER_DB = os.environ.get("USER_DB", ":memory:")
+SCRYPT_N = int(os.environ.get("PASSWORD_SCRYPT_N", str(2**14)))
+SCRYPT_R = int(os.environ.get("PASSWORD_SCRYPT_R", "8"))
+SCRYPT_P = int(os.environ.get("PASSWORD_SCRYPT_P", "1"))
+# Hash checks run on their own bounded pool so logins never block the event loop
+LOGIN_WORKERS = int(os.environ.get("LOGIN_WORKERS", str(min(4, os.cpu_count() or 1))))
+LOGIN_QUEUE_SIZE = int(os.environ.get("LOGIN_QUEUE_SIZE", "256"))
+
+# Seeded into an empty store so the demo credentials keep working
+DEFAULT_USERS = {"admin": "password123"}
+
+
+def hash_password(password, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    salt = secrets.token_bytes(16)
+    digest = _scrypt(password, salt, n, r, p)
+    return "$".join([
+        "scrypt", str(n), str(r), str(p),
+        base64.b64encode(salt).decode(), base64.b64encode(digest).decode(),
+    ])
+
+
+def verify_password(password, stored):
+    try:
+        scheme, n, r, p, salt, digest = stored.split("$")
+        if scheme != "scrypt":
+            return False
+        expected = base64.b64decode(digest)
+        actual = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, expected)
+
+
+def _scrypt(password, salt, n, r, p):
+    # scrypt needs ~128*n*r bytes; OpenSSL's default 32 MB cap rejects n >= 2**15
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p, dklen=32, maxmem=256 * n * r + 2**20
+    )
+
+
+class UserStore:
+    """Username -> password hash lookups on an indexed sqlite table.
+
+    `authenticate` is blocking (it runs scrypt); callers on an event loop run
+    it on a worker pool. Unknown users are checked against a dummy hash of the
+    same cost, so response time does not reveal which usernames exist.
+    """
+
+    def __init__(self, db_path=USER_DB, seed=DEFAULT_USERS):
+        self.db_path = db_path
+        self.seed = dict(seed or {})
+        self._db = None
+        self._dummy_hash = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # Opened on first use so every (forked) worker process gets its own connection
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+                    if self.db_path != ":memory:":
+                        db.execute("PRAGMA journal_mode=WAL")
+                    # The primary key is the lookup index; WITHOUT ROWID keeps it the only b-tree
+                    db.execute(
+                        "CREATE TABLE IF NOT EXISTS users ("
+                        "username TEXT PRIMARY KEY, password_hash TEXT NOT NULL) WITHOUT ROWID"
+                    )
+                    if self.seed and db.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None:
+                        db.executemany(
+                            "INSERT INTO users (username, password_hash) VALUES (?, ?)",
+                            [(name, hash_password(password)) for name, password in self.seed.items()],
+                        )
+                    self._dummy_hash = hash_password(secrets.token_hex(16))
+                    self._db = db
+        return self._db
+
+    def get_hash(self, username):
+        row = self._connect().execute(
+            "SELECT password_hash FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def authenticate(self, username, password):
+        stored = self.get_hash(username)
+        valid = verify_password(password, stored or self._dummy_hash)
+        return valid and stored is not None
+
+    def set_password(self, username, password, **cost):
+        self.add_hashes([(username, hash_password(password, **cost))])
+
+    def add_hashes(self, rows):
+        """Inserts or replaces (username, password_hash) pairs in one transaction."""
+        db = self._connect()
+        with self._lock:
+            db.execute("BEGIN")
+            db.executemany(
+                "INSERT OR REPLACE INTO users (username, password_hash) VALUES (?, ?)", rows
+            )
+            db.execute("COMMIT")
+
+    def import_csv(self, path, workers=LOGIN_WORKERS):
+        """Loads "username,password" rows, hashing them on `workers` threads."""
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = [(row[0], row[1]) for row in csv.reader(f) if len(row) >= 2 and row[0]]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            hashes = list(pool.map(lambda row: hash_password(row[1]), rows))
+        self.add_hashes([(name, stored) for (name, _), stored in zip(rows, hashes)])
+        return len(rows)
+
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the login user store (USER_DB)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="add a user or reset their password")
+    add.add_argument("username")
+    load = commands.add_parser("import", help="import a username,password CSV")
+    load.add_argument("path")
+    args = parser.parse_args()
+
+    if USER_DB == ":memory:":
+        raise SystemExit("Set USER_DB to a sqlite file path first")
+    store = UserStore(seed=None)
+    if args.command == "add":
+        store.set_password(args.username, getpass.getpass(f"Password for {args.username}: "))
+        print(f"Saved {args.username}")
+    else:
+        print(f"Imported {store.import_csv(args.path)} users; store now has {store.count()}")
+
+
+if __name__ == "__main__":
+    main()